@@ -1,19 +1,23 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, appcontext_pushed, render_template, request, redirect, url_for, flash, jsonify, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from dotenv import load_dotenv
-from flask_sqlalchemy import SQLAlchemy
 import os
 # We import our model here so that we can save information to the database of that form
-from EquiSight.models import db, User, Wall_Street_Prediction, Zack_Bull_Bear
+from EquiSight.models import db, User, Zack_Bull_Bear
 import EquiSight.models as models
-# We import our scraping script to run in the background with multithreading
-# from EquiSight.scraping_scripts.stock_invest_selenium import run_script
-from EquiSight.scraping_scripts.wall_street_zen import WallStreetScraper
-from EquiSight.scraping_scripts.zacks import ZacksScraper
-from threading import Thread
+# Importing consensus registers it to be recomputed after every ingest
+from EquiSight.consensus import engine as consensus_engine, ranked_consensus
+from EquiSight.charts import charts
+from EquiSight.search import index as search_index, MAX_RESULTS
+from EquiSight.tickers import predictions_view, backfill_ticker_ids, SORT_KEYS
+from EquiSight import compaction
+from EquiSight import alerts
+# Scrapers are imported inside the threads that run them, so the web app
+# never loads selenium or bs4 just to serve pages
+from threading import Thread, RLock
 
 # Import datetime to get current rendering data
-from datetime import date, timezone
+from datetime import date
 
 
 # NOTE: app.py is meant to configure Flask, initialize 
@@ -25,7 +29,37 @@ load_dotenv()
 # This gives us access to the login extension
 login_manager = LoginManager()
 
-def create_app():
+# Held while an app's tables are being created, other threads wait on it
+_database_lock = RLock()
+
+
+def init_database(app):
+    """Create missing tables and columns, then link old rows to tickers
+
+    Runs once per app, the first time anything (a request, a scraper thread,
+    a command line tool) pushes an app context, instead of blocking startup.
+    Needs an app context. Run `flask --app 'EquiSight:create_app(start_scrapers=False)' init-db`
+    to do it up front.
+    """
+    if app.extensions.get("database_ready"):
+        return
+    with _database_lock:
+        # The steps below can push nested app contexts on this same thread
+        if app.extensions.get("database_ready") or app.extensions.get("database_initializing"):
+            return
+        app.extensions["database_initializing"] = True
+        try:
+            # Lets compaction hand space back in small steps instead of a full VACUUM
+            compaction.enable_incremental_vacuum()
+            db.create_all()
+            models.upgrade_schema()
+            backfill_ticker_ids()
+            app.extensions["database_ready"] = True
+        finally:
+            app.extensions["database_initializing"] = False
+
+
+def create_app(start_scrapers=True):
     # EquiSight is my cool app name
     app = Flask(
     __name__,
@@ -47,26 +81,56 @@ def create_app():
     # Flask category
     login_manager.login_message_category = "error" 
 
-    # Create database
-    with app.app_context():
-        db.create_all()
+    # Create database lazily, on the first app context instead of at startup
+    appcontext_pushed.connect(lambda sender, **kwargs: init_database(sender), app, weak=False)
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create or upgrade the database tables."""
+        with app.app_context():
+            init_database(app)
+            # Rank whatever was scraped before the consensus table existed
+            changed = consensus_engine.refresh()
+        print(f"Database ready, consensus written for {changed} tickers")
 
     # Define background wall street scraper function
     def start_wallstreet_scraper():
+        from EquiSight.scraping_scripts.wall_street_zen import WallStreetScraper
         with app.app_context():
             wallstreet_scraper = WallStreetScraper()
             wallstreet_scraper.run_continuous()
 
     # Define background zacks scraper function
     def start_zack_scraper():
+        from EquiSight.scraping_scripts.zacks import ZacksScraper
         with app.app_context():
             zack_scraper = ZacksScraper()
             zack_scraper.run_continuous()
 
 
+    # Define background stock invest scraper function
+    def start_stock_invest_scraper():
+        from EquiSight.scraping_scripts.stock_invest_selenium import run_script
+        with app.app_context():
+            run_script()
+
+    # Define background function that scrapes every source concurrently with asyncio
+    def start_orchestrator():
+        from EquiSight.scraping_scripts.orchestrator import ScrapeOrchestrator
+        ScrapeOrchestrator(app).run_continuous()
+
     # daemon=True will set the thread to end when flask is closed
-    Thread(target=start_zack_scraper, daemon=True).start()
-    Thread(target=start_wallstreet_scraper, daemon=True).start()
+    # Command line tools turn this off so they only get the database
+    if start_scrapers:
+        # SCRAPE_MODE=threads falls back to one independent thread per source
+        if os.getenv("SCRAPE_MODE", "async") == "threads":
+            Thread(target=start_zack_scraper, daemon=True).start()
+            Thread(target=start_wallstreet_scraper, daemon=True).start()
+            Thread(target=start_stock_invest_scraper, daemon=True).start()
+        else:
+            Thread(target=start_orchestrator, daemon=True).start()
+        # Daily Parquet export, plus rollup and pruning of old history when COMPACTION=1
+        Thread(target=compaction.run_continuous, args=(app,), daemon=True).start()
 
 
     # Page routes
@@ -142,13 +206,103 @@ def create_app():
         # Grab the Bull and Bear picks from zack for the dashboard
         today = date.today()
         bull_bear = Zack_Bull_Bear.query.filter_by(date=today).first()
-        return render_template("main/dashboard.html", user=current_user, bull_bear=bull_bear)
+        return render_template("main/dashboard.html", user=current_user, bull_bear=bull_bear,
+                               unread_alerts=alerts.unread_count(current_user.id))
 
     @app.route("/predictions")
     @login_required
     def predictions():
-        # Query the stock data needed from the database, take the user to a predictions page showing predictions and graphs (eventually)
-        current_predictions = Wall_Street_Prediction.query.order_by(Wall_Street_Prediction.ticker).all()
-        return render_template("main/predictions.html", results=current_predictions)
+        # Predictions joined with their sector/industry, served from the columnar snapshot
+        sector = request.args.get("sector") or None
+        sort = request.args.get("sort", "ticker")
+        if sort not in SORT_KEYS:
+            abort(400)
+        descending = request.args.get("order") == "desc"
+        sectors = predictions_view.sectors()
+        if sector is not None and sector not in sectors:
+            abort(400)
+        current_predictions = predictions_view.rows(sector, sort=sort, descending=descending)
+        return render_template("main/predictions.html", results=current_predictions,
+                               sectors=sectors, sector=sector, sort=sort, descending=descending)
+
+    @app.route("/predictions/<ticker>")
+    @login_required
+    def ticker_chart(ticker):
+        return render_template("main/chart.html", ticker=ticker.upper())
+
+    @app.route("/predictions/<ticker>/chart.json")
+    @login_required
+    def ticker_chart_data(ticker):
+        # Downsampled price and forecast history, ?points= sets the resolution
+        points = request.args.get("points", 200, type=int)
+        method = request.args.get("method", "lttb")
+        if method not in ("lttb", "minmax"):
+            abort(400)
+        data = charts.chart(ticker.upper(), points, method)
+        if data is None:
+            abort(404)
+        return jsonify(ticker=ticker.upper(), **data)
+
+    @app.route("/api/search")
+    @login_required
+    def search():
+        # Autocomplete over scraped tickers, backed by the in-memory prefix index
+        query = request.args.get("q", "")
+        limit = max(1, min(request.args.get("limit", 10, type=int), MAX_RESULTS))
+        return jsonify(results=search_index.search(query, limit))
+
+    @app.route("/consensus")
+    @login_required
+    def consensus():
+        # Read only, the table is written by the ingest hook (and init-db for existing data)
+        return render_template("main/consensus.html", results=ranked_consensus())
+
+    @app.route("/watchlist", methods=["GET", "POST"])
+    @login_required
+    def watchlist():
+        if request.method == "POST":
+            ticker = request.form.get("ticker", "").strip().upper()
+            if not ticker or len(ticker) > 10:
+                flash("Enter a ticker symbol.", "error")
+            else:
+                alerts.add_to_watchlist(current_user.id, ticker)
+                flash(f"Added {ticker} to your watchlist.", "success")
+            return redirect(url_for("watchlist"))
+
+        page = render_template("main/watchlist.html", **alerts.watchlist_page(current_user.id))
+        # Alerts count as seen once the page showing them has rendered
+        alerts.mark_read(current_user.id)
+        return page
+
+    @app.route("/watchlist/<ticker>/remove", methods=["POST"])
+    @login_required
+    def remove_from_watchlist(ticker):
+        alerts.remove_from_watchlist(current_user.id, ticker.upper())
+        flash(f"Removed {ticker.upper()} from your watchlist.", "success")
+        return redirect(url_for("watchlist"))
+
+    @app.route("/alerts/rules", methods=["POST"])
+    @login_required
+    def add_alert_rule():
+        ticker = request.form.get("ticker", "").strip().upper()
+        kind = request.form.get("kind", "")
+        threshold = request.form.get("threshold", type=float)
+        if not ticker or len(ticker) > 10:
+            flash("Enter a ticker symbol.", "error")
+            return redirect(url_for("watchlist"))
+        try:
+            alerts.add_rule(current_user.id, ticker, kind, threshold)
+            flash(f"Alert added for {ticker}.", "success")
+        except ValueError as e:
+            flash(str(e), "error")
+        return redirect(url_for("watchlist"))
+
+    @app.route("/alerts/rules/<int:rule_id>/delete", methods=["POST"])
+    @login_required
+    def delete_alert_rule(rule_id):
+        if not alerts.remove_rule(current_user.id, rule_id):
+            abort(404)
+        flash("Alert removed.", "success")
+        return redirect(url_for("watchlist"))
 
     return app
\ No newline at end of file
@@ -0,0 +1,243 @@
+import json
+import threading
+from EquiSight.models import db, Ticker, Wall_Street_Prediction, Zack_Bull_Bear, Watchlist_Item, Alert_Rule, Alert
+from EquiSight.ingest import on_ingest, ingest_age
+from EquiSight.consensus import parse_number
+
+# NOTE: alerts.py runs per-user watchlist alert rules as scrapes come in
+# Rules hang off a single ticker, so each ingest only loads the rules for the
+# tickers it just committed. Each rule remembers what it saw last in
+# last_state and only fires when that changes, so a scraper re-saving the
+# same data never alerts twice.
+
+# Rule kinds and how they read on the page, upside_above also needs a threshold
+RULE_KINDS = {
+    "zacks_bull": "Becomes Zacks Bull of the Day",
+    "upside_above": "WallStreetZen upside above",
+    "recommendation_change": "Recommendation changes",
+}
+
+
+class RuleIndex:
+    """Tickers that have at least one rule, so most ingests never query the rule table"""
+
+    def __init__(self):
+        self.tickers = set()
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        tickers = {row[0] for row in db.session.query(Alert_Rule.ticker).distinct()}
+        with self.lock:
+            self.tickers = tickers
+            self.loaded = True
+
+    def watched(self, tickers):
+        if not self.loaded:
+            self.load()
+        with self.lock:
+            return self.tickers & set(tickers)
+
+    def add(self, ticker):
+        with self.lock:
+            self.tickers.add(ticker)
+
+    def discard_if_unused(self, ticker):
+        if Alert_Rule.query.filter_by(ticker=ticker).first() is None:
+            with self.lock:
+                self.tickers.discard(ticker)
+
+
+rule_index = RuleIndex()
+
+
+def latest_predictions(tickers, source=None):
+    """Latest prediction row per (ticker, source) for the given tickers"""
+    if not tickers:
+        return {}
+    latest = db.session.query(
+        Wall_Street_Prediction.ticker_id,
+        Wall_Street_Prediction.source,
+        db.func.max(Wall_Street_Prediction.date).label("date")
+    ).join(Ticker, Wall_Street_Prediction.ticker_id == Ticker.id).filter(Ticker.symbol.in_(tickers))
+    if source is not None:
+        latest = latest.filter(Wall_Street_Prediction.source == source)
+    latest = latest.group_by(Wall_Street_Prediction.ticker_id, Wall_Street_Prediction.source).subquery()
+
+    rows = Wall_Street_Prediction.query.join(latest, db.and_(
+        Wall_Street_Prediction.ticker_id == latest.c.ticker_id,
+        Wall_Street_Prediction.source == latest.c.source,
+        Wall_Street_Prediction.date == latest.c.date
+    )).all()
+    return {(row.ticker, row.source): row for row in rows}
+
+
+def upside(row):
+    """Percent upside of a prediction row, NaN when it can't be worked out"""
+    if row.source == "wallstreetzen":
+        value = parse_number(row.score)
+        if value == value:
+            return value
+    price = parse_number(row.price)
+    forecast = parse_number(row.forecast_price)
+    if price and forecast == forecast and price == price:
+        return (forecast / price - 1) * 100
+    return float("nan")
+
+
+# Each check takes (rule, source, facts) and returns (new_state, message or None),
+# or None when this ingest says nothing about the rule
+
+def check_zacks_bull(rule, source, facts):
+    pick = facts.get('zacks')
+    if source != "zacks" or pick is None:
+        return None
+    if pick.bull_ticker != rule.ticker:
+        return f"{pick.date}:not bull", None
+    state = f"{pick.date}:bull"
+    if state == rule.last_state:
+        return state, None
+    return state, f"{rule.ticker} is the Zacks Bull of the Day"
+
+
+def check_upside_above(rule, source, facts):
+    # Only WallStreetZen publishes an upside, as the rule's label says
+    row = facts.get(source) if source == "wallstreetzen" else None
+    if row is None or rule.threshold is None:
+        return None
+    value = upside(row)
+    if value != value:
+        return None
+    if value <= rule.threshold:
+        return "below", None
+    if rule.last_state == "above":
+        return "above", None
+    return "above", f"{rule.ticker} {source} upside is {value:.1f}%, above your {rule.threshold:g}%"
+
+
+def check_recommendation_change(rule, source, facts):
+    row = facts.get(source)
+    if row is None or not row.recommendation:
+        return None
+    seen = json.loads(rule.last_state) if rule.last_state else {}
+    previous = seen.get(source)
+    seen[source] = row.recommendation
+    state = json.dumps(seen, sort_keys=True)
+    # The first recommendation a rule sees is a baseline, not a change
+    if previous is None or previous == row.recommendation:
+        return state, None
+    return state, f"{rule.ticker} {source} recommendation changed from {previous} to {row.recommendation}"
+
+
+CHECKS = {
+    "zacks_bull": check_zacks_bull,
+    "upside_above": check_upside_above,
+    "recommendation_change": check_recommendation_change,
+}
+
+
+def evaluate(source, tickers):
+    """Run the rules on the tickers a source just committed, returns the new Alerts"""
+    watched = rule_index.watched(tickers)
+    if not watched:
+        return []
+    rules = Alert_Rule.query.filter(Alert_Rule.ticker.in_(watched)).all()
+    if not rules:
+        return []
+
+    # What this ingest says about each watched ticker, keyed by source
+    facts = {ticker: {} for ticker in watched}
+    if source == "zacks":
+        pick = Zack_Bull_Bear.query.order_by(Zack_Bull_Bear.date.desc(), Zack_Bull_Bear.id.desc()).first()
+        for ticker in watched:
+            facts[ticker]['zacks'] = pick
+    else:
+        for (ticker, row_source), row in latest_predictions(watched, source).items():
+            facts[ticker][row_source] = row
+
+    alerts = []
+    for rule in rules:
+        check = CHECKS.get(rule.kind)
+        result = check(rule, source, facts[rule.ticker]) if check else None
+        if result is None:
+            continue
+        rule.last_state, message = result
+        if message:
+            alerts.append(Alert(user_id=rule.user_id, rule_id=rule.id, ticker=rule.ticker, message=message, source=source))
+
+    age = ingest_age()
+    for alert in alerts:
+        alert.latency_ms = None if age is None else round(age * 1000, 2)
+    db.session.add_all(alerts)
+    db.session.commit()
+    if alerts:
+        print(f"Raised {len(alerts)} alerts from {source}, {alerts[0].latency_ms} ms after the commit")
+    return alerts
+
+
+@on_ingest
+def evaluate_alerts(source, tickers):
+    evaluate(source, tickers)
+
+
+def add_to_watchlist(user_id, ticker):
+    if Watchlist_Item.query.filter_by(user_id=user_id, ticker=ticker).first() is None:
+        db.session.add(Watchlist_Item(user_id=user_id, ticker=ticker))
+        db.session.commit()
+
+
+def remove_from_watchlist(user_id, ticker):
+    """Stop following a ticker, along with the user's rules on it"""
+    Watchlist_Item.query.filter_by(user_id=user_id, ticker=ticker).delete()
+    Alert_Rule.query.filter_by(user_id=user_id, ticker=ticker).delete()
+    db.session.commit()
+    rule_index.discard_if_unused(ticker)
+
+
+def add_rule(user_id, ticker, kind, threshold=None):
+    """Create a rule, following the ticker too if the user wasn't already"""
+    if kind not in RULE_KINDS:
+        raise ValueError(f"Unknown alert rule {kind}")
+    if kind == "upside_above" and threshold is None:
+        raise ValueError("An upside rule needs a threshold")
+    add_to_watchlist(user_id, ticker)
+    rule = Alert_Rule(user_id=user_id, ticker=ticker, kind=kind, threshold=threshold)
+    db.session.add(rule)
+    db.session.commit()
+    rule_index.add(ticker)
+    return rule
+
+
+def remove_rule(user_id, rule_id):
+    rule = Alert_Rule.query.filter_by(id=rule_id, user_id=user_id).first()
+    if rule is None:
+        return False
+    ticker = rule.ticker
+    db.session.delete(rule)
+    db.session.commit()
+    rule_index.discard_if_unused(ticker)
+    return True
+
+
+def watchlist_page(user_id, alert_limit=50):
+    """Everything the watchlist page shows for a user"""
+    items = Watchlist_Item.query.filter_by(user_id=user_id).order_by(Watchlist_Item.ticker).all()
+    latest = latest_predictions([item.ticker for item in items])
+    return {
+        'items': [
+            (item.ticker, [row for (ticker, _), row in sorted(latest.items()) if ticker == item.ticker])
+            for item in items
+        ],
+        'rules': Alert_Rule.query.filter_by(user_id=user_id).order_by(Alert_Rule.ticker, Alert_Rule.id).all(),
+        'alerts': Alert.query.filter_by(user_id=user_id).order_by(Alert.created_at.desc()).limit(alert_limit).all(),
+        'rule_kinds': RULE_KINDS,
+    }
+
+
+def unread_count(user_id):
+    return Alert.query.filter_by(user_id=user_id, read=False).count()
+
+
+def mark_read(user_id):
+    Alert.query.filter_by(user_id=user_id, read=False).update({Alert.read: True})
+    db.session.commit()
@@ -0,0 +1,212 @@
+import argparse
+import numpy as np
+from EquiSight.consensus import parse_number
+
+# NOTE: backtest.py judges how well each source's calls played out
+# Every prediction is joined with the first price scraped for the same ticker
+# at least `horizon` days later. The join is a single searchsorted over
+# (ticker, day) keys, so the whole history is evaluated without Python loops.
+
+DEFAULT_HORIZONS = (7, 30, 90)
+# A later price more than this many days past the horizon doesn't count
+DEFAULT_TOLERANCE = 7
+# Day ordinals fit in 20 bits, so ticker and day pack into one sortable int64
+DAY_BITS = 20
+
+
+def recommendation_direction(recommendation):
+    """+1 for bullish calls, -1 for bearish calls and 0 for everything else"""
+    text = (recommendation or "").lower()
+    if "sell" in text or "bear" in text or "underperform" in text:
+        return -1
+    if "buy" in text or "bull" in text or "outperform" in text:
+        return 1
+    return 0
+
+
+class History:
+    """Column arrays for every scraped prediction, strings are stored once as codes"""
+
+    def __init__(self, tickers, ticker_code, sources, source_code, recommendations, recommendation_code, day, price, forecast):
+        self.tickers = tickers
+        self.ticker_code = ticker_code
+        self.sources = sources
+        self.source_code = source_code
+        self.recommendations = recommendations
+        self.recommendation_code = recommendation_code
+        self.day = day
+        self.price = price
+        self.forecast = forecast
+
+    def __len__(self):
+        return len(self.day)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (ticker, source, recommendation, date, price, forecast) tuples"""
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return cls([], empty, [], empty, [], empty, empty, np.empty(0), np.empty(0))
+
+        tickers, sources, recommendations, dates, prices, forecasts = zip(*rows)
+        tickers, ticker_code = np.unique(np.array(tickers, dtype=str), return_inverse=True)
+        sources, source_code = np.unique(np.array(sources, dtype=str), return_inverse=True)
+        recommendations, recommendation_code = np.unique(
+            np.array([r or "" for r in recommendations], dtype=str), return_inverse=True
+        )
+        return cls(
+            tickers.tolist(), ticker_code.astype(np.int64),
+            sources.tolist(), source_code.astype(np.int64),
+            recommendations.tolist(), recommendation_code.astype(np.int64),
+            np.array([d.toordinal() for d in dates], dtype=np.int64),
+            np.array([parse_number(p) for p in prices]),
+            np.array([parse_number(f) for f in forecasts]),
+        )
+
+
+def load_history():
+    """Load every prediction and Zacks pick from the database into a History"""
+    from EquiSight.models import db, Ticker, Wall_Street_Prediction, Zack_Bull_Bear
+
+    rows = db.session.query(
+        Ticker.symbol,
+        Wall_Street_Prediction.source,
+        Wall_Street_Prediction.recommendation,
+        Wall_Street_Prediction.date,
+        Wall_Street_Prediction.price,
+        Wall_Street_Prediction.forecast_price
+    ).join(Ticker, Wall_Street_Prediction.ticker_id == Ticker.id).filter(Wall_Street_Prediction.date.isnot(None)).all()
+
+    # Bull/Bear picks carry no price, their entry price is looked up from the other sources
+    for pick in Zack_Bull_Bear.query.filter(Zack_Bull_Bear.date.isnot(None)):
+        if pick.bull_ticker:
+            rows.append((pick.bull_ticker, "zacks", "Bull", pick.date, None, None))
+        if pick.bear_ticker:
+            rows.append((pick.bear_ticker, "zacks", "Bear", pick.date, None, None))
+    return History.from_rows(rows)
+
+
+def _price_lookup(history):
+    """Sorted (ticker, day) keys with one observed price each"""
+    has_price = ~np.isnan(history.price)
+    keys = (history.ticker_code[has_price] << DAY_BITS) | history.day[has_price]
+    prices = history.price[has_price]
+    keys, first = np.unique(keys, return_index=True)
+    return keys, prices[first]
+
+
+def _lookup(keys, prices, targets, tolerance):
+    """Price for each target key, taking the first observation within tolerance days after it"""
+    idx = np.searchsorted(keys, targets, side="left")
+    idx_clipped = np.minimum(idx, len(keys) - 1)
+    found = (idx < len(keys)) & ((keys[idx_clipped] >> DAY_BITS) == (targets >> DAY_BITS))
+    found &= (keys[idx_clipped] - targets) <= tolerance
+    return np.where(found, prices[idx_clipped], np.nan)
+
+
+def _group_stats(group, group_count, mask, realized, forecast_upside, hit):
+    """Per group count, hit rate, mean realized and mean forecast upside for the masked rows"""
+    group = group[mask]
+    count = np.bincount(group, minlength=group_count)
+
+    def mean(values):
+        valid = ~np.isnan(values[mask])
+        totals = np.bincount(group[valid], weights=values[mask][valid], minlength=group_count)
+        counts = np.bincount(group[valid], minlength=group_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts
+
+    return count, mean(hit), mean(realized), mean(forecast_upside)
+
+
+def run_backtest(history, horizons=DEFAULT_HORIZONS, tolerance=DEFAULT_TOLERANCE):
+    """Evaluate every prediction at each horizon
+
+    Returns a list of dicts, one per (horizon, source, recommendation) group
+    plus one per (horizon, source) with recommendation None, holding the
+    number of evaluated calls, the hit rate (direction was right), mean
+    realized return and mean forecast upside, both in percent.
+    """
+    results = []
+    if not len(history):
+        return results
+
+    keys, prices = _price_lookup(history)
+    base = (history.ticker_code << DAY_BITS) | history.day
+    direction = np.array([recommendation_direction(r) for r in history.recommendations])[history.recommendation_code]
+
+    # Predictions without a scraped price enter at the price seen that day
+    entry = np.where(np.isnan(history.price), _lookup(keys, prices, base, tolerance=0), history.price)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        forecast_upside = (history.forecast / entry - 1) * 100
+
+    n_sources = len(history.sources)
+    n_recommendations = len(history.recommendations)
+    combined = history.source_code * n_recommendations + history.recommendation_code
+
+    for horizon in horizons:
+        later = _lookup(keys, prices, base + horizon, tolerance)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            realized = (later / entry - 1) * 100
+        evaluated = ~np.isnan(realized)
+        # Calls with no direction (Hold, blanks) have no hit or miss
+        hit = np.where(direction != 0, (np.sign(realized) == direction).astype(float), np.nan)
+        hit[~evaluated] = np.nan
+
+        by_source = _group_stats(history.source_code, n_sources, evaluated, realized, forecast_upside, hit)
+        by_recommendation = _group_stats(combined, n_sources * n_recommendations, evaluated, realized, forecast_upside, hit)
+
+        for source_index, source in enumerate(history.sources):
+            count, hit_rate, mean_realized, mean_forecast = (stat[source_index] for stat in by_source)
+            if count:
+                results.append(_result(horizon, source, None, count, hit_rate, mean_realized, mean_forecast))
+            for rec_index, recommendation in enumerate(history.recommendations):
+                group = source_index * n_recommendations + rec_index
+                count, hit_rate, mean_realized, mean_forecast = (stat[group] for stat in by_recommendation)
+                if count:
+                    results.append(_result(horizon, source, recommendation, count, hit_rate, mean_realized, mean_forecast))
+    return results
+
+
+def _result(horizon, source, recommendation, count, hit_rate, mean_realized, mean_forecast):
+    def clean(value):
+        return None if np.isnan(value) else float(value)
+    return {
+        'horizon': horizon,
+        'source': source,
+        'recommendation': recommendation,
+        'count': int(count),
+        'hit_rate': clean(hit_rate),
+        'mean_realized': clean(mean_realized),
+        'mean_forecast_upside': clean(mean_forecast),
+    }
+
+
+def print_results(results):
+    def fmt(value, pattern):
+        return pattern.format(value) if value is not None else "-"
+    print(f"{'horizon':>8} {'source':<14} {'recommendation':<16} {'calls':>8} {'hit rate':>9} {'realized':>9} {'forecast':>9}")
+    for row in results:
+        print(
+            f"{row['horizon']:>8} {row['source']:<14} {row['recommendation'] or 'ALL':<16} {row['count']:>8} "
+            f"{fmt(row['hit_rate'], '{:.1%}'):>9} {fmt(row['mean_realized'], '{:.2f}%'):>9} "
+            f"{fmt(row['mean_forecast_upside'], '{:.2f}%'):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest scraped predictions against later prices")
+    parser.add_argument("--horizons", default=",".join(map(str, DEFAULT_HORIZONS)), help="Comma separated horizons in days")
+    parser.add_argument("--tolerance", type=int, default=DEFAULT_TOLERANCE, help="Days past the horizon a price may be taken from")
+    args = parser.parse_args()
+
+    from EquiSight import create_app
+    app = create_app(start_scrapers=False)
+    with app.app_context():
+        history = load_history()
+    horizons = [int(h) for h in args.horizons.split(",") if h]
+    print_results(run_backtest(history, horizons, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
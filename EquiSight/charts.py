@@ -0,0 +1,194 @@
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+from EquiSight.models import db, Ticker, Wall_Street_Prediction
+from EquiSight.ingest import on_ingest, ingest_dates
+from EquiSight.consensus import parse_number
+
+# NOTE: charts.py serves downsampled price/forecast history for the prediction charts
+# Each ticker's history is kept in typed arrays sorted by day and appended to
+# at ingest. Requests are answered from an LRU cache of downsampled series,
+# so a chart costs O(points shown) once the history is loaded. An ingest drops
+# its tickers' cached series, the next request downsamples the full history
+# again so a chart never drifts from what the data says.
+
+# Largest series we'll ever return, and how many downsampled series we keep
+MAX_POINTS = 2000
+CACHE_SIZE = 512
+
+
+def lttb(x, y, points):
+    """Largest-Triangle-Three-Buckets downsampling, returns the indexes to keep"""
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    # Bucket edges for the points between the first and last
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    previous = 0
+    for i in range(points - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        # The next bucket's average stands in for the point we haven't chosen yet
+        avg_x = x[next_start:max(next_end, next_start + 1)].mean()
+        avg_y = y[next_start:max(next_end, next_start + 1)].mean()
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+
+def minmax(y, points):
+    """Keep the min and max of each bucket, preserving spikes, returns the indexes to keep"""
+    n = len(y)
+    buckets = max(1, points // 2)
+    if n <= points:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        segment = y[start:end]
+        low, high = start + int(np.argmin(segment)), start + int(np.argmax(segment))
+        keep.extend(sorted({low, high}))
+    return np.array(keep, dtype=np.int64)
+
+
+class TickerSeries:
+    """Day ordinals with price and forecast, sorted by day, one point per day"""
+
+    def __init__(self):
+        self.days = array('l')
+        self.prices = array('d')
+        self.forecasts = array('d')
+        # Bumped on every change so cached downsamples know they're stale
+        self.version = 0
+
+    def add(self, day, price, forecast):
+        # Scrapes almost always arrive in order, so this is an append
+        if not self.days or day > self.days[-1]:
+            self.days.append(day)
+            self.prices.append(price)
+            self.forecasts.append(forecast)
+        else:
+            i = int(np.searchsorted(np.frombuffer(self.days, dtype=self.days.typecode), day))
+            if i < len(self.days) and self.days[i] == day:
+                self.prices[i] = price
+                self.forecasts[i] = forecast
+            else:
+                self.days.insert(i, day)
+                self.prices.insert(i, price)
+                self.forecasts.insert(i, forecast)
+        self.version += 1
+
+
+class ChartService:
+    def __init__(self, source="wallstreetzen"):
+        self.source = source
+        self.series = {}
+        self.cache = OrderedDict()
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def _add_rows(self, rows):
+        """Add rows to the series, returning the tickers that changed"""
+        changed = set()
+        for ticker, day, price, forecast in rows:
+            price = parse_number(price)
+            if np.isnan(price):
+                continue
+            series = self.series.setdefault(ticker, TickerSeries())
+            series.add(day.toordinal(), price, parse_number(forecast))
+            changed.add(ticker)
+        return changed
+
+    def _query(self, tickers=None, since=None, until=None):
+        query = db.session.query(
+            Ticker.symbol,
+            Wall_Street_Prediction.date,
+            Wall_Street_Prediction.price,
+            Wall_Street_Prediction.forecast_price
+        ).join(Ticker, Wall_Street_Prediction.ticker_id == Ticker.id).filter(
+            Wall_Street_Prediction.source == self.source,
+            Wall_Street_Prediction.date.isnot(None)
+        )
+        if tickers is not None:
+            query = query.filter(Ticker.symbol.in_(tickers))
+        if since is not None:
+            query = query.filter(Wall_Street_Prediction.date >= since)
+        if until is not None:
+            query = query.filter(Wall_Street_Prediction.date <= until)
+        return query.order_by(Wall_Street_Prediction.date).all()
+
+    def load(self):
+        """Build every ticker's series from the database, done once"""
+        with self.lock:
+            if not self.loaded:
+                self._add_rows(self._query())
+                self.loaded = True
+
+    def ingest(self, tickers):
+        """Add the rows just committed for these tickers, backfilled dates included"""
+        if not self.loaded:
+            return
+        dates = ingest_dates() or (date.today(), None)
+        rows = self._query(tickers, since=dates[0], until=dates[1])
+        with self.lock:
+            self._drop_cached(self._add_rows(rows))
+
+    def _drop_cached(self, tickers):
+        """Forget the downsamples of tickers whose series just changed"""
+        for key in [key for key in self.cache if key[0] in tickers]:
+            del self.cache[key]
+
+    def chart(self, ticker, points=200, method="lttb"):
+        """Return {'dates', 'price', 'forecast'} downsampled to at most `points` points"""
+        if not self.loaded:
+            self.load()
+        points = max(3, min(points, MAX_POINTS))
+
+        with self.lock:
+            series = self.series.get(ticker)
+            if series is None:
+                return None
+            key = (ticker, points, method)
+            cached = self.cache.get(key)
+            if cached and cached[0] == series.version:
+                self.cache.move_to_end(key)
+                return cached[1]
+
+            days = np.frombuffer(series.days, dtype=series.days.typecode).astype(np.float64)
+            prices = np.frombuffer(series.prices, dtype=np.float64).copy()
+            forecasts = np.frombuffer(series.forecasts, dtype=np.float64).copy()
+            version = series.version
+
+        keep = minmax(prices, points) if method == "minmax" else lttb(days, prices, points)
+        result = {
+            'dates': [date.fromordinal(int(day)).isoformat() for day in days[keep]],
+            'price': [round(float(value), 4) for value in prices[keep]],
+            'forecast': [None if np.isnan(value) else round(float(value), 4) for value in forecasts[keep]],
+        }
+
+        with self.lock:
+            self.cache[key] = (version, result)
+            self.cache.move_to_end(key)
+            while len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return result
+
+
+charts = ChartService()
+
+
+@on_ingest
+def update_charts(source, tickers):
+    if source == charts.source:
+        charts.ingest(tickers)
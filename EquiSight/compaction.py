@@ -0,0 +1,269 @@
+import argparse
+import math
+import os
+import time
+from datetime import date, timedelta
+from EquiSight.models import db, Wall_Street_Prediction, Prediction_Rollup
+from EquiSight.consensus import parse_number
+# Also registers export's listener that re-exports days whose rows were re-ingested
+from EquiSight import export
+
+# NOTE: compaction.py keeps the prediction history from growing forever
+# Rows older than the detail window are folded into weekly rollups, and weekly
+# rollups older than the weekly window are folded into monthly ones. Rows are
+# deleted in small batches, each its own transaction, so scrapers and page
+# loads never wait long on the SQLite write lock.
+#
+# Backtests and charts only read detail rows, so the background job leaves
+# history alone unless COMPACTION=1. Turning it on limits both to the detail
+# window.
+
+ENABLED = os.getenv("COMPACTION", "0") == "1"
+DETAIL_DAYS = int(os.getenv("COMPACTION_DETAIL_DAYS", "180"))
+WEEKLY_DAYS = int(os.getenv("COMPACTION_WEEKLY_DAYS", "730"))
+BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "2000"))
+# Pause between batches so other writers get a turn at the lock
+BATCH_PAUSE = 0.05
+# Free pages handed back to the filesystem per incremental vacuum step
+VACUUM_STEP_PAGES = int(os.getenv("COMPACTION_VACUUM_STEP_PAGES", "1000"))
+
+
+def period_start(day, period):
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _merge(rollup, price, forecast, row_date, score, recommendation, rows=1):
+    """Fold values into a rollup, price and forecast may be NaN"""
+    rollup.row_count = (rollup.row_count or 0) + rows
+    if not math.isnan(price):
+        rollup.price_sum = (rollup.price_sum or 0.0) + price * rows
+        rollup.price_count = (rollup.price_count or 0) + rows
+        rollup.price_min = price if rollup.price_min is None else min(rollup.price_min, price)
+        rollup.price_max = price if rollup.price_max is None else max(rollup.price_max, price)
+    if not math.isnan(forecast):
+        rollup.forecast_sum = (rollup.forecast_sum or 0.0) + forecast * rows
+        rollup.forecast_count = (rollup.forecast_count or 0) + rows
+    if rollup.last_date is None or (row_date and row_date >= rollup.last_date):
+        rollup.last_date = row_date
+        rollup.last_score = score
+        rollup.last_recommendation = recommendation
+
+
+class Rollups:
+    """Rollup rows for a batch, loaded or created on demand"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, ticker, ticker_id, source, period, start):
+        key = (ticker, source, period, start)
+        rollup = self.rows.get(key)
+        if rollup is None:
+            rollup = Prediction_Rollup.query.filter_by(
+                ticker=ticker, source=source, period=period, period_start=start
+            ).first()
+            if rollup is None:
+                rollup = Prediction_Rollup(
+                    ticker=ticker, ticker_id=ticker_id, source=source, period=period, period_start=start,
+                    row_count=0, price_sum=0.0, price_count=0, forecast_sum=0.0, forecast_count=0
+                )
+                db.session.add(rollup)
+            self.rows[key] = rollup
+        return rollup
+
+
+def _database_size():
+    """(page_count, page_size) for SQLite, None for other databases"""
+    if db.engine.dialect.name != "sqlite":
+        return None
+    with db.engine.connect() as conn:
+        page_count = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+    return page_count, page_size
+
+
+def compact_details(detail_days=DETAIL_DAYS, weekly_days=WEEKLY_DAYS, batch_size=BATCH_SIZE):
+    """Roll detail rows older than the window into rollups, returns rows compacted"""
+    today = date.today()
+    cutoff = today - timedelta(days=detail_days)
+    weekly_cutoff = today - timedelta(days=weekly_days)
+    compacted = 0
+
+    while True:
+        rows = Wall_Street_Prediction.query.filter(
+            Wall_Street_Prediction.date < cutoff
+        ).order_by(Wall_Street_Prediction.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        rollups = Rollups()
+        for row in rows:
+            period = "week" if row.date >= weekly_cutoff else "month"
+            rollup = rollups.get(row.ticker, row.ticker_id, row.source or "wallstreetzen", period, period_start(row.date, period))
+            _merge(rollup, parse_number(row.price), parse_number(row.forecast_price), row.date, row.score, row.recommendation)
+
+        ids = [row.id for row in rows]
+        db.session.flush()
+        Wall_Street_Prediction.query.filter(Wall_Street_Prediction.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        compacted += len(ids)
+        time.sleep(BATCH_PAUSE)
+
+    return compacted
+
+
+def compact_weekly(weekly_days=WEEKLY_DAYS, batch_size=BATCH_SIZE):
+    """Fold weekly rollups older than the weekly window into monthly ones, returns rollups compacted"""
+    cutoff = date.today() - timedelta(days=weekly_days)
+    compacted = 0
+
+    while True:
+        weeks = Prediction_Rollup.query.filter(
+            Prediction_Rollup.period == "week",
+            Prediction_Rollup.period_start < cutoff
+        ).order_by(Prediction_Rollup.id).limit(batch_size).all()
+        if not weeks:
+            break
+
+        rollups = Rollups()
+        for week in weeks:
+            month = rollups.get(week.ticker, week.ticker_id, week.source, "month", period_start(week.period_start, "month"))
+            month.row_count = (month.row_count or 0) + week.row_count
+            month.price_sum += week.price_sum
+            month.price_count += week.price_count
+            month.forecast_sum += week.forecast_sum
+            month.forecast_count += week.forecast_count
+            for bound, pick in (("price_min", min), ("price_max", max)):
+                values = [v for v in (getattr(month, bound), getattr(week, bound)) if v is not None]
+                setattr(month, bound, pick(values) if values else None)
+            if month.last_date is None or (week.last_date and week.last_date >= month.last_date):
+                month.last_date = week.last_date
+                month.last_score = week.last_score
+                month.last_recommendation = week.last_recommendation
+            db.session.delete(week)
+
+        db.session.commit()
+        compacted += len(weeks)
+        time.sleep(BATCH_PAUSE)
+
+    return compacted
+
+
+def enable_incremental_vacuum():
+    """Put a new SQLite database in incremental auto-vacuum mode, returns True if it is in that mode
+
+    The mode can only be switched before the first table is created (or with
+    a full VACUUM, see --convert), so this runs before the tables are made.
+    """
+    if db.engine.dialect.name != "sqlite":
+        return False
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA page_count").scalar() == 0:
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        # 2 is INCREMENTAL
+        return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+
+
+def convert_to_incremental_vacuum():
+    """Switch an existing SQLite database to incremental auto-vacuum
+
+    Needs one full VACUUM, which locks the database while it rewrites it, so
+    it only runs from the command line and never from the background job.
+    """
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+        return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+
+
+def reclaim_space(step_pages=VACUUM_STEP_PAGES):
+    """Give free pages back to the filesystem a few at a time, returns bytes freed
+
+    Each incremental_vacuum step is its own short transaction, with a pause
+    between them like the delete batches, so the write lock is never held
+    for long. Databases not in incremental mode keep their free pages for
+    SQLite to reuse.
+    """
+    before = _database_size()
+    if before is None:
+        return 0
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            print("Database isn't in incremental auto-vacuum mode, run compaction --convert once to reclaim space")
+            return 0
+        free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        while free:
+            conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(step_pages)})")
+            remaining = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+            if remaining >= free:
+                break
+            free = remaining
+            time.sleep(BATCH_PAUSE)
+    after = _database_size()
+    return max(0, (before[0] - after[0]) * before[1])
+
+
+def run_compaction(detail_days=DETAIL_DAYS, weekly_days=WEEKLY_DAYS, batch_size=BATCH_SIZE, vacuum=True):
+    """Run every compaction step and report what it did"""
+    start = time.monotonic()
+    rows_compacted = compact_details(detail_days, weekly_days, batch_size)
+    rollups_compacted = compact_weekly(weekly_days, batch_size)
+    bytes_freed = reclaim_space() if vacuum and (rows_compacted or rollups_compacted) else 0
+
+    if rows_compacted:
+        # Cached views may still be showing the rows we just removed
+        from EquiSight.tickers import predictions_view
+        predictions_view.invalidate()
+
+    report = {
+        'rows_compacted': rows_compacted,
+        'rollups_compacted': rollups_compacted,
+        'bytes_freed': bytes_freed,
+        'seconds': round(time.monotonic() - start, 2),
+    }
+    print(
+        f"Compaction rolled up {rows_compacted} rows and {rollups_compacted} weekly rollups, "
+        f"freed {bytes_freed} bytes in {report['seconds']}s"
+    )
+    return report
+
+
+def run_continuous(app, interval_seconds=24 * 3600, compact=None):
+    """Export and (when enabled) compact on a schedule, meant for a background thread"""
+    compact = ENABLED if compact is None else compact
+    while True:
+        try:
+            with app.app_context():
+                if export.available():
+                    # Archive detail rows to Parquet before compaction rolls them up
+                    export.export_new_partitions()
+                if compact:
+                    run_compaction()
+        except Exception as e:
+            print(f"Error in compaction: {e}")
+        time.sleep(interval_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll up and prune old prediction history")
+    parser.add_argument("--detail-days", type=int, default=DETAIL_DAYS, help="Days of full daily detail to keep")
+    parser.add_argument("--weekly-days", type=int, default=WEEKLY_DAYS, help="Days of weekly rollups before going monthly")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows deleted per transaction")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip reclaiming disk space")
+    parser.add_argument("--convert", action="store_true",
+                        help="Switch an existing SQLite database to incremental vacuum (one full VACUUM, locks the database)")
+    args = parser.parse_args()
+
+    from EquiSight import create_app
+    app = create_app(start_scrapers=False)
+    with app.app_context():
+        if args.convert:
+            print(f"Incremental vacuum {'enabled' if convert_to_incremental_vacuum() else 'not available'}")
+            return
+        run_compaction(args.detail_days, args.weekly_days, args.batch_size, vacuum=not args.no_vacuum)
+
+
+if __name__ == "__main__":
+    main()
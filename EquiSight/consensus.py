@@ -0,0 +1,221 @@
+import threading
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+from EquiSight.models import db, Ticker, Wall_Street_Prediction, Zack_Bull_Bear, Ticker_Consensus
+from EquiSight.ingest import on_ingest
+
+# NOTE: consensus.py combines every source into one ranked score per ticker
+# The raw per-source values live in a (tickers x sources) NumPy matrix that is
+# patched in place on each ingest, then normalized and ranked in one vectorized
+# pass. Only rows whose result changed are written to Ticker_Consensus.
+
+SOURCES = ("wallstreetzen", "stockinvest", "zacks")
+# How much each source counts towards the consensus, missing sources are left out
+WEIGHTS = np.array([0.4, 0.4, 0.2])
+# Bull/Bear picks older than this no longer count
+ZACKS_WINDOW_DAYS = 30
+
+
+def parse_number(text):
+    """Turn scraped strings like "$1,234.50" or "12.5%" into floats, NaN if impossible"""
+    if text is None:
+        return np.nan
+    try:
+        return float(str(text).replace('$', '').replace('%', '').replace(',', '').strip())
+    except ValueError:
+        return np.nan
+
+
+def percentile_ranks(values):
+    """Rank each non-NaN value within its column on a 0-1 scale, NaN stays NaN"""
+    result = np.full(values.shape, np.nan)
+    for column in range(values.shape[1]):
+        present = ~np.isnan(values[:, column])
+        count = present.sum()
+        if count == 0:
+            continue
+        if count == 1:
+            result[present, column] = 0.5
+            continue
+        # argsort of argsort gives each value's position in sorted order
+        order = values[present, column].argsort().argsort()
+        result[present, column] = order / (count - 1)
+    return result
+
+
+def compute_consensus(raw):
+    """Return (score, rank, source_count) arrays for a (tickers x sources) matrix of raw values"""
+    normalized = percentile_ranks(raw[:, :2])
+    # Zacks is already a signal, -1 bear and +1 bull maps straight onto 0-1
+    zacks = (raw[:, 2:3] + 1) / 2
+    normalized = np.hstack([normalized, zacks])
+
+    present = ~np.isnan(normalized)
+    weights = np.where(present, WEIGHTS, 0.0)
+    weight_totals = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = (np.where(present, normalized, 0.0) * weights).sum(axis=1) / weight_totals
+
+    # Rank 1 is the strongest consensus, tickers with no data sort last
+    order = np.argsort(-np.nan_to_num(score, nan=-1.0), kind="stable")
+    rank = np.empty(len(score), dtype=np.int64)
+    rank[order] = np.arange(1, len(score) + 1)
+    return score, rank, present.sum(axis=1)
+
+
+class ConsensusEngine:
+    def __init__(self):
+        self.tickers = []
+        self.index = {}
+        self.raw = np.empty((0, len(SOURCES)))
+        self.score = np.empty(0)
+        self.rank = np.empty(0, dtype=np.int64)
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def _row(self, ticker):
+        row = self.index.get(ticker)
+        if row is None:
+            row = len(self.tickers)
+            self.index[ticker] = row
+            self.tickers.append(ticker)
+        return row
+
+    def _grow(self):
+        missing = len(self.tickers) - len(self.raw)
+        if missing > 0:
+            self.raw = np.vstack([self.raw, np.full((missing, len(SOURCES)), np.nan)])
+            self.score = np.concatenate([self.score, np.full(missing, np.nan)])
+            self.rank = np.concatenate([self.rank, np.zeros(missing, dtype=np.int64)])
+
+    def _load_predictions(self, source, tickers=None):
+        """Set the raw value of each ticker's latest row for one prediction source"""
+        latest = db.session.query(
+            Wall_Street_Prediction.ticker_id,
+            db.func.max(Wall_Street_Prediction.date).label("date")
+        ).filter(Wall_Street_Prediction.source == source)
+        if tickers is not None:
+            latest = latest.join(Ticker, Wall_Street_Prediction.ticker_id == Ticker.id).filter(Ticker.symbol.in_(tickers))
+        latest = latest.group_by(Wall_Street_Prediction.ticker_id).subquery()
+
+        rows = db.session.query(
+            Ticker.symbol,
+            Wall_Street_Prediction.score,
+            Wall_Street_Prediction.price,
+            Wall_Street_Prediction.forecast_price
+        ).join(latest, db.and_(
+            Wall_Street_Prediction.ticker_id == latest.c.ticker_id,
+            Wall_Street_Prediction.date == latest.c.date
+        )).join(Ticker, Wall_Street_Prediction.ticker_id == Ticker.id).filter(
+            Wall_Street_Prediction.source == source
+        ).all()
+        if not rows:
+            return
+
+        tickers, scores, prices, forecasts = zip(*rows)
+        values = np.array([parse_number(score) for score in scores])
+        if source == "wallstreetzen":
+            # Upside is the score when it was scraped, otherwise work it out from the prices
+            prices = np.array([parse_number(price) for price in prices])
+            forecasts = np.array([parse_number(forecast) for forecast in forecasts])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                derived = (forecasts / prices - 1) * 100
+            values = np.where(np.isnan(values), derived, values)
+
+        rows_idx = np.array([self._row(ticker) for ticker in tickers])
+        self._grow()
+        self.raw[rows_idx, SOURCES.index(source)] = values
+
+    def _load_zacks(self):
+        """Set +1 for Bull and -1 for Bear from each ticker's latest pick in the window"""
+        column = SOURCES.index("zacks")
+        self.raw[:, column] = np.nan
+        since = date.today() - timedelta(days=ZACKS_WINDOW_DAYS)
+        picks = Zack_Bull_Bear.query.filter(Zack_Bull_Bear.date >= since).order_by(Zack_Bull_Bear.date).all()
+        # Oldest first, so a later pick overwrites an earlier one
+        for pick in picks:
+            for ticker, signal in ((pick.bull_ticker, 1.0), (pick.bear_ticker, -1.0)):
+                if ticker:
+                    row = self._row(ticker)
+                    self._grow()
+                    self.raw[row, column] = signal
+
+    def refresh(self, source=None, tickers=None):
+        """Reload raw values (all of them the first time) and write changed consensus rows"""
+        with self.lock:
+            if not self.loaded:
+                for prediction_source in ("wallstreetzen", "stockinvest"):
+                    self._load_predictions(prediction_source)
+                self._load_zacks()
+                self.loaded = True
+                # Nothing is known to be stored yet, so every row is written
+                previous_raw = np.full(self.raw.shape, np.inf)
+                previous_score = np.full(len(self.tickers), np.nan)
+                previous_rank = np.zeros(len(self.tickers), dtype=np.int64)
+            else:
+                previous_raw = self.raw.copy()
+                previous_score = self.score.copy()
+                previous_rank = self.rank.copy()
+                if source == "zacks":
+                    self._load_zacks()
+                elif source in SOURCES:
+                    self._load_predictions(source, tickers)
+                pad = len(self.tickers) - len(previous_score)
+                previous_raw = np.vstack([previous_raw, np.full((pad, len(SOURCES)), np.inf)])
+                previous_score = np.concatenate([previous_score, np.full(pad, np.nan)])
+                previous_rank = np.concatenate([previous_rank, np.zeros(pad, dtype=np.int64)])
+
+            if not self.tickers:
+                return 0
+            self.score, self.rank, source_count = compute_consensus(self.raw)
+
+            # Writing every row after each ingest is what we're avoiding, only touch changes.
+            # The raw values are stored too, so a new value that leaves the rank alone still counts
+            changed = np.flatnonzero(
+                (self.rank != previous_rank)
+                | ~np.isclose(self.score, previous_score, equal_nan=True)
+                | ~np.isclose(self.raw, previous_raw, equal_nan=True).all(axis=1)
+            )
+            self._write(changed, source_count)
+            return len(changed)
+
+    def _write(self, changed, source_count):
+        if not len(changed):
+            return
+        now = datetime.now(timezone.utc)
+        tickers = [self.tickers[i] for i in changed]
+        existing = {
+            row.ticker: row
+            for row in Ticker_Consensus.query.filter(Ticker_Consensus.ticker.in_(tickers))
+        }
+        for i, ticker in zip(changed, tickers):
+            row = existing.get(ticker)
+            if row is None:
+                row = Ticker_Consensus(ticker=ticker)
+                db.session.add(row)
+            raw = self.raw[i]
+            row.score = float(np.nan_to_num(self.score[i]))
+            row.rank = int(self.rank[i])
+            row.source_count = int(source_count[i])
+            row.wallstreetzen_upside = None if np.isnan(raw[0]) else float(raw[0])
+            row.stockinvest_score = None if np.isnan(raw[1]) else float(raw[1])
+            row.zacks_signal = None if np.isnan(raw[2]) else float(raw[2])
+            row.updated_at = now
+        db.session.commit()
+
+
+engine = ConsensusEngine()
+
+
+@on_ingest
+def refresh_consensus(source, tickers):
+    changed = engine.refresh(source, tickers)
+    print(f"Consensus updated for {changed} tickers after {source} ingest")
+
+
+def ranked_consensus(limit=None):
+    """Return the precomputed consensus rows, best first"""
+    query = Ticker_Consensus.query.order_by(Ticker_Consensus.rank)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
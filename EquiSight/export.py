@@ -0,0 +1,245 @@
+import argparse
+import importlib.util
+import json
+import os
+from datetime import date, timedelta
+from EquiSight.models import db, Wall_Street_Prediction, Ticker
+from EquiSight.ingest import on_ingest, ingest_dates
+from EquiSight.consensus import parse_number
+
+# pyarrow is only needed by the exporter and reader, it's imported on first use
+# so registering the ingest listener below costs the web app nothing
+pa = ds = pq = None
+
+# NOTE: export.py writes scraped history to date-partitioned Parquet files
+# Layout is <root>/date=YYYY-MM-DD/part-0.parquet (hive style), one directory
+# per scrape day. The highest row id exported for each day is kept in the
+# state file, and days that get new rows or are re-ingested are written again,
+# so analysts can scan years of history without touching the live database.
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join("instance", "history_parquet"))
+# Names starting with _ are skipped by pyarrow datasets
+STATE_FILE = "_export_state.json"
+DIRTY_LOG = "_dirty_dates.log"
+
+
+def available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _require_pyarrow():
+    global pa, ds, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("pyarrow is required for Parquet export, install it with pip install pyarrow")
+    pa, ds, pq = pyarrow, pyarrow.dataset, pyarrow.parquet
+
+
+def schema():
+    _require_pyarrow()
+    return pa.schema([
+        ("ticker", pa.dictionary(pa.int32(), pa.string())),
+        ("source", pa.dictionary(pa.int8(), pa.string())),
+        ("recommendation", pa.dictionary(pa.int16(), pa.string())),
+        ("score", pa.float64()),
+        ("score_text", pa.string()),
+        ("price", pa.float64()),
+        ("forecast_price", pa.float64()),
+        ("sector", pa.dictionary(pa.int16(), pa.string())),
+        ("industry", pa.dictionary(pa.int16(), pa.string())),
+        ("exchange", pa.dictionary(pa.int16(), pa.string())),
+    ])
+
+
+def _staging_dir(root):
+    # Next to the dataset, not in it, so nothing listing the dataset sees a half written file
+    return os.path.abspath(root).rstrip(os.sep) + ".staging"
+
+
+def load_state(root=EXPORT_DIR):
+    """{date: highest exported row id} for every day that has been exported"""
+    try:
+        with open(os.path.join(root, STATE_FILE), "r", encoding="utf-8") as f:
+            return {date.fromisoformat(day): max_id for day, max_id in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(root, state):
+    path = os.path.join(root, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({day.isoformat(): max_id for day, max_id in sorted(state.items())}, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def mark_dirty(days, root=EXPORT_DIR):
+    """Queue already exported days to be written again, e.g. after rows were overwritten"""
+    if not os.path.isdir(root):
+        return
+    with open(os.path.join(root, DIRTY_LOG), "a", encoding="utf-8") as f:
+        f.write("".join(f"{day.isoformat()}\n" for day in days))
+
+
+def _take_dirty(root):
+    """Claim the queued dirty days, returns (days, file to delete once they're exported)"""
+    path = os.path.join(root, DIRTY_LOG)
+    claimed = path + ".claimed"
+    # Renaming first means days queued while we export go to a new log
+    if not os.path.exists(claimed) and os.path.exists(path):
+        os.replace(path, claimed)
+    days = set()
+    try:
+        with open(claimed, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    days.add(date.fromisoformat(line.strip()))
+                except ValueError:
+                    pass
+    except OSError:
+        pass
+    return days, claimed
+
+
+@on_ingest
+def mark_ingested_dates(source, tickers):
+    # New rows raise a day's max id, but overwritten rows don't, so past days are queued here
+    dates = ingest_dates()
+    if dates is None:
+        return
+    first, last = dates
+    last = min(last, date.today() - timedelta(days=1))
+    if first > last:
+        return
+    mark_dirty([first + timedelta(days=offset) for offset in range((last - first).days + 1)])
+
+
+def _day_table(day):
+    """Build the Arrow table for one day straight from column tuples, no ORM objects"""
+    rows = db.session.query(
+        Ticker.symbol,
+        Wall_Street_Prediction.source,
+        Wall_Street_Prediction.recommendation,
+        Wall_Street_Prediction.score,
+        Wall_Street_Prediction.price,
+        Wall_Street_Prediction.forecast_price,
+        Ticker.sector,
+        Ticker.industry,
+        Ticker.exchange
+    ).join(Ticker, Wall_Street_Prediction.ticker_id == Ticker.id).filter(
+        Wall_Street_Prediction.date == day
+    ).order_by(Ticker.symbol).all()
+    if not rows:
+        return None
+
+    tickers, sources, recommendations, scores, prices, forecasts, sectors, industries, exchanges = zip(*rows)
+    arrays = [
+        pa.array(tickers, pa.string()).dictionary_encode(),
+        pa.array(sources, pa.string()).dictionary_encode(),
+        pa.array(recommendations, pa.string()).dictionary_encode(),
+        pa.array([parse_number(s) for s in scores], pa.float64(), from_pandas=True),
+        pa.array(scores, pa.string()),
+        pa.array([parse_number(p) for p in prices], pa.float64(), from_pandas=True),
+        pa.array([parse_number(f) for f in forecasts], pa.float64(), from_pandas=True),
+        pa.array(sectors, pa.string()).dictionary_encode(),
+        pa.array(industries, pa.string()).dictionary_encode(),
+        pa.array(exchanges, pa.string()).dictionary_encode(),
+    ]
+    target = schema()
+    arrays = [array.cast(field.type) for array, field in zip(arrays, target)]
+    return pa.Table.from_arrays(arrays, schema=target)
+
+
+def export_new_partitions(root=EXPORT_DIR, include_today=False):
+    """Write every day with rows that haven't been exported yet, returns the dates written
+
+    A day is written again when it has rows above its recorded max id or was
+    queued by mark_dirty(). Today is skipped by default because scrapers may
+    still add to it, and is never recorded as done, so an include_today
+    export is always redone.
+    """
+    _require_pyarrow()
+    os.makedirs(root, exist_ok=True)
+    state = load_state(root)
+    dirty, claimed = _take_dirty(root)
+    today = date.today()
+    last_day = today if include_today else today - timedelta(days=1)
+
+    max_ids = db.session.query(Wall_Street_Prediction.date, db.func.max(Wall_Street_Prediction.id)).filter(
+        Wall_Street_Prediction.date.isnot(None),
+        Wall_Street_Prediction.date <= last_day
+    ).group_by(Wall_Street_Prediction.date).all()
+    todo = sorted(
+        (day, max_id) for day, max_id in max_ids
+        if max_id > state.get(day, 0) or day in dirty or day == today
+    )
+
+    staging = _staging_dir(root)
+    os.makedirs(staging, exist_ok=True)
+    written = []
+    for day, max_id in todo:
+        table = _day_table(day)
+        if table is None:
+            continue
+        partition = os.path.join(root, f"date={day.isoformat()}")
+        staged = os.path.join(staging, f"{day.isoformat()}.parquet")
+        pq.write_table(table, staged, compression="zstd")
+        os.makedirs(partition, exist_ok=True)
+        # Replacing the file is atomic, readers see the old partition or the new one
+        os.replace(staged, os.path.join(partition, "part-0.parquet"))
+        if day != today:
+            state[day] = max_id
+        written.append(day)
+
+    _save_state(root, state)
+    if os.path.exists(claimed):
+        os.remove(claimed)
+    print(f"Exported {len(written)} partitions to {root}")
+    return written
+
+
+def read_history(root=EXPORT_DIR, start=None, end=None, tickers=None, sources=None, columns=None):
+    """Read exported history as a pyarrow Table
+
+    start and end are inclusive dates, tickers and sources are lists to keep.
+    Only the matching partitions and requested columns are read. Call
+    .to_pandas() on the result for a DataFrame.
+    """
+    _require_pyarrow()
+    dataset = ds.dataset(root, format="parquet", partitioning=ds.partitioning(
+        pa.schema([("date", pa.date32())]), flavor="hive"
+    ), exclude_invalid_files=True)
+
+    condition = None
+
+    def both(current, new):
+        return new if current is None else current & new
+
+    if start is not None:
+        condition = both(condition, ds.field("date") >= start)
+    if end is not None:
+        condition = both(condition, ds.field("date") <= end)
+    if tickers:
+        condition = both(condition, ds.field("ticker").isin(list(tickers)))
+    if sources:
+        condition = both(condition, ds.field("source").isin(list(sources)))
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export scraped history to partitioned Parquet")
+    parser.add_argument("--root", default=EXPORT_DIR, help="Export directory")
+    parser.add_argument("--include-today", action="store_true", help="Also export today's partial day")
+    args = parser.parse_args()
+
+    from EquiSight import create_app
+    app = create_app(start_scrapers=False)
+    with app.app_context():
+        export_new_partitions(args.root, args.include_today)
+
+
+if __name__ == "__main__":
+    main()
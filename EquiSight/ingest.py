@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import date, datetime, timezone
+from EquiSight.models import db, Wall_Street_Prediction, Ticker, Ticker_Change
+
+# NOTE: ingest.py is the single path scraped predictions take into the database
+
+# Functions called as listener(source, tickers) after every successful commit
+_listeners = []
+# When the ingest currently being handed to listeners on this thread was committed
+_current = threading.local()
+
+
+def on_ingest(listener):
+    """Register a function to run after scraped data is committed, usable as a decorator"""
+    _listeners.append(listener)
+    return listener
+
+
+def notify_ingest(source, tickers, dates=None, committed_at=None):
+    """Tell every listener which tickers a source just committed, and for which dates
+
+    committed_at is time.monotonic() taken when the commit finished, so
+    ingest_age() counts from the commit rather than from this call.
+    """
+    tickers = {ticker for ticker in tickers if ticker}
+    if not tickers:
+        return
+    _current.committed_at = time.monotonic() if committed_at is None else committed_at
+    _current.dates = (min(dates), max(dates)) if dates else None
+    try:
+        for listener in list(_listeners):
+            try:
+                listener(source, tickers)
+            except Exception as e:
+                # Derived data can always be rebuilt, never fail the scrape for it
+                print(f"Ingest listener {getattr(listener, '__name__', listener)} failed: {e}")
+    finally:
+        _current.committed_at = None
+        _current.dates = None
+
+
+def ingest_age():
+    """Seconds since the ingest being handled on this thread was committed, None outside a listener"""
+    committed_at = getattr(_current, 'committed_at', None)
+    return None if committed_at is None else time.monotonic() - committed_at
+
+
+def ingest_dates():
+    """(first, last) date of the rows in the ingest being handled on this thread, None if unknown"""
+    return getattr(_current, 'dates', None)
+
+
+TRACKED_FIELDS = ("sector", "industry", "exchange")
+
+
+def upsert_tickers(stocks):
+    """Make sure every stock's symbol has a Ticker row, returning {symbol: Ticker}
+
+    Non-empty sector, industry and exchange values overwrite the stored ones,
+    and every change is recorded in Ticker_Change. The caller commits.
+    """
+    symbols = {stock['ticker'] for stock in stocks}
+    tickers = {ticker.symbol: ticker for ticker in Ticker.query.filter(Ticker.symbol.in_(symbols))}
+    now = datetime.now(timezone.utc)
+
+    for stock in stocks:
+        ticker = tickers.get(stock['ticker'])
+        if ticker is None:
+            ticker = Ticker(symbol=stock['ticker'], updated_at=now)
+            db.session.add(ticker)
+            tickers[stock['ticker']] = ticker
+
+        for field in TRACKED_FIELDS:
+            value = (stock.get(field) or '').strip() or None
+            old_value = getattr(ticker, field)
+            if value is None or value == old_value:
+                continue
+            # A brand new ticker filling in its details isn't a change worth keeping
+            if ticker.id is not None and old_value is not None:
+                db.session.add(Ticker_Change(ticker_id=ticker.id, field=field, old_value=old_value, new_value=value, changed_at=now))
+            setattr(ticker, field, value)
+            ticker.updated_at = now
+
+    # Ids are needed for the prediction rows that point at these tickers
+    db.session.flush()
+    return tickers
+
+
+def save_predictions(stocks, source, overwrite=False):
+    """Save scraped stock dicts for a source, returning (inserted, updated) counts
+
+    Each stock needs ticker, score, recommendation and price keys, and may
+    carry forecast_price, date, sector, industry and exchange. Sector,
+    industry and exchange go to the Ticker table, not the prediction row.
+    Rows that already exist for the same ticker, date and source are
+    skipped unless overwrite is set.
+    """
+    if not stocks:
+        print("No stocks to save")
+        return 0, 0
+
+    today = date.today()
+    dates = {stock.get('date') or today for stock in stocks}
+
+    tickers = upsert_tickers(stocks)
+
+    # One query for every row we could collide with instead of one per stock
+    existing = {
+        (row.ticker_id, row.date): row
+        for row in Wall_Street_Prediction.query.filter(
+            Wall_Street_Prediction.source == source,
+            Wall_Street_Prediction.date.in_(dates)
+        )
+    }
+
+    inserted_count = 0
+    updated_count = 0
+    for stock in stocks:
+        stock_date = stock.get('date') or today
+        score = stock.get('score')
+        values = {
+            'score': str(score) if score is not None else None,
+            'recommendation': stock.get('recommendation'),
+            'price': stock.get('price'),
+            'forecast_price': stock.get('forecast_price'),
+        }
+
+        ticker_id = tickers[stock['ticker']].id
+        row = existing.get((ticker_id, stock_date))
+        if row:
+            if overwrite:
+                for key, value in values.items():
+                    setattr(row, key, value)
+                updated_count += 1
+            continue
+
+        row = Wall_Street_Prediction(ticker_id=ticker_id, date=stock_date, source=source, **values)
+        db.session.add(row)
+        existing[(ticker_id, stock_date)] = row
+        inserted_count += 1
+
+    try:
+        db.session.commit()
+        committed_at = time.monotonic()
+        print(f"Inserted {inserted_count} new {source} predictions, updated {updated_count}")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving to database: {e}")
+        raise
+
+    if inserted_count or updated_count:
+        notify_ingest(source, {stock['ticker'] for stock in stocks}, dates, committed_at)
+    return inserted_count, updated_count
@@ -24,15 +24,41 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+# Ticker dimension table, one row per symbol so daily prediction rows don't repeat this
+class Ticker(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(10), unique=True, nullable=False, index=True)
+    sector = db.Column(db.String(100), nullable=True, index=True)
+    industry = db.Column(db.String(100), nullable=True, index=True)
+    exchange = db.Column(db.String(20), nullable=True)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+# History of sector/industry/exchange changes for a ticker
+class Ticker_Change(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    ticker_id = db.Column(db.Integer, db.ForeignKey("ticker.id"), nullable=False, index=True)
+    field = db.Column(db.String(20), nullable=False)
+    old_value = db.Column(db.String(100), nullable=True)
+    new_value = db.Column(db.String(100), nullable=True)
+    changed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
 # Stock predictions table (Note the required syntax to set these attributes to the table)
+# The symbol lives in Ticker, each row only stores the ticker's id
 class Wall_Street_Prediction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    ticker = db.Column(db.String(10), nullable=False)
+    ticker_id = db.Column(db.Integer, db.ForeignKey("ticker.id"), nullable=False, index=True)
+    ticker_info = db.relationship("Ticker", lazy="joined", innerjoin=True)
     score = db.Column(db.String(20), nullable=True)
-    recommendation = db.Column(db.String(10), nullable=True)
+    recommendation = db.Column(db.String(20), nullable=True)
     price = db.Column(db.String(10), nullable=True)
     forecast_price = db.Column(db.String(10), nullable=True)
     date = db.Column(db.Date, default=date.today())
+    # Which site the row was scraped from, older rows all came from WallStreetZen
+    source = db.Column(db.String(20), nullable=False, default="wallstreetzen", server_default="wallstreetzen")
+
+    @property
+    def ticker(self):
+        return self.ticker_info.symbol
 
 # Zack Bulls and Bears
 class Zack_Bull_Bear(db.Model):
@@ -41,4 +67,106 @@ class Zack_Bull_Bear(db.Model):
     bear_ticker = db.Column(db.String(10), nullable=False)
     bull_link = db.Column(db.String(100), nullable=False)
     bear_link = db.Column(db.String(100), nullable=False)
-    date = db.Column(db.Date, default=date.today)
\ No newline at end of file
+    date = db.Column(db.Date, default=date.today)
+
+# Weekly or monthly aggregate of prediction rows that aged out of the detail window (see compaction.py)
+class Prediction_Rollup(db.Model):
+    __table_args__ = (db.UniqueConstraint("ticker", "source", "period", "period_start"),)
+    id = db.Column(db.Integer, primary_key=True)
+    ticker = db.Column(db.String(10), nullable=False, index=True)
+    ticker_id = db.Column(db.Integer, db.ForeignKey("ticker.id"), nullable=True, index=True)
+    source = db.Column(db.String(20), nullable=False)
+    period = db.Column(db.String(5), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    # Sums and counts rather than averages so rollups can keep absorbing rows
+    price_sum = db.Column(db.Float, nullable=False, default=0.0)
+    price_count = db.Column(db.Integer, nullable=False, default=0)
+    price_min = db.Column(db.Float, nullable=True)
+    price_max = db.Column(db.Float, nullable=True)
+    forecast_sum = db.Column(db.Float, nullable=False, default=0.0)
+    forecast_count = db.Column(db.Integer, nullable=False, default=0)
+    last_date = db.Column(db.Date, nullable=True)
+    last_score = db.Column(db.String(20), nullable=True)
+    last_recommendation = db.Column(db.String(20), nullable=True)
+
+    @property
+    def avg_price(self):
+        return self.price_sum / self.price_count if self.price_count else None
+
+    @property
+    def avg_forecast(self):
+        return self.forecast_sum / self.forecast_count if self.forecast_count else None
+
+# Precomputed cross-source consensus, one row per ticker (see consensus.py)
+class Ticker_Consensus(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    ticker = db.Column(db.String(10), unique=True, nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    rank = db.Column(db.Integer, nullable=False, index=True)
+    source_count = db.Column(db.Integer, nullable=False)
+    wallstreetzen_upside = db.Column(db.Float, nullable=True)
+    stockinvest_score = db.Column(db.Float, nullable=True)
+    zacks_signal = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+# Tickers a user follows
+class Watchlist_Item(db.Model):
+    __table_args__ = (db.UniqueConstraint("user_id", "ticker"),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    ticker = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+# A condition on one ticker that alerts its user when met (see alerts.py)
+class Alert_Rule(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    # Indexed so an ingest only loads the rules for the tickers it touched
+    ticker = db.Column(db.String(10), nullable=False, index=True)
+    kind = db.Column(db.String(30), nullable=False)
+    threshold = db.Column(db.Float, nullable=True)
+    # What the rule saw last time, so it only fires when something changes
+    last_state = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+# A fired alert waiting for its user
+class Alert(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey("alert__rule.id", ondelete="SET NULL"), nullable=True)
+    ticker = db.Column(db.String(10), nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    source = db.Column(db.String(20), nullable=False)
+    # Milliseconds from the scrape commit to this alert being saved
+    latency_ms = db.Column(db.Float, nullable=True)
+    read = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+def upgrade_schema():
+    """Add columns that were introduced after a table was first created
+
+    db.create_all() only creates missing tables, so existing databases would
+    otherwise be stuck on the old column set. New columns must be nullable or
+    have a server default.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(db.text(ddl))
+
+            # Indexes declared on new columns aren't created by ADD COLUMN either
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
@@ -0,0 +1,149 @@
+# browser_pool.py
+# A long lived browser shared between scrape cycles, with concurrent page loads across tabs
+import threading
+import time
+from contextlib import contextmanager
+
+from EquiSight.scraping_scripts.rate_limiter import CircuitOpenError
+from EquiSight.scraping_scripts.browser_profile import quit_browser
+
+
+class BrowserPool:
+    """Keeps one browser alive between cycles and hands it out to one user at a time"""
+
+    def __init__(self, factory):
+        # factory() returns a new webdriver or None when Chrome fails to start
+        self.factory = factory
+        self.driver = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def browser(self):
+        """Yield the pooled driver, starting a fresh one if needed"""
+        with self.lock:
+            if self.driver is None:
+                self.driver = self.factory()
+            if self.driver is None:
+                raise RuntimeError("Failed to start browser")
+            try:
+                yield self.driver
+            except Exception:
+                # A broken session is not worth keeping around
+                self._quit()
+                raise
+
+    def recycle(self):
+        """Quit the browser, the next user gets a new one"""
+        with self.lock:
+            self._quit()
+
+    def abort(self):
+        """Quit the browser without waiting for its current user, used to cancel a stuck load"""
+        self._quit()
+
+    def _quit(self):
+        if self.driver is not None:
+            quit_browser(self.driver)
+            self.driver = None
+
+
+def _close_extra_tabs(driver, keep):
+    for handle in driver.window_handles:
+        if handle != keep:
+            driver.switch_to.window(handle)
+            driver.close()
+    driver.switch_to.window(keep)
+
+
+def load_in_tabs(driver, urls, guard, ready_selector, timeout=30, settle=3, poll=0.25, on_ready=None):
+    """Load urls concurrently across up to guard.max_concurrency tabs of one browser
+
+    Each tab is first cleared to about:blank so the page it showed before can't
+    pass as the new one. Navigation is then started with window.location so it
+    doesn't block, and every tab is polled until the ready selector appears or
+    the timeout passes.
+    Returns (url, html, seconds) tuples, html is None for pages that never
+    became ready. seconds is how long each page took from navigation to ready.
+    on_ready(driver, url) is called with each ready page's tab selected.
+    """
+    pending = list(urls)
+    results = []
+    main_handle = driver.current_window_handle
+    handles = [main_handle]
+    while len(handles) < min(guard.max_concurrency, len(pending)):
+        driver.switch_to.new_window("tab")
+        handles.append(driver.current_window_handle)
+
+    # handle -> (url, started, ready_at)
+    active = {}
+    ready_script = (
+        "return location.href !== 'about:blank' && document.readyState !== 'loading'"
+        " && document.querySelector(arguments[0]) !== null;"
+    )
+
+    def dispatch(handle):
+        while pending:
+            try:
+                guard.before_request()
+            except CircuitOpenError as e:
+                print(f"Not loading remaining pages: {e}")
+                pending.clear()
+                return False
+            url = pending.pop(0)
+            try:
+                driver.switch_to.window(handle)
+                # Blocks until the old document is gone, a reused tab would otherwise look ready at once
+                driver.get("about:blank")
+                driver.execute_script("window.location.href = arguments[0];", url)
+            except Exception as e:
+                # Every allowed request reports back, a half-open breaker waits on it
+                print(f"Failed to start loading {url}: {e}")
+                guard.record_failure("error")
+                results.append((url, None, 0.0))
+                continue
+            active[handle] = (url, time.monotonic(), None)
+            return True
+        return False
+
+    try:
+        for handle in handles:
+            if not pending or not dispatch(handle):
+                break
+
+        while active:
+            for handle in list(active):
+                url, started, ready_at = active[handle]
+                now = time.monotonic()
+                driver.switch_to.window(handle)
+
+                if ready_at is None:
+                    try:
+                        is_ready = driver.execute_script(ready_script, ready_selector)
+                    except Exception:
+                        is_ready = False
+                    if is_ready:
+                        # Give dynamic content a moment before reading the DOM
+                        active[handle] = (url, started, now)
+                        continue
+                    if now - started < timeout:
+                        continue
+                    print(f"Timed out waiting for {url}")
+                    guard.record_failure("timeout")
+                    results.append((url, None, now - started))
+                elif now - ready_at >= settle:
+                    guard.record_success()
+                    if on_ready:
+                        on_ready(driver, url)
+                    results.append((url, driver.page_source, now - started))
+                else:
+                    continue
+
+                del active[handle]
+                if pending:
+                    dispatch(handle)
+
+            time.sleep(poll)
+    finally:
+        _close_extra_tabs(driver, main_handle)
+
+    return results
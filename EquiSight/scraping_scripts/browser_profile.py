@@ -0,0 +1,303 @@
+# browser_profile.py
+# Optional persistent Chrome profiles, so cached JS, CSS and fonts survive between cycles
+#
+# With BROWSER_PROFILES=1 every browser gets a profile directory of its own
+# (one per source, more slots when a source runs several browsers at once)
+# instead of a throwaway incognito one. Each profile is locked while a browser
+# uses it, wiped when Chrome can't start on it or its files are damaged, and
+# rotated after a few days so cookies and cache never go stale for long.
+# Transfer metrics read from the Performance API show what the cache saves.
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+ENABLED = os.getenv("BROWSER_PROFILES", "0") == "1"
+PROFILE_DIR = os.getenv("BROWSER_PROFILE_DIR", os.path.join("instance", "browser_profiles"))
+CACHE_BYTES = int(os.getenv("BROWSER_CACHE_MB", "100")) * 1024 * 1024
+ROTATE_SECONDS = float(os.getenv("BROWSER_PROFILE_ROTATE_DAYS", "7")) * 24 * 3600
+# Profiles per source, a browser that finds them all locked gets a throwaway one
+MAX_SLOTS = 4
+# A profile this many times bigger than its cache has grown something we don't want
+MAX_PROFILE_FACTOR = 3
+METRICS_PATH = os.getenv("TRANSFER_METRICS_PATH", os.path.join("instance", "transfer_metrics.jsonl"))
+
+# Left behind by a Chrome that crashed, and make the next one think the profile is in use
+SINGLETON_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+# Chrome refuses or misbehaves when these aren't valid JSON
+JSON_FILES = ("Local State", os.path.join("Default", "Preferences"))
+# What Chrome says when it can't start on a damaged profile, lowercased
+PROFILE_ERROR_HINTS = ("user data directory", "user-data-dir", "profile", "devtoolsactiveport", "chrome failed to start")
+
+
+def _try_lock(fd):
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd):
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class BrowserProfile:
+    """A profile directory held by one browser until release()"""
+
+    def __init__(self, source, path, lock_fd):
+        self.source = source
+        self.path = path
+        self.lock_fd = lock_fd
+
+    @property
+    def marker_path(self):
+        return os.path.join(self.path, ".created")
+
+    def prepare(self):
+        """Rotate, repair or create the directory before Chrome starts on it"""
+        if os.path.isdir(self.path):
+            reason = self._wipe_reason()
+            if reason:
+                print(f"Resetting {self.source} browser profile: {reason}")
+                self.wipe()
+            else:
+                for name in SINGLETON_FILES:
+                    try:
+                        os.remove(os.path.join(self.path, name))
+                    except OSError:
+                        pass
+        if not os.path.isdir(self.path):
+            os.makedirs(os.path.join(self.path, "Cache"), exist_ok=True)
+            with open(self.marker_path, "w", encoding="utf-8") as f:
+                f.write(str(time.time()))
+
+    def _wipe_reason(self):
+        try:
+            with open(self.marker_path, "r", encoding="utf-8") as f:
+                created = float(f.read().strip())
+        except (OSError, ValueError):
+            return "missing creation marker"
+        if time.time() - created > ROTATE_SECONDS:
+            return "rotation"
+        for name in JSON_FILES:
+            path = os.path.join(self.path, name)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    json.load(f)
+            except (OSError, ValueError):
+                return f"corrupt {name}"
+        if _dir_size(self.path) > CACHE_BYTES * MAX_PROFILE_FACTOR:
+            return "over size limit"
+        return None
+
+    def chrome_arguments(self):
+        return [
+            f"--user-data-dir={os.path.abspath(self.path)}",
+            f"--disk-cache-dir={os.path.abspath(os.path.join(self.path, 'Cache'))}",
+            f"--disk-cache-size={CACHE_BYTES}",
+        ]
+
+    def wipe(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def release(self):
+        if self.lock_fd is not None:
+            _unlock(self.lock_fd)
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+
+def acquire_profile(source):
+    """Lock a free profile for a source, None when profiles are off or all in use"""
+    if not ENABLED:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    for slot in range(MAX_SLOTS):
+        path = os.path.join(PROFILE_DIR, f"{source}-{slot}")
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT)
+        if not _try_lock(fd):
+            os.close(fd)
+            continue
+        profile = BrowserProfile(source, path, fd)
+        try:
+            profile.prepare()
+        except OSError as e:
+            print(f"Failed to prepare {source} browser profile: {e}")
+            profile.release()
+            return None
+        return profile
+    print(f"Every {source} browser profile is in use, using a throwaway one")
+    return None
+
+
+def _profile_error(error):
+    """True when Chrome itself refused to start on the profile
+
+    Anything else, like chromedriver failing to download, says nothing about
+    the profile and must not cost it its cache.
+    """
+    if "SessionNotCreatedException" not in (cls.__name__ for cls in type(error).__mro__):
+        return False
+    message = str(error).lower()
+    return any(hint in message for hint in PROFILE_ERROR_HINTS)
+
+
+def start_browser(source, build_options, start, incognito=True):
+    """Start Chrome on the source's persistent profile when enabled, a throwaway one otherwise
+
+    build_options() returns a fresh Options with the scraper's own arguments
+    and start(options) returns a driver. If Chrome refuses to start on a
+    profile it is treated as corrupt, wiped and tried once more, any other
+    startup error is raised as is. Without a profile the
+    browser runs incognito if asked to. Quit the driver with quit_browser()
+    so its profile is released.
+    """
+    for attempt in range(2):
+        profile = acquire_profile(source)
+        options = build_options()
+        if profile is None:
+            if incognito:
+                options.add_argument("--incognito")
+            return start(options)
+        for argument in profile.chrome_arguments():
+            options.add_argument(argument)
+        try:
+            driver = start(options)
+        except Exception as e:
+            if not _profile_error(e):
+                profile.release()
+                raise
+            print(f"Chrome failed to start on the {source} profile, wiping it")
+            profile.wipe()
+            profile.release()
+            if attempt:
+                raise
+            continue
+        driver.equisight_profile = profile
+        return driver
+
+
+def quit_browser(driver):
+    """Quit a driver and release the profile it was started on"""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    profile = getattr(driver, "equisight_profile", None)
+    if profile is not None:
+        profile.release()
+
+
+# Sums over the page and every resource it loaded. Cross-origin resources
+# without Timing-Allow-Origin report zero sizes, so the totals are a lower bound.
+TRANSFER_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation');
+const entries = navigation.concat(performance.getEntriesByType('resource'));
+let transferred = 0, fromCache = 0, cached = 0;
+for (const entry of entries) {
+  transferred += entry.transferSize || 0;
+  if (!entry.transferSize && entry.decodedBodySize) {
+    cached += 1;
+    fromCache += entry.encodedBodySize || entry.decodedBodySize;
+  }
+}
+const nav = navigation[0];
+return {
+  resources: entries.length,
+  cached_resources: cached,
+  bytes_transferred: transferred,
+  bytes_from_cache: fromCache,
+  load_ms: nav ? (nav.loadEventEnd || nav.domContentLoadedEventEnd || performance.now()) - nav.startTime : null
+};
+"""
+
+
+class TransferMetrics:
+    """Per-source bytes and load times for the current scrape cycle"""
+
+    def __init__(self, path=METRICS_PATH):
+        self.path = path
+        self.sources = {}
+        self.lock = threading.Lock()
+
+    def record(self, source, driver):
+        """Add the page the driver is showing, never fails the scrape"""
+        try:
+            stats = driver.execute_script(TRANSFER_SCRIPT)
+        except Exception as e:
+            print(f"Failed to read transfer stats for {source}: {e}")
+            return None
+        with self.lock:
+            totals = self.sources.setdefault(source, {
+                'pages': 0, 'resources': 0, 'cached_resources': 0,
+                'bytes_transferred': 0, 'bytes_from_cache': 0, 'load_ms': 0.0,
+            })
+            totals['pages'] += 1
+            for key in ('resources', 'cached_resources', 'bytes_transferred', 'bytes_from_cache'):
+                totals[key] += int(stats.get(key) or 0)
+            totals['load_ms'] += float(stats.get('load_ms') or 0.0)
+        return stats
+
+    def end_cycle(self, source=None):
+        """Print and append this cycle's totals to the metrics file, then start over
+
+        Scrapers running in their own threads pass their source so they only
+        take their own totals.
+        """
+        with self.lock:
+            if source is None:
+                sources, self.sources = self.sources, {}
+            else:
+                sources = {source: self.sources.pop(source)} if source in self.sources else {}
+        if not sources:
+            return {}
+        for source, totals in sources.items():
+            totals['avg_load_ms'] = round(totals.pop('load_ms') / totals['pages'], 1)
+            print(
+                f"{source}: {totals['bytes_transferred'] / 1024:.0f} KB transferred, "
+                f"{totals['bytes_from_cache'] / 1024:.0f} KB from cache "
+                f"({totals['cached_resources']}/{totals['resources']} resources), "
+                f"{totals['avg_load_ms']:.0f} ms average load"
+            )
+        record = {'at': datetime.now().isoformat(timespec="seconds"), 'profiles': ENABLED, 'sources': sources}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Failed to save transfer metrics: {e}")
+        return sources
+
+
+transfer_metrics = TransferMetrics()
@@ -0,0 +1,196 @@
+# html_archive.py
+# Compressed, content-addressed store of every page the scrapers fetch
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# zstd is faster and smaller, but gzip is always available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = os.getenv("HTML_ARCHIVE_DIR", os.path.join("instance", "html_archive"))
+RETENTION_DAYS = int(os.getenv("HTML_ARCHIVE_RETENTION_DAYS", "90"))
+MAX_BYTES = int(os.getenv("HTML_ARCHIVE_MAX_MB", "2048")) * 1024 * 1024
+# How often store() is allowed to run a retention pass
+PRUNE_INTERVAL = 3600
+
+
+class HtmlArchive:
+    def __init__(self, root=ARCHIVE_DIR, retention_days=RETENTION_DAYS, max_bytes=MAX_BYTES):
+        self.root = root
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.sqlite3")
+        self.last_prune = 0.0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_source_date ON pages (source, date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_sha256 ON pages (sha256)")
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def _object_path(self, sha, ext):
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.html.{ext}")
+
+    def _find_object(self, sha):
+        for ext in ("zst", "gz"):
+            path = self._object_path(sha, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _compress(self, raw):
+        """Return (extension, compressed bytes)"""
+        if zstandard:
+            return "zst", zstandard.ZstdCompressor(level=10).compress(raw)
+        return "gz", gzip.compress(raw, compresslevel=6)
+
+    def store(self, source, url, html, fetched_at=None):
+        """Store a page and index it under its source and date, returning its hash"""
+        fetched_at = fetched_at or datetime.now()
+        raw = html.encode("utf-8")
+        sha = hashlib.sha256(raw).hexdigest()
+
+        # Compress outside the lock, it's the slow part. Identical pages are only written once
+        data = None if self._find_object(sha) else self._compress(raw)
+
+        # prune() takes the same lock, so it can't delete the object before its index row exists
+        with self.lock:
+            path = self._find_object(sha)
+            if not path:
+                if data is None:
+                    data = self._compress(raw)
+                ext, payload = data
+                path = self._object_path(sha, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO pages (source, url, date, fetched_at, sha256, size, stored_size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (source, url, fetched_at.date().isoformat(), fetched_at.isoformat(), sha, len(raw), os.path.getsize(path)),
+                )
+
+        if time.time() - self.last_prune > PRUNE_INTERVAL:
+            self.prune()
+        return sha
+
+    def load(self, sha):
+        """Return the decompressed HTML for a hash"""
+        path = self._find_object(sha)
+        if not path:
+            raise FileNotFoundError(f"No archived page with hash {sha}")
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.endswith(".zst"):
+            if not zstandard:
+                raise RuntimeError("zstandard is required to read .zst archives")
+            raw = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            raw = gzip.decompress(data)
+        return raw.decode("utf-8")
+
+    def entries(self, source=None, since=None, until=None):
+        """List (source, url, date, sha256) index rows, oldest first"""
+        query = "SELECT source, url, date, sha256 FROM pages WHERE 1=1"
+        params = []
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        if since:
+            query += " AND date >= ?"
+            params.append(since.isoformat())
+        if until:
+            query += " AND date <= ?"
+            params.append(until.isoformat())
+        query += " ORDER BY fetched_at"
+        with self._connect() as conn:
+            return [
+                (row[0], row[1], date.fromisoformat(row[2]), row[3])
+                for row in conn.execute(query, params)
+            ]
+
+    def prune(self):
+        """Apply the age and size limits, deleting objects nothing points at any more"""
+        with self.lock:
+            self.last_prune = time.time()
+            cutoff = (date.today() - timedelta(days=self.retention_days)).isoformat()
+            with self._connect() as conn:
+                removed = conn.execute("DELETE FROM pages WHERE date < ?", (cutoff,)).rowcount
+
+                # Drop the oldest days until the unique objects fit the size budget
+                total = conn.execute(
+                    "SELECT COALESCE(SUM(stored_size), 0) FROM (SELECT DISTINCT sha256, stored_size FROM pages)"
+                ).fetchone()[0]
+                while total > self.max_bytes:
+                    oldest = conn.execute("SELECT MIN(date) FROM pages").fetchone()[0]
+                    if oldest is None:
+                        break
+                    removed += conn.execute("DELETE FROM pages WHERE date = ?", (oldest,)).rowcount
+                    total = conn.execute(
+                        "SELECT COALESCE(SUM(stored_size), 0) FROM (SELECT DISTINCT sha256, stored_size FROM pages)"
+                    ).fetchone()[0]
+
+                referenced = {row[0] for row in conn.execute("SELECT DISTINCT sha256 FROM pages")}
+
+            freed = 0
+            objects_dir = os.path.join(self.root, "objects")
+            for dirpath, _, filenames in os.walk(objects_dir):
+                for filename in filenames:
+                    # Another process may be halfway through writing this one
+                    if filename.endswith(".tmp"):
+                        continue
+                    sha = filename.split(".", 1)[0]
+                    if sha not in referenced:
+                        path = os.path.join(dirpath, filename)
+                        freed += os.path.getsize(path)
+                        os.remove(path)
+
+            if removed or freed:
+                print(f"Archive prune removed {removed} index rows and freed {freed} bytes")
+            return removed, freed
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive():
+    """Return the shared archive, creating it on first use"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = HtmlArchive()
+        return _archive
+
+
+def archive_page(source, url, html):
+    """Store a fetched page without ever letting archiving break a scrape"""
+    try:
+        return get_archive().store(source, url, html)
+    except Exception as e:
+        print(f"Failed to archive page from {source}: {e}")
+        return None
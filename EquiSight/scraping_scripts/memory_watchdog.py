@@ -0,0 +1,115 @@
+# memory_watchdog.py
+# Tracks Chrome and Python memory per scrape cycle and recycles browsers that grow too big
+#
+# A long lived browser (the StockInvest pool) slowly grows with every page it
+# loads. The watchdog samples the resident memory of each browser's process
+# tree and of this Python process, and recycles a browser once it goes past
+# CHROME_RSS_LIMIT_MB so a worker running for weeks stays within budget. The
+# per-fetch browsers of the other scrapers are checked between retries.
+import gc
+import os
+import threading
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+CHROME_LIMIT_BYTES = int(os.getenv("CHROME_RSS_LIMIT_MB", "1024")) * 1024 * 1024
+PYTHON_LIMIT_BYTES = int(os.getenv("PYTHON_RSS_LIMIT_MB", "768")) * 1024 * 1024
+
+MB = 1024 * 1024
+
+
+def browser_rss(driver):
+    """Resident bytes of chromedriver and every Chrome process under it, None if unknown"""
+    if psutil is None or driver is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for child in processes:
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+def python_rss():
+    """Resident bytes of this process, None without psutil"""
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class MemoryWatchdog:
+    def __init__(self, chrome_limit=CHROME_LIMIT_BYTES, python_limit=PYTHON_LIMIT_BYTES):
+        self.chrome_limit = chrome_limit
+        self.python_limit = python_limit
+        # source -> peak browser bytes seen this cycle
+        self.peaks = {}
+        self.recycled = []
+        self.lock = threading.Lock()
+
+    def record(self, source, driver):
+        """Sample a browser, returns its resident bytes"""
+        rss = browser_rss(driver)
+        if rss is not None:
+            with self.lock:
+                self.peaks[source] = max(self.peaks.get(source, 0), rss)
+        return rss
+
+    def enforce(self, source, holder):
+        """Recycle a browser that is over the limit, returns True if it was recycled
+
+        holder is anything with a driver attribute and a recycle() method that
+        replaces it, a BrowserPool or a scraper.
+        """
+        rss = self.record(source, holder.driver)
+        if rss is None or rss <= self.chrome_limit:
+            return False
+        print(f"{source} browser is using {rss / MB:.0f} MB (limit {self.chrome_limit / MB:.0f} MB), recycling it")
+        holder.recycle()
+        with self.lock:
+            self.recycled.append(source)
+        return True
+
+    def end_cycle(self, source=None):
+        """Report this cycle's peaks and start over, returns the report
+
+        Scrapers running in their own threads pass their source so they only
+        take their own peaks.
+        """
+        with self.lock:
+            if source is None:
+                peaks, self.peaks = self.peaks, {}
+                recycled, self.recycled = self.recycled, []
+            else:
+                peaks = {source: self.peaks.pop(source)} if source in self.peaks else {}
+                recycled = [name for name in self.recycled if name == source]
+                self.recycled = [name for name in self.recycled if name != source]
+        rss = python_rss()
+        if rss is not None and rss > self.python_limit:
+            # Parsed pages and soups should be gone by now, collect whatever cycles are left
+            gc.collect()
+            after = python_rss()
+            print(f"Python is using {rss / MB:.0f} MB (limit {self.python_limit / MB:.0f} MB), {after / MB:.0f} MB after collecting")
+            rss = after
+        report = {
+            'python_mb': None if rss is None else round(rss / MB, 1),
+            'chrome_peak_mb': {source: round(peak / MB, 1) for source, peak in peaks.items()},
+            'recycled': recycled,
+        }
+        if rss is None:
+            print("psutil is not installed, scraper memory is not tracked")
+        else:
+            chrome = ", ".join(f"{source} {mb:.0f} MB" for source, mb in report['chrome_peak_mb'].items())
+            print(f"Memory: Python {report['python_mb']:.0f} MB, Chrome peak {chrome or 'n/a'}")
+        return report
+
+
+memory_watchdog = MemoryWatchdog()
@@ -0,0 +1,161 @@
+# orchestrator.py
+# Runs every source's scrape concurrently on one asyncio loop
+#
+# Blocking Selenium work goes to a bounded thread pool, BeautifulSoup parsing
+# goes to the shared parse pool and database writes go to a single thread so they
+# stay inside one app context. A cycle then takes about as long as the
+# slowest source instead of the sum of all of them.
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from EquiSight.scraping_scripts.parse_pool import get_parse_pool, rows_to_dicts, PARSERS
+from EquiSight.scraping_scripts.browser_profile import transfer_metrics
+from EquiSight.scraping_scripts.memory_watchdog import memory_watchdog
+
+# Seconds a source may take end to end before it's cancelled
+DEFAULT_TIMEOUTS = {
+    "wallstreetzen": 600,
+    "zacks": 300,
+    "stockinvest": 900,
+}
+
+
+class ScrapeOrchestrator:
+    def __init__(self, app, fetch_workers=3, timeouts=None):
+        self.app = app
+        self.fetch_workers = fetch_workers
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.fetch_pool = None
+        self.db_pool = None
+
+    def _start_pools(self):
+        self.fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="scrape-fetch")
+        self.db_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-db")
+
+    def _stop_pools(self):
+        for pool in (self.fetch_pool, self.db_pool):
+            if pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.fetch_pool, func, *args)
+
+    async def _parse(self, source, html, url):
+        parser = PARSERS[source][0]
+        rows = await asyncio.get_running_loop().run_in_executor(get_parse_pool(), parser, html, url)
+        return rows_to_dicts(source, rows)
+
+    async def _save(self, func, *args):
+        def save():
+            with self.app.app_context():
+                return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.db_pool, save)
+
+    async def scrape_wallstreetzen(self):
+        from EquiSight.scraping_scripts.wall_street_zen import WallStreetScraper
+        scraper = WallStreetScraper()
+        url = "https://www.wallstreetzen.com/stock-screener/stock-forecast"
+        try:
+            html = await self._run_blocking(scraper.fetch, url)
+        except asyncio.CancelledError:
+            # Quitting the browser makes the blocked Selenium call return
+            scraper.abort()
+            raise
+        if html is None:
+            return 0
+
+        stocks = await self._parse("wallstreetzen", html, url)
+        for stock in stocks:
+            stock['date'] = date.today()
+        if stocks:
+            await self._save(scraper.save_to_database, stocks)
+        return len(stocks)
+
+    async def scrape_zacks(self):
+        from EquiSight.scraping_scripts.zacks import ZacksScraper
+        scraper = ZacksScraper()
+        url = "https://www.zacks.com/stocks/zacks-rank"
+        try:
+            html = await self._run_blocking(scraper.fetch, url)
+        except asyncio.CancelledError:
+            scraper.abort()
+            raise
+        if html is None:
+            return 0
+
+        rows = await self._parse("zacks", html, url)
+        if not rows:
+            print("Zacks parse failed: No Bull/Bear articles found")
+            return 0
+        results = dict(rows[0], status='success', date=date.today())
+        saved = await self._save(scraper.save_to_database, results)
+        return int(bool(saved))
+
+    async def scrape_stockinvest(self):
+        from EquiSight.scraping_scripts import stock_invest_selenium
+        try:
+            fetched = await self._run_blocking(stock_invest_selenium.fetch_stock_invest)
+        except asyncio.CancelledError:
+            stock_invest_selenium.browser_pool.abort()
+            raise
+
+        page_results = await asyncio.gather(
+            *(self._parse("stockinvest", html, url) for url, _, html, _ in fetched)
+        )
+        stocks = stock_invest_selenium.merge_stocks(page_results)
+        if stocks:
+            await self._save(stock_invest_selenium.save_to_database, stocks)
+        return len(stocks)
+
+    async def _timed(self, source, coro):
+        """Run one source under its timeout, returning (result or exception, seconds)"""
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(coro, timeout=self.timeouts[source])
+        except asyncio.TimeoutError:
+            result = TimeoutError(f"{source} took longer than {self.timeouts[source]} seconds")
+        except Exception as e:
+            result = e
+        return result, time.monotonic() - start
+
+    async def run_cycle(self):
+        """Scrape every source concurrently, returning {source: (result, seconds)}"""
+        sources = {
+            "wallstreetzen": self.scrape_wallstreetzen(),
+            "zacks": self.scrape_zacks(),
+            "stockinvest": self.scrape_stockinvest(),
+        }
+        cycle_start = time.monotonic()
+        outcomes = await asyncio.gather(*(self._timed(source, coro) for source, coro in sources.items()))
+        report = dict(zip(sources, outcomes))
+        wall_time = time.monotonic() - cycle_start
+
+        for source, (result, seconds) in report.items():
+            if isinstance(result, Exception):
+                print(f"{source} failed after {seconds:.1f}s: {result}")
+            else:
+                print(f"{source} saved {result} results in {seconds:.1f}s")
+        total = sum(seconds for _, seconds in report.values())
+        print(f"Scrape cycle took {wall_time:.1f}s (sources took {total:.1f}s combined)")
+        transfer_metrics.end_cycle()
+        memory_watchdog.end_cycle()
+        return report
+
+    async def run_forever(self, interval_seconds=3600):
+        self._start_pools()
+        try:
+            while True:
+                try:
+                    await self.run_cycle()
+                except Exception as e:
+                    print(f"Error in scrape cycle: {e}")
+                print(f"Waiting {interval_seconds} seconds...")
+                await asyncio.sleep(interval_seconds)
+        finally:
+            self._stop_pools()
+
+    def run_continuous(self, interval_seconds=3600):
+        """Blocking entry point for a background thread"""
+        asyncio.run(self.run_forever(interval_seconds))
@@ -0,0 +1,75 @@
+# parse_pool.py
+# Runs BeautifulSoup extraction in worker processes so it never holds the web process's GIL
+#
+# Workers receive raw HTML and send back plain tuples, which are much cheaper
+# to pickle than soup objects or dicts. The parent turns them back into the
+# dicts the save functions expect.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+
+# Tuple layouts returned by the workers
+WALLSTREETZEN_FIELDS = ('ticker', 'score', 'recommendation', 'price', 'forecast_price')
+STOCKINVEST_FIELDS = ('ticker', 'score', 'recommendation', 'price', 'sector', 'industry', 'exchange')
+ZACKS_FIELDS = ('bull_ticker', 'bear_ticker', 'bull_link', 'bear_link')
+
+
+def parse_wallstreetzen(html, url=None):
+    from EquiSight.scraping_scripts.wall_street_zen import WallStreetScraper
+    stocks = WallStreetScraper().extract_data(html)
+    return [tuple(stock[field] for field in WALLSTREETZEN_FIELDS) for stock in stocks]
+
+
+def parse_stockinvest(html, url=None):
+    from EquiSight.scraping_scripts.stock_invest_selenium import extract_stocks, recommendation_for_url
+    stocks = extract_stocks(html, recommendation_for_url(url or ""))
+    return [tuple(stock[field] for field in STOCKINVEST_FIELDS) for stock in stocks]
+
+
+def parse_zacks(html, url=None):
+    from EquiSight.scraping_scripts.zacks import ZacksScraper
+    results = ZacksScraper().extract_data(html)
+    if results.get('status') != 'success':
+        return []
+    return [tuple(results[field] for field in ZACKS_FIELDS)]
+
+
+PARSERS = {
+    "wallstreetzen": (parse_wallstreetzen, WALLSTREETZEN_FIELDS),
+    "stockinvest": (parse_stockinvest, STOCKINVEST_FIELDS),
+    "zacks": (parse_zacks, ZACKS_FIELDS),
+}
+
+
+def rows_to_dicts(source, rows):
+    """Turn worker tuples back into the dicts the save functions take"""
+    fields = PARSERS[source][1]
+    return [dict(zip(fields, row)) for row in rows]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """Return the shared parse pool, starting it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a process that already runs Flask, database and scraper threads
+            # can hand the workers locks that nobody will ever release
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def submit_parse(source, html, url=None):
+    """Queue a page for parsing, returning a future of row tuples"""
+    return get_parse_pool().submit(PARSERS[source][0], html, url)
+
+
+def parse_in_pool(source, html, url=None):
+    """Parse a page in the pool and wait for its rows as dicts"""
+    return rows_to_dicts(source, submit_parse(source, html, url).result())
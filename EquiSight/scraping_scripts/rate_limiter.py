@@ -0,0 +1,234 @@
+# rate_limiter.py
+# Per-domain rate limiting and circuit breaking shared by all scrapers
+import json
+import os
+import random
+import threading
+import time
+
+# Breaker state is written here so a restart doesn't forget that a site is blocking us
+STATE_PATH = os.getenv("SCRAPER_STATE_PATH", os.path.join("instance", "scraper_state.json"))
+
+# Requests per second, burst size, failures before opening, first cooldown (seconds)
+# and how many pages may be loading from the domain at once
+DEFAULT_LIMITS = {
+    "www.wallstreetzen.com": {"rate": 0.2, "capacity": 2, "failure_threshold": 3, "cooldown": 300, "max_concurrency": 1},
+    "www.zacks.com": {"rate": 0.1, "capacity": 1, "failure_threshold": 2, "cooldown": 900, "max_concurrency": 1},
+    "stockinvest.us": {"rate": 0.5, "capacity": 4, "failure_threshold": 3, "cooldown": 300, "max_concurrency": 4},
+}
+FALLBACK_LIMITS = {"rate": 0.2, "capacity": 2, "failure_threshold": 3, "cooldown": 300, "max_concurrency": 1}
+
+# Longest we will ever wait before probing a blocked site again
+MAX_COOLDOWN = 6 * 3600
+# A probe that hasn't reported back after this long is given up on and another is let through
+PROBE_TIMEOUT = 600
+
+
+class CircuitOpenError(Exception):
+    """Raised when a domain's circuit is open and requests should not be made"""
+
+
+def backoff_delay(attempt, base=2.0, cap=60.0):
+    """Exponential backoff with full jitter for the given (zero based) attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available, return the seconds to wait otherwise"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, cooldown=300, on_change=None, probe_timeout=PROBE_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.on_change = on_change
+        self.state = self.CLOSED
+        self.failures = 0
+        # Number of times the breaker opened in a row, drives the exponential cooldown
+        self.trips = 0
+        # Wall clock time so the value survives a restart
+        self.open_until = 0.0
+        # When the probe let through in half-open is given up on
+        self.probe_until = 0.0
+        self.last_reason = None
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a request may be made, moving to half-open once the cooldown ends
+
+        Only one probe is let through at a time. A probe that never reports
+        back (its caller crashed or gave up) is replaced after probe_timeout.
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.time()
+            if self.state == self.HALF_OPEN:
+                if now < self.probe_until:
+                    return False
+                print(f"Circuit probe didn't report back in {int(self.probe_timeout)} seconds, letting another through")
+            elif now < self.open_until:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_until = now + self.probe_timeout
+        self._changed()
+        return True
+
+    def record_success(self):
+        with self.lock:
+            if self.state == self.CLOSED and not self.failures:
+                return
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+            self.last_reason = None
+        self._changed()
+
+    def record_failure(self, reason="error"):
+        with self.lock:
+            self.failures += 1
+            self.last_reason = reason
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+        self._changed()
+
+    def _open(self):
+        self.trips += 1
+        cooldown = min(MAX_COOLDOWN, self.base_cooldown * (2 ** (self.trips - 1)))
+        # Jitter so all sources don't come back at the same moment
+        cooldown *= random.uniform(0.8, 1.2)
+        self.state = self.OPEN
+        self.failures = 0
+        self.open_until = time.time() + cooldown
+        print(f"Circuit opened after {self.last_reason}, cooling down for {int(cooldown)} seconds")
+
+    def _changed(self):
+        # Called after the lock is released, saving touches the disk
+        if self.on_change:
+            self.on_change()
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "trips": self.trips,
+                "open_until": self.open_until,
+                "last_reason": self.last_reason,
+            }
+
+    def load(self, data):
+        self.state = data.get("state", self.CLOSED)
+        self.failures = data.get("failures", 0)
+        self.trips = data.get("trips", 0)
+        self.open_until = data.get("open_until", 0.0)
+        self.last_reason = data.get("last_reason")
+        # A probe that was in flight when we stopped never reported back
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+
+class DomainGuard:
+    """Token bucket and circuit breaker for a single domain"""
+
+    def __init__(self, domain, rate, capacity, failure_threshold, cooldown, max_concurrency=1, on_change=None):
+        self.domain = domain
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate, capacity)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown, on_change=on_change)
+
+    def before_request(self):
+        """Wait for a token, raising CircuitOpenError if the domain is blocked"""
+        if not self.breaker.allow_request():
+            remaining = max(0, int(self.breaker.open_until - time.time()))
+            raise CircuitOpenError(f"{self.domain} circuit is open for another {remaining} seconds")
+        self.bucket.acquire()
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self, reason="error"):
+        self.breaker.record_failure(reason)
+
+    @property
+    def is_open(self):
+        return self.breaker.state == CircuitBreaker.OPEN
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+# Only one thread writes the state file at a time, breakers never wait on it
+_save_lock = threading.Lock()
+
+
+def _load_state():
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state():
+    """Persist every breaker so the next process starts where we left off"""
+    with _save_lock:
+        # Snapshot inside the save lock so an older snapshot can't overwrite a newer one
+        with _guards_lock:
+            guards = dict(_guards)
+        state = {domain: guard.breaker.to_dict() for domain, guard in guards.items()}
+        try:
+            os.makedirs(os.path.dirname(STATE_PATH) or ".", exist_ok=True)
+            tmp_path = STATE_PATH + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, STATE_PATH)
+        except OSError as e:
+            print(f"Failed to save scraper state: {e}")
+
+
+def get_guard(domain):
+    """Return the shared guard for a domain, creating it from saved state if needed"""
+    with _guards_lock:
+        guard = _guards.get(domain)
+        if guard:
+            return guard
+
+        limits = DEFAULT_LIMITS.get(domain, FALLBACK_LIMITS)
+        guard = DomainGuard(domain, on_change=save_state, **limits)
+        saved = _load_state().get(domain)
+        if saved:
+            guard.breaker.load(saved)
+        _guards[domain] = guard
+        return guard
@@ -0,0 +1,105 @@
+# reparse.py
+# Re-runs the current extractors over archived pages, no refetching needed
+#
+# Usage:
+#   python -m EquiSight.scraping_scripts.reparse --source wallstreetzen --since 2025-01-01
+#   python -m EquiSight.scraping_scripts.reparse --write --overwrite
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from EquiSight.scraping_scripts.html_archive import HtmlArchive, ARCHIVE_DIR
+# Source name in the archive index -> the same parser the live scrapers use
+from EquiSight.scraping_scripts.parse_pool import PARSERS, rows_to_dicts
+
+
+def _reparse_page(root, source, sha, page_date, url):
+    """Worker process entry point, returns the extracted results stamped with the archive date"""
+    html = HtmlArchive(root).load(sha)
+    results = rows_to_dicts(source, PARSERS[source][0](html, url))
+    if source == "zacks":
+        # Zacks pages hold one bull/bear pair, saved as a single result
+        results = dict(results[0], status='success') if results else {'status': 'no_data'}
+
+    # History belongs to the day the page was fetched, not the day it is re-parsed
+    if isinstance(results, dict):
+        results['date'] = page_date
+    else:
+        for stock in results:
+            stock['date'] = page_date
+    return source, page_date, results
+
+
+def _write_results(source, results, overwrite):
+    if source == "wallstreetzen":
+        from EquiSight.scraping_scripts.wall_street_zen import WallStreetScraper
+        WallStreetScraper().save_to_database(results, overwrite=overwrite)
+    elif source == "zacks":
+        from EquiSight.scraping_scripts.zacks import ZacksScraper
+        ZacksScraper().save_to_database(results, overwrite=overwrite)
+    elif source == "stockinvest":
+        from EquiSight.scraping_scripts.stock_invest_selenium import save_to_database
+        save_to_database(results, overwrite=overwrite)
+
+
+def reparse(source=None, since=None, until=None, workers=None, write=False, overwrite=False, root=ARCHIVE_DIR):
+    """Re-extract archived pages in a process pool, optionally saving them to the database"""
+    archive = HtmlArchive(root)
+    entries = [entry for entry in archive.entries(source, since, until) if entry[0] in PARSERS]
+    print(f"Re-parsing {len(entries)} archived pages")
+
+    # Pages with identical content on the same day only need parsing once
+    seen = set()
+    jobs = []
+    for page_source, url, page_date, sha in entries:
+        if (page_source, page_date, sha) not in seen:
+            seen.add((page_source, page_date, sha))
+            jobs.append((page_source, sha, page_date, url))
+
+    app = None
+    if write:
+        from EquiSight import create_app
+        app = create_app(start_scrapers=False)
+
+    counts = {}
+    # The app (and its threads) may already be running here, so don't fork
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_reparse_page, root, *job) for job in jobs]
+        for future in futures:
+            try:
+                page_source, page_date, results = future.result()
+            except Exception as e:
+                print(f"Failed to re-parse page: {e}")
+                continue
+
+            found = len(results) if isinstance(results, list) else int(results.get('status') == 'success')
+            counts[page_source] = counts.get(page_source, 0) + found
+            print(f"{page_source} {page_date}: {found} results")
+
+            if app is not None and found:
+                with app.app_context():
+                    _write_results(page_source, results, overwrite)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run extractors over archived pages")
+    parser.add_argument("--source", choices=sorted(PARSERS), help="Only re-parse one source")
+    parser.add_argument("--since", type=date.fromisoformat, help="First date to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last date to include (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    parser.add_argument("--write", action="store_true", help="Save extracted results to the database")
+    parser.add_argument("--overwrite", action="store_true", help="Replace rows that already exist")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="Archive directory")
+    args = parser.parse_args()
+
+    counts = reparse(args.source, args.since, args.until, args.workers, args.write, args.overwrite, args.archive)
+    for source, found in sorted(counts.items()):
+        print(f"{source}: {found} results")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,62 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
-from datetime import datetime
-import pandas as pd
+# selenium, webdriver_manager and bs4 are imported where they're used, so
+# importing this module (the web app and parse workers do) stays cheap
 import time
 import logging
 import re
-from EquiSight import db
-from EquiSight.models import Wall_Street_Prediction
+from EquiSight.ingest import save_predictions
+from EquiSight.scraping_scripts.rate_limiter import get_guard
+from EquiSight.scraping_scripts.html_archive import archive_page
+from EquiSight.scraping_scripts.browser_pool import BrowserPool, load_in_tabs
+from EquiSight.scraping_scripts.parse_pool import submit_parse, rows_to_dicts
+from EquiSight.scraping_scripts.browser_profile import start_browser, quit_browser, transfer_metrics
+from EquiSight.scraping_scripts.memory_watchdog import memory_watchdog
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# List name -> (url, recommendation given to every stock on it, pages to crawl)
+STOCKINVEST_LISTS = {
+    "buy": ("https://stockinvest.us/list/buy/top100", "Buy", 1),
+    "sell": ("https://stockinvest.us/list/sell/top100", "Sell", 1),
+    "strong-buy": ("https://stockinvest.us/list/buy/strong", "Strong Buy", 2),
+    "strong-sell": ("https://stockinvest.us/list/sell/strong", "Strong Sell", 2),
+}
+
 def setup_driver():
     """Set up Chrome driver with optimized options"""
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--disable-plugins")
-    options.add_argument("--disable-images")
-    options.add_argument("--incognito")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--disable-logging")
-    options.add_argument("--log-level=3")
-    options.add_argument("--enable-unsafe-swiftshader")
-    options.add_argument("--disable-web-security")
-    options.add_argument("--disable-features=VizDisplayCompositor")
-    options.add_experimental_option("excludeSwitches", ["enable-logging"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+    def build_options():
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-plugins")
+        options.add_argument("--disable-images")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_argument("--disable-logging")
+        options.add_argument("--log-level=3")
+        options.add_argument("--enable-unsafe-swiftshader")
+        options.add_argument("--disable-web-security")
+        options.add_argument("--disable-features=VizDisplayCompositor")
+        options.add_experimental_option("excludeSwitches", ["enable-logging"])
+        options.add_experimental_option('useAutomationExtension', False)
+        options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
     
-    options.add_argument("--page-load-strategy=eager")
+        options.add_argument("--page-load-strategy=eager")
+        return options
     
+    driver = None
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        # Incognito unless persistent profiles are turned on
+        driver = start_browser("stockinvest", build_options, lambda options: webdriver.Chrome(
+            service=Service(ChromeDriverManager().install()), options=options
+        ))
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
         driver.set_page_load_timeout(60)
@@ -52,55 +65,43 @@ def setup_driver():
         return driver
     except Exception as e:
         logger.error(f"Failed to setup driver: {e}")
+        # Chrome may have started before the failure, don't leave it and its profile behind
+        if driver is not None:
+            quit_browser(driver)
         return None
 
-def scrape_stockinvest_page(driver, url, max_retries=3):
-    """Scrape stock data from StockInvest.us targeting the panel structure"""
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Attempt {attempt + 1}: Loading {url}")
-            
-            driver.get(url)
-            
-            # Wait for panels to load
-            try:
-                WebDriverWait(driver, 30).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".panel.panel-compact"))
-                )
-                logger.info("Page loaded - found panel elements")
-            except TimeoutException:
-                logger.warning("Timeout waiting for panel elements, proceeding anyway")
-            
-            # Additional wait for dynamic content
-            time.sleep(3)
-            
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            
-            # Find all panels with class "panel panel-compact"
-            panels = soup.find_all("div", class_="panel panel-compact")
-            logger.info(f"Found {len(panels)} panel elements")
-            
-            if panels:
-                stocks = parse_panel_data(panels)
-                if stocks:
-                    return stocks
-                else:
-                    logger.warning(f"Found panels but no stock data on attempt {attempt + 1}")
-            else:
-                logger.warning(f"No panels found on attempt {attempt + 1}")
-                
-        except Exception as e:
-            logger.error(f"Error on attempt {attempt + 1}: {e}")
-            
-        # Wait before retry
-        if attempt < max_retries - 1:
-            logger.info("Waiting 5 seconds before retry...")
-            time.sleep(5)
+def list_urls(lists=None):
+    """Return (url, recommendation) for every page of the configured lists"""
+    pages = []
+    for name in lists or STOCKINVEST_LISTS:
+        url, recommendation, page_count = STOCKINVEST_LISTS[name]
+        pages.append((url, recommendation))
+        for page in range(2, page_count + 1):
+            pages.append((f"{url}?page={page}", recommendation))
+    return pages
+
+def recommendation_for_url(url):
+    """Work out the recommendation for an already fetched list page"""
+    for list_url, recommendation, _ in STOCKINVEST_LISTS.values():
+        if url.split("?")[0] == list_url:
+            return recommendation
+    return "Sell" if "/sell/" in url else "Buy"
+
+def extract_stocks(html_content, recommendation="Buy"):
+    """Parse stock data out of a full StockInvest page"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, "html.parser")
     
-    logger.error("All attempts failed")
-    return []
+    # Find all panels with class "panel panel-compact"
+    panels = soup.find_all("div", class_="panel panel-compact")
+    logger.info(f"Found {len(panels)} panel elements")
+    
+    stocks = parse_panel_data(panels, recommendation) if panels else []
+    # Break the tree's reference cycles now instead of waiting for the garbage collector
+    soup.decompose()
+    return stocks
 
-def parse_panel_data(panels):
+def parse_panel_data(panels, recommendation="Buy"):
     """Parse stock data from panel elements"""
     stocks = []
     
@@ -115,7 +116,7 @@ def parse_panel_data(panels):
                     logger.info(f"Skipping premium stock in panel {i}")
                     continue
                     
-                stock_data = extract_stock_from_panel(panel_body)
+                stock_data = extract_stock_from_panel(panel_body, recommendation)
                 if stock_data and stock_data.get('ticker'):
                     stocks.append(stock_data)
                     logger.info(f"Panel {i} - Extracted: {stock_data}")
@@ -150,11 +151,11 @@ def is_premium_stock(panel_body):
         
     return False
 
-def extract_stock_from_panel(panel_body):
+def extract_stock_from_panel(panel_body, recommendation="Buy"):
     """Extract stock information from a panel body element"""
     stock_data = {
         'ticker': '',
-        'recommendation': 'Buy',  # Default since this is from a "buy" list
+        'recommendation': recommendation,  # Every stock on a list shares its recommendation
         'sector': '',
         'score': None,
         'industry': '',
@@ -214,109 +215,95 @@ def extract_stock_from_panel(panel_body):
     
     return stock_data if stock_data['ticker'] else None
 
-def save_to_database(stocks):
-    """Save stock data to SQLite database"""
+def save_to_database(stocks, overwrite=False):
+    """Save stock data through the shared ingestion path"""
     if not stocks:
         logger.warning("No stocks to save to database")
         return
     
-    inserted_count = 0
-    today = datetime.now().date()
-    
-    for stock in stocks:
-        exists = Wall_Street_Prediction.query.filter_by(ticker=stock['ticker'], date=today).first()
-        if exists:
-            continue
-    
-        prediction = Wall_Street_Prediction(
-            ticker=stock['ticker'],
-            score=stock['score'],
-            recommendation=stock['recommendation'],
-            sector=stock['sector'],
-            price=stock['price'],
-            change_percent=stock['change_percent'],
-            date=stock['date']
-        )
-        db.session.add(prediction)
-        inserted_count += 1
-    
-    db.session.commit()
+    inserted_count, updated_count = save_predictions(stocks, "stockinvest", overwrite=overwrite)
     logger.info(f"Inserted {inserted_count} new predictions!")
 
-def save_debug_info(driver, stocks_found):
-    """Save debug information for troubleshooting"""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    
-    # Save page source
-    try:
-        with open(f"debug_page_source_{timestamp}.html", "w", encoding="utf-8") as f:
-            f.write(driver.page_source)
-        logger.info("Debug page source saved")
-    except Exception as e:
-        logger.error(f"Error saving page source: {e}")
-    
-    # Save panel structure info
-    try:
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        panels = soup.find_all("div", class_="panel panel-compact")
-        
-        with open(f"debug_panels_{timestamp}.txt", "w", encoding="utf-8") as f:
-            f.write(f"Found {len(panels)} panels\n")
-            f.write(f"Successfully parsed {len(stocks_found)} stocks\n\n")
-            
-            for i, panel in enumerate(panels[:10]):  # First 10 panels
-                panel_body = panel.find("div", class_="panel-body pt-10 pb-10")
-                if panel_body:
-                    f.write(f"PANEL {i} (Premium: {is_premium_stock(panel_body)}):\n")
-                    f.write("="*50 + "\n")
-                    
-                    # Extract key elements for debugging
-                    ticker_div = panel_body.find("div", class_="font-weight-500 font-size-16")
-                    score_span = panel_body.find("span", class_="ticker-score")
-                    
-                    f.write(f"Ticker div: {ticker_div.get_text(strip=True) if ticker_div else 'Not found'}\n")
-                    f.write(f"Score span: {score_span.get_text(strip=True) if score_span else 'Not found'}\n")
-                    f.write(f"Has blur-content: {bool(panel_body.find(class_='blur-content'))}\n")
-                    f.write("Panel text preview:\n")
-                    f.write(panel_body.get_text()[:500] + "...\n\n")
-                
-        logger.info("Debug panel info saved")
-    except Exception as e:
-        logger.error(f"Error saving debug info: {e}")
+# One browser is kept between cycles and its tabs are shared by every list
+browser_pool = BrowserPool(setup_driver)
+
+def fetch_stock_invest(lists=None):
+    """Load every configured list page across the pooled browser's tabs
 
-def scrape_stock_invest():
-    """Main execution function"""
-    url = "https://stockinvest.us/list/buy/top100?sref=top-buy-stocks-nav"
+    Returns (url, recommendation, html, seconds) for each page that loaded.
+    """
+    pages = list_urls(lists)
+    recommendations = dict(pages)
+    guard = get_guard("stockinvest.us")
     
-    logger.info("Starting stock scraper...")
-    driver = setup_driver()
+    logger.info(f"Starting stock scraper for {len(pages)} pages...")
+    cycle_start = time.monotonic()
     
-    if not driver:
-        logger.error("Failed to setup driver. Exiting.")
-        return
+    with browser_pool.browser() as driver:
+        loaded = load_in_tabs(driver, [url for url, _ in pages], guard, ".panel.panel-compact",
+                              on_ready=lambda tab, url: transfer_metrics.record("stockinvest", tab))
+    # The pooled browser lives across cycles, so this is where its growth gets capped
+    memory_watchdog.enforce("stockinvest", browser_pool)
+    
+    fetched = []
+    for url, html, seconds in loaded:
+        if html is None:
+            continue
+        archive_page("stockinvest", url, html)
+        fetched.append((url, recommendations[url], html, seconds))
     
+    # The sequential baseline is what the same page loads would have cost one after another
+    wall_time = time.monotonic() - cycle_start
+    sequential_time = sum(seconds for _, _, seconds in loaded)
+    speedup = sequential_time / wall_time if wall_time else 0
+    logger.info(
+        f"Loaded {len(fetched)}/{len(pages)} pages in {wall_time:.1f}s "
+        f"(sequential baseline {sequential_time:.1f}s, {speedup:.1f}x)"
+    )
+    return fetched
+
+def merge_stocks(page_results):
+    """Combine per-page stock lists, later lists win if a ticker shows up twice"""
+    stocks = {}
+    for page_stocks in page_results:
+        for stock in page_stocks:
+            stocks[stock['ticker']] = stock
+    return list(stocks.values())
+
+def scrape_stock_invest(lists=None):
+    """Main execution function, crawls every configured list concurrently"""
     try:
-        stocks = scrape_stockinvest_page(driver, url)
-        logger.info(f"Successfully scraped {len(stocks)} stocks")
-        
-        if stocks:
-            save_to_database(stocks)
-        else:
-            logger.warning("No stocks were scraped. Saving debug info...")
-            save_debug_info(driver, stocks)
-            
+        fetched = fetch_stock_invest(lists)
     except Exception as e:
         logger.error(f"Main execution error: {e}")
         import traceback
         logger.error(traceback.format_exc())
-    finally:
-        try:
-            driver.quit()
-            logger.info("Driver closed.")
-        except:
-            pass
+        return
+    
+    # Parse every page in worker processes so the web process keeps its GIL
+    futures = [(url, submit_parse("stockinvest", html, url)) for url, _, html, _ in fetched]
+    page_results = []
+    for url, future in futures:
+        page_stocks = rows_to_dicts("stockinvest", future.result())
+        if not page_stocks:
+            logger.warning(f"No stocks found on {url}")
+        page_results.append(page_stocks)
+    
+    stocks = merge_stocks(page_results)
+    logger.info(f"Scraped {len(stocks)} stocks")
+    
+    if stocks:
+        save_to_database(stocks)
+    else:
+        logger.warning("No stocks were scraped")
 
-def run_script():
+def run_script(interval_seconds=300):
     while True:
-        scrape_stock_invest()
-        time.sleep(300)
\ No newline at end of file
+        try:
+            scrape_stock_invest()
+        except Exception as e:
+            logger.error(f"Error in scrape cycle: {e}")
+        # The orchestrator reports every source at once, in thread mode each reports its own
+        transfer_metrics.end_cycle("stockinvest")
+        memory_watchdog.end_cycle("stockinvest")
+        time.sleep(interval_seconds)
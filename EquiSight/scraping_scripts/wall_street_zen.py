@@ -1,18 +1,15 @@
 # wallstreet_scraper.py
 # Scrapes wallstreetzen.com
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from bs4 import BeautifulSoup
+# selenium, webdriver_manager and bs4 are imported where they're used, so
+# importing this module (the web app and parse workers do) stays cheap
 from datetime import date, timezone
 import time
-from EquiSight import db
-from EquiSight.models import Wall_Street_Prediction
+from EquiSight.ingest import save_predictions
+from EquiSight.scraping_scripts.rate_limiter import get_guard, backoff_delay, CircuitOpenError
+from EquiSight.scraping_scripts.html_archive import archive_page
+from EquiSight.scraping_scripts.parse_pool import parse_in_pool
+from EquiSight.scraping_scripts.browser_profile import start_browser, quit_browser, transfer_metrics
+from EquiSight.scraping_scripts.memory_watchdog import memory_watchdog
 
 class WallStreetScraper:
     def __init__(self, headless=True, wait_time=30):
@@ -22,43 +19,68 @@ class WallStreetScraper:
     
     def setup_driver(self):
         """Setup Chrome driver"""
-        options = Options()
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+        def build_options():
+            options = Options()
         
-        if self.headless:
-            options.add_argument("--headless")
+            if self.headless:
+                options.add_argument("--headless")
         
-        # Performance and stealth options
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-images")
-        options.add_argument("--incognito")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_argument("--log-level=3")
-        options.add_argument("--disable-web-security")
-        options.add_argument("--page-load-strategy=eager")
+            # Performance and stealth options
+            options.add_argument("--no-sandbox")
+            options.add_argument("--disable-dev-shm-usage")
+            options.add_argument("--disable-gpu")
+            options.add_argument("--disable-extensions")
+            options.add_argument("--disable-images")
+            options.add_argument("--disable-blink-features=AutomationControlled")
+            options.add_argument("--log-level=3")
+            options.add_argument("--disable-web-security")
+            options.add_argument("--page-load-strategy=eager")
         
-        options.add_experimental_option("excludeSwitches", ["enable-logging"])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+            options.add_experimental_option("excludeSwitches", ["enable-logging"])
+            options.add_experimental_option('useAutomationExtension', False)
+            options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+            return options
         
         try:
-            self.driver = webdriver.Chrome(
+            # Incognito unless persistent profiles are turned on
+            self.driver = start_browser("wallstreetzen", build_options, lambda options: webdriver.Chrome(
                 service=Service(ChromeDriverManager().install()), 
                 options=options
-            )
+            ))
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             self.driver.set_page_load_timeout(60)
             self.driver.implicitly_wait(10)
             return True
         except Exception as e:
             print(f"Failed to setup driver: {e}")
+            # Chrome may have started before the failure, don't leave it and its profile behind
+            self.abort()
             return False
     
     def load_page(self, url, max_retries=3):
         """Load page with retry logic"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        guard = get_guard("www.wallstreetzen.com")
         for attempt in range(max_retries):
+            # A browser that grew too big on the last attempt makes way for a fresh one.
+            # Checked before asking the guard, a request it allows must report back
+            if attempt and memory_watchdog.enforce("wallstreetzen", self) and self.driver is None:
+                print("Failed to restart the browser")
+                return False
+
+            try:
+                guard.before_request()
+            except CircuitOpenError as e:
+                print(f"Skipping load: {e}")
+                return False
+
             try:
                 print(f"Loading page (attempt {attempt + 1}): {url}")
                 self.driver.get(url)
@@ -69,23 +91,31 @@ class WallStreetScraper:
                         EC.presence_of_element_located((By.CSS_SELECTOR, "tr.MuiTableRow-root-481"))
                     )
                     print("Page loaded - found table rows")
+                    guard.record_success()
                     time.sleep(5)  # Wait for dynamic content
                     return True
                 except TimeoutException:
                     print("Timeout waiting for table rows")
+                    guard.record_failure("timeout")
+                    if guard.is_open:
+                        return False
                     if attempt < max_retries - 1:
-                        time.sleep(5)
+                        time.sleep(backoff_delay(attempt))
                         continue
                     
             except Exception as e:
                 print(f"Error loading page: {e}")
+                guard.record_failure("error")
+                if guard.is_open:
+                    return False
                 if attempt < max_retries - 1:
-                    time.sleep(5)
+                    time.sleep(backoff_delay(attempt))
                     
         return False
     
     def extract_data(self, html_content):
         """Extract stock data from HTML"""
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_content, "html.parser")
         table_rows = soup.find_all("tr", class_="MuiTableRow-root-481")
         
@@ -104,6 +134,8 @@ class WallStreetScraper:
             except Exception as e:
                 print(f"Error parsing row {i}: {e}")
         
+        # Rows are plain dicts now, break the tree's reference cycles instead of waiting for the garbage collector
+        soup.decompose()
         return stocks
     
     def _is_premium_stock(self, row):
@@ -192,57 +224,54 @@ class WallStreetScraper:
             
         return stock_data if stock_data['ticker'] else None
     
-    def save_to_database(self, stocks):
-        """Save stocks to database"""
-        if not stocks:
-            print("No stocks to save")
-            return
-        
-        inserted_count = 0
-        today = date.today()
+    def save_to_database(self, stocks, overwrite=False):
+        """Save stocks to database, replacing existing rows for the day if overwrite is set"""
+        save_predictions(stocks, "wallstreetzen", overwrite=overwrite)
+    
+    def fetch(self, url="https://www.wallstreetzen.com/stock-screener/stock-forecast"):
+        """Load the screener in a fresh browser and return its HTML, or None on failure"""
+        if not self.setup_driver():
+            print("Failed to setup driver")
+            return None
         
-        for stock in stocks:
-            # Check if already exists
-            exists = Wall_Street_Prediction.query.filter_by(
-                ticker=stock['ticker'], 
-                date=today
-            ).first()
+        try:
+            if not self.load_page(url):
+                print("Failed to load page")
+                return None
             
-            if exists:
-                continue
-        
-            prediction = Wall_Street_Prediction(
-                ticker=stock['ticker'],
-                score=stock['score'],
-                recommendation=stock['recommendation'],
-                price=stock['price'],
-                forecast_price=stock['forecast_price'],
-                date=today
-            )
+            transfer_metrics.record("wallstreetzen", self.driver)
+            memory_watchdog.record("wallstreetzen", self.driver)
+            html = self.driver.page_source
+            archive_page("wallstreetzen", url, html)
+            return html
             
-            db.session.add(prediction)
-            inserted_count += 1
-        
-        try:
-            db.session.commit()
-            print(f"Inserted {inserted_count} new predictions")
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error saving to database: {e}")
-            raise
+        finally:
+            self.abort()
+    
+    def abort(self):
+        """Quit the browser, safe to call from another thread to cancel a fetch"""
+        driver, self.driver = self.driver, None
+        if driver:
+            quit_browser(driver)
+    
+    def recycle(self):
+        """Replace the browser with a fresh one, the memory watchdog calls this"""
+        self.abort()
+        self.setup_driver()
     
     def scrape(self, url="https://www.wallstreetzen.com/stock-screener/stock-forecast"):
         """Main scraping method"""
         print("Starting WallStreetZen scraper...")
         
-        if not self.setup_driver():
-            return {'error': 'Failed to setup driver', 'stocks': []}
-        
         try:
-            if not self.load_page(url):
+            html = self.fetch(url)
+            if html is None:
                 return {'error': 'Failed to load page', 'stocks': []}
             
-            stocks = self.extract_data(self.driver.page_source)
+            # Parse in a worker process so the web process keeps its GIL
+            stocks = parse_in_pool("wallstreetzen", html, url)
+            for stock in stocks:
+                stock['date'] = date.today()
             print(f"Successfully scraped {len(stocks)} stocks")
             
             return {'status': 'success', 'stocks': stocks}
@@ -250,10 +279,6 @@ class WallStreetScraper:
         except Exception as e:
             print(f"Scraping failed: {e}")
             return {'error': f'Scraping failed: {e}', 'stocks': []}
-            
-        finally:
-            if self.driver:
-                self.driver.quit()
     
     def run_continuous(self, interval_seconds=3600):
         """Run scraper continuously"""
@@ -272,5 +297,8 @@ class WallStreetScraper:
             except Exception as e:
                 print(f"Error in scrape cycle: {e}")
             
+            # The orchestrator reports every source at once, in thread mode each reports its own
+            transfer_metrics.end_cycle("wallstreetzen")
+            memory_watchdog.end_cycle("wallstreetzen")
             print(f"Waiting {interval_seconds} seconds...")
             time.sleep(interval_seconds)
@@ -1,19 +1,29 @@
-
 # zacks_scraper.py
 # Scrapes zacks.com
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-from bs4 import BeautifulSoup
+# selenium and bs4 are imported where they're used, so importing this module
+# (the web app and parse workers do) stays cheap
 import re
 import time
 import random
 from datetime import date, timezone
 from EquiSight import db
 from EquiSight.models import Zack_Bull_Bear
+from EquiSight.ingest import notify_ingest
+from EquiSight.scraping_scripts.rate_limiter import get_guard, backoff_delay, CircuitOpenError
+from EquiSight.scraping_scripts.html_archive import archive_page
+from EquiSight.scraping_scripts.parse_pool import parse_in_pool
+from EquiSight.scraping_scripts.browser_profile import start_browser, quit_browser, transfer_metrics
+from EquiSight.scraping_scripts.memory_watchdog import memory_watchdog
+
+# Both read a little of the page in the browser instead of serializing the whole DOM
+BOT_CHECK_SCRIPT = """
+const heading = document.querySelector('h1');
+return document.title.includes('Pardon Our Interruption')
+    || (heading !== null && heading.textContent.includes('Pardon Our Interruption'));
+"""
+PAGE_TEXT_SCRIPT = "return document.body ? document.body.innerText.length : 0;"
+# A page with this much visible text loaded even if no article showed up in time
+MIN_PAGE_TEXT = 2000
 
 class ZacksScraper:
     def __init__(self, headless=True, wait_time=15):
@@ -23,55 +33,84 @@ class ZacksScraper:
         
     def setup_driver(self):
         """Setup Chrome WebDriver with stealth options"""
-        chrome_options = Options()
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.common.exceptions import WebDriverException
+        def build_options():
+            chrome_options = Options()
         
-        if self.headless:
-            chrome_options.add_argument('--headless')
+            if self.headless:
+                chrome_options.add_argument('--headless')
         
-        # Stealth and performance options
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-images')
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--ignore-certificate-errors')
-        chrome_options.add_argument('--log-level=3')
-        chrome_options.add_argument('--silent')
+            # Stealth and performance options
+            chrome_options.add_argument('--no-sandbox')
+            chrome_options.add_argument('--disable-dev-shm-usage')
+            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+            chrome_options.add_argument('--disable-gpu')
+            chrome_options.add_argument('--disable-images')
+            chrome_options.add_argument('--disable-web-security')
+            chrome_options.add_argument('--ignore-certificate-errors')
+            chrome_options.add_argument('--log-level=3')
+            chrome_options.add_argument('--silent')
         
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
+            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            chrome_options.add_experimental_option('useAutomationExtension', False)
         
-        # Random user agent
-        user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        ]
-        chrome_options.add_argument(f'--user-agent={random.choice(user_agents)}')
+            # Random user agent
+            user_agents = [
+                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            ]
+            chrome_options.add_argument(f'--user-agent={random.choice(user_agents)}')
+            return chrome_options
         
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            # Persistent profile when turned on, Zacks never ran incognito
+            self.driver = start_browser("zacks", build_options, lambda options: webdriver.Chrome(options=options), incognito=False)
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             self.driver.set_page_load_timeout(30)
             return True
         except WebDriverException as e:
             print(f"Failed to initialize Chrome WebDriver: {e}")
+            # Chrome may have started before the failure, don't leave it and its profile behind
+            self.abort()
             return False
     
     def load_page(self, url, max_retries=3):
         """Load page with retry logic"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        guard = get_guard("www.zacks.com")
         for attempt in range(max_retries):
+            # A browser that grew too big on the last attempt makes way for a fresh one.
+            # Checked before asking the guard, a request it allows must report back
+            if attempt and memory_watchdog.enforce("zacks", self) and self.driver is None:
+                print("Failed to restart the browser")
+                return False
+
+            try:
+                guard.before_request()
+            except CircuitOpenError as e:
+                print(f"Skipping load: {e}")
+                return False
+
             try:
                 print(f"Loading page (attempt {attempt + 1}): {url}")
                 self.driver.get(url)
                 time.sleep(2)
                 
-                # Check for bot detection
-                if "Pardon Our Interruption" in self.driver.page_source:
+                # Check for bot detection in the browser, page_source would copy the whole DOM
+                if self.driver.execute_script(BOT_CHECK_SCRIPT):
                     print(f"Bot detection on attempt {attempt + 1}")
+                    guard.record_failure("blocked")
+                    # Stop burning browser time once the breaker has tripped
+                    if guard.is_open:
+                        return False
                     if attempt < max_retries - 1:
-                        time.sleep(10 * (attempt + 1))
+                        time.sleep(backoff_delay(attempt, base=10))
                     continue
                 
                 # Wait for content
@@ -79,21 +118,30 @@ class ZacksScraper:
                     WebDriverWait(self.driver, self.wait_time).until(
                         EC.presence_of_element_located((By.TAG_NAME, "article"))
                     )
+                    guard.record_success()
                     return True
                 except TimeoutException:
-                    if len(self.driver.page_source) > 10000:
+                    if self.driver.execute_script(PAGE_TEXT_SCRIPT) > MIN_PAGE_TEXT:
+                        guard.record_success()
                         return True
+                    guard.record_failure("timeout")
+                    if guard.is_open:
+                        return False
                     continue
                         
             except Exception as e:
                 print(f"Error loading page: {e}")
+                guard.record_failure("error")
+                if guard.is_open:
+                    return False
                 if attempt < max_retries - 1:
-                    time.sleep(2)
+                    time.sleep(backoff_delay(attempt))
                     
         return False
     
     def extract_data(self, html_content):
         """Extract bull and bear data from HTML"""
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_content, 'html.parser')
         
         results = {
@@ -107,9 +155,10 @@ class ZacksScraper:
         }
         
         # Try different extraction methods
-        if self._extract_by_class(soup, results):
-            results['status'] = 'success'
-        elif self._extract_by_text_search(soup, results):
+        found = self._extract_by_class(soup, results) or self._extract_by_text_search(soup, results)
+        # Break the tree's reference cycles now instead of waiting for the garbage collector
+        soup.decompose()
+        if found:
             results['status'] = 'success'
         elif self._extract_by_regex(html_content, results):
             results['status'] = 'success'
@@ -200,8 +249,8 @@ class ZacksScraper:
             else:
                 results[f'{type_}_link'] = href
     
-    def save_to_database(self, results):
-        """Save data to database"""
+    def save_to_database(self, results, overwrite=False):
+        """Save data to database, replacing the day's picks if overwrite is set"""
         if results.get('status') != 'success':
             print("Skipping database save - scraping failed")
             return False
@@ -211,7 +260,7 @@ class ZacksScraper:
             
             # Check if data already exists for today
             existing = Zack_Bull_Bear.query.filter_by(date=today).first()
-            if existing:
+            if existing and not overwrite:
                 print(f"Data already exists for {today}")
                 return False
             
@@ -219,6 +268,18 @@ class ZacksScraper:
             if not (results.get('bull_ticker') or results.get('bear_ticker')):
                 print("No tickers found, skipping save")
                 return False
+
+            tickers = {results.get('bull_ticker'), results.get('bear_ticker')}
+            if existing:
+                existing.bull_ticker = results.get('bull_ticker')
+                existing.bear_ticker = results.get('bear_ticker')
+                existing.bull_link = results.get('bull_link')
+                existing.bear_link = results.get('bear_link')
+                db.session.commit()
+                committed_at = time.monotonic()
+                print(f"Updated Zack's choices for {today}")
+                notify_ingest("zacks", tickers, committed_at=committed_at)
+                return True
             
             zack_choices = Zack_Bull_Bear(
                 bull_ticker=results.get('bull_ticker'),
@@ -230,7 +291,9 @@ class ZacksScraper:
             
             db.session.add(zack_choices)
             db.session.commit()
+            committed_at = time.monotonic()
             print("Saved Zack's choices to database")
+            notify_ingest("zacks", tickers, committed_at=committed_at)
             return True
             
         except Exception as e:
@@ -238,26 +301,54 @@ class ZacksScraper:
             print(f"Error saving to database: {e}")
             return False
     
+    def fetch(self, url="https://www.zacks.com/stocks/zacks-rank"):
+        """Load the Zacks Rank page in a fresh browser and return its HTML, or None on failure"""
+        if not self.setup_driver():
+            print("Failed to initialize WebDriver")
+            return None
+        
+        try:
+            if not self.load_page(url):
+                print("Failed to load page")
+                return None
+            
+            transfer_metrics.record("zacks", self.driver)
+            memory_watchdog.record("zacks", self.driver)
+            html = self.driver.page_source
+            archive_page("zacks", url, html)
+            return html
+            
+        finally:
+            self.abort()
+    
+    def abort(self):
+        """Quit the browser, safe to call from another thread to cancel a fetch"""
+        driver, self.driver = self.driver, None
+        if driver:
+            quit_browser(driver)
+    
+    def recycle(self):
+        """Replace the browser with a fresh one, the memory watchdog calls this"""
+        self.abort()
+        self.setup_driver()
+    
     def scrape(self, url="https://www.zacks.com/stocks/zacks-rank"):
         """Main scraping method"""
         print("Starting Zacks scraper...")
         
-        if not self.setup_driver():
-            return {'error': 'Failed to initialize WebDriver', 'status': 'error'}
-        
         try:
-            if not self.load_page(url):
+            html = self.fetch(url)
+            if html is None:
                 return {'error': 'Failed to load page', 'status': 'failed'}
             
-            results = self.extract_data(self.driver.page_source)
-            return results
+            # Parse in a worker process so the web process keeps its GIL
+            rows = parse_in_pool("zacks", html, url)
+            if not rows:
+                return {'error': 'No Bull/Bear articles found', 'status': 'no_data'}
+            return dict(rows[0], status='success', date=date.today())
             
         except Exception as e:
             return {'error': f'Scraping failed: {e}', 'status': 'error'}
-            
-        finally:
-            if self.driver:
-                self.driver.quit()
     
     def run_continuous(self, interval_seconds=3600):
         """Run scraper continuously"""
@@ -272,5 +363,8 @@ class ZacksScraper:
             except Exception as e:
                 print(f"Error in scrape cycle: {e}")
             
+            # The orchestrator reports every source at once, in thread mode each reports its own
+            transfer_metrics.end_cycle("zacks")
+            memory_watchdog.end_cycle("zacks")
             print(f"Waiting {interval_seconds} seconds...")
             time.sleep(interval_seconds)
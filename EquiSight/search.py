@@ -0,0 +1,87 @@
+import threading
+from bisect import bisect_left
+from heapq import merge, nsmallest
+from EquiSight.models import db, Zack_Bull_Bear, Ticker
+from EquiSight.ingest import on_ingest
+
+# NOTE: search.py is the in-memory index behind ticker autocomplete
+# Entries are (lowercase key, kind, display value) tuples kept in one sorted
+# list, so a prefix lookup is a binary search plus a scan of the matching
+# range instead of a LIKE query over the predictions table.
+
+# Kinds of entry, tickers are listed before names for the same prefix
+KINDS = ("ticker", "sector", "industry")
+# Most results a single search may ask for
+MAX_RESULTS = 50
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.entries = []
+        self.seen = set()
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def add(self, kind, value):
+        """Add one entry"""
+        self.add_many([(kind, value)])
+
+    def add_many(self, items):
+        """Add (kind, value) pairs, merging the new ones into the sorted list in one pass"""
+        new = {(value.lower(), KINDS.index(kind), value) for kind, value in items if value}
+        with self.lock:
+            new -= self.seen
+            if not new:
+                return
+            self.seen |= new
+            # Copy on write so searches never see the list mid-merge
+            self.entries = list(merge(self.entries, sorted(new)))
+
+    def load(self):
+        """Fill the index from everything already in the database"""
+        tickers = {row[0] for row in db.session.query(Ticker.symbol)}
+        for bull, bear in db.session.query(Zack_Bull_Bear.bull_ticker, Zack_Bull_Bear.bear_ticker):
+            tickers.update((bull, bear))
+
+        entries = {(ticker.lower(), KINDS.index("ticker"), ticker) for ticker in tickers if ticker}
+        for sector, industry in db.session.query(Ticker.sector, Ticker.industry):
+            for kind, value in (("sector", sector), ("industry", industry)):
+                if value:
+                    entries.add((value.lower(), KINDS.index(kind), value))
+        with self.lock:
+            self.seen |= entries
+            self.entries = sorted(self.seen)
+            self.loaded = True
+
+    def search(self, prefix, limit=10, kinds=None):
+        """Return up to `limit` {'kind', 'value'} matches for a prefix, exact matches first"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        if not self.loaded:
+            self.load()
+
+        entries = self.entries
+
+        def matches():
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and entries[i][0].startswith(prefix):
+                key, kind, value = entries[i]
+                if kinds is None or KINDS[kind] in kinds:
+                    yield key != prefix, kind, len(key), key, value
+                i += 1
+
+        # Every match is ranked before cutting, a short symbol can sort after many longer ones
+        best = nsmallest(limit, matches())
+        return [{'kind': KINDS[kind], 'value': value} for _, kind, _, _, value in best]
+
+index = PrefixIndex()
+
+
+@on_ingest
+def index_tickers(source, tickers):
+    if index.loaded:
+        items = [("ticker", ticker) for ticker in tickers]
+        for sector, industry in db.session.query(Ticker.sector, Ticker.industry).filter(Ticker.symbol.in_(tickers)):
+            items += [("sector", sector), ("industry", industry)]
+        index.add_many(items)
@@ -0,0 +1,212 @@
+import sys
+import threading
+from array import array
+from collections import namedtuple
+from datetime import date, datetime, timezone
+import numpy as np
+from EquiSight.models import db, Ticker, Wall_Street_Prediction
+from EquiSight.ingest import on_ingest
+from EquiSight.consensus import parse_number
+
+# NOTE: tickers.py maintains the Ticker dimension table and the cached predictions view
+# The view keeps every row in typed arrays with interned strings, which is far
+# smaller than a list of row objects and can be filtered and sorted with numpy.
+
+
+def backfill_ticker_ids():
+    """Move prediction rows from the old ticker string column to ticker_id, returns rows linked
+
+    Databases from before the Ticker table still have the symbol on every
+    prediction row. Missing Ticker rows are created and every row linked with
+    one statement each, then the old column is dropped.
+    """
+    table = Wall_Street_Prediction.__tablename__
+    if "ticker" not in {column["name"] for column in db.inspect(db.engine).get_columns(table)}:
+        return 0
+
+    legacy = db.table(table, db.column("ticker"), db.column("ticker_id"))
+    missing = db.select(legacy.c.ticker, db.literal(datetime.now(timezone.utc), db.DateTime)).where(
+        legacy.c.ticker_id.is_(None),
+        ~db.exists().where(Ticker.symbol == legacy.c.ticker)
+    ).distinct()
+    db.session.execute(db.insert(Ticker).from_select(["symbol", "updated_at"], missing))
+    linked = db.session.execute(
+        db.update(legacy).where(legacy.c.ticker_id.is_(None)).values(
+            ticker_id=db.select(Ticker.id).where(Ticker.symbol == legacy.c.ticker).scalar_subquery()
+        )
+    ).rowcount
+    db.session.commit()
+
+    with db.engine.begin() as conn:
+        conn.execute(db.text(f'ALTER TABLE "{table}" DROP COLUMN "ticker"'))
+    print(f"Linked {linked} prediction rows to tickers and dropped the old ticker column")
+    return linked
+
+
+# Rows handed to the template, built one at a time while it renders
+PredictionRow = namedtuple("PredictionRow", (
+    "ticker", "score", "recommendation", "price", "forecast_price", "date", "source", "sector", "industry", "exchange"
+))
+
+# Columns stored as codes into the snapshot's string table
+TEXT_COLUMNS = ("ticker", "score", "recommendation", "price", "forecast_price", "source", "sector", "industry", "exchange")
+SORT_KEYS = ("ticker", "score", "price", "forecast_price", "date")
+
+
+class PredictionsSnapshot:
+    """Every prediction row in typed columns, never changed after it's built
+
+    Text columns are uint32 codes into one table of interned strings (code 0
+    is None), numbers are float64 with NaN for missing values and dates are
+    day ordinals. Rows are stored in ticker order.
+    """
+
+    def __init__(self, rows):
+        self.strings = [None]
+        codes = {None: 0}
+        text = {column: array('I') for column in TEXT_COLUMNS}
+        days = array('l')
+        for row in rows:
+            for column in TEXT_COLUMNS:
+                value = getattr(row, column)
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(self.strings)
+                    self.strings.append(sys.intern(value))
+                text[column].append(code)
+            days.append(row.date.toordinal() if row.date else 0)
+
+        self.codes = codes
+        self.text = {column: np.asarray(values, dtype=np.uint32) for column, values in text.items()}
+        self.days = np.asarray(days, dtype=np.int64)
+        self.numbers = {
+            column: np.array([parse_number(self.strings[code]) for code in self.text[column]], dtype=np.float64)
+            for column in ("price", "forecast_price", "score")
+        }
+        # Codes that actually appear in the filterable columns
+        self.present = {column: set(np.unique(self.text[column]).tolist()) for column in ("sector", "source")}
+        # (sector, source, sort, descending) -> row indexes, filled as views are asked for
+        self.orders = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.days)
+
+    def nbytes(self):
+        """Bytes held by the columns, not counting the string table"""
+        return sum(column.nbytes for column in self.text.values()) + self.days.nbytes + sum(
+            column.nbytes for column in self.numbers.values()
+        )
+
+    def order(self, sector=None, source=None, sort="ticker", descending=False):
+        """Row indexes for a filtered and sorted view"""
+        key = (sector, source, sort, descending)
+        with self.lock:
+            cached = self.orders.get(key)
+        if cached is not None:
+            return cached
+
+        mask = np.ones(len(self), dtype=bool)
+        for column, value in (("sector", sector), ("source", source)):
+            if not value:
+                continue
+            code = self.codes.get(value)
+            if code not in self.present[column]:
+                # Matches nothing, and isn't cached so made up values can't grow the cache
+                return np.empty(0, dtype=np.int64)
+            mask &= self.text[column] == code
+        indexes = np.flatnonzero(mask)
+
+        if sort == "ticker":
+            # Already stored in ticker order
+            order = indexes[::-1] if descending else indexes
+        else:
+            values = self.days[indexes] if sort == "date" else self.numbers[sort][indexes]
+            # Stable sort keeps ticker order for ties, and NaN sorts last either way
+            order = indexes[np.argsort(-values if descending else values, kind="stable")]
+
+        with self.lock:
+            self.orders[key] = order
+        return order
+
+    def rows(self, order):
+        """Rebuild PredictionRows for the given indexes, one at a time"""
+        strings = self.strings
+        text = [self.text[column] for column in TEXT_COLUMNS]
+        for i in order:
+            ticker, score, recommendation, price, forecast, source, sector, industry, exchange = (
+                strings[column[i]] for column in text
+            )
+            day = int(self.days[i])
+            yield PredictionRow(
+                ticker, score, recommendation, price, forecast,
+                date.fromordinal(day) if day else None, source, sector, industry, exchange
+            )
+
+
+class PredictionsView:
+    """Prediction rows joined with their ticker details, kept as a columnar snapshot
+
+    Each ingest only drops the snapshot, the next read builds a new one from
+    the database and every other request waiting on it shares that build.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        # Replaced on every invalidate(), a build that started before it isn't kept
+        self.generation = object()
+        self.refresh_lock = threading.Lock()
+
+    def load(self):
+        return db.session.query(
+            Ticker.symbol.label("ticker"),
+            Wall_Street_Prediction.score,
+            Wall_Street_Prediction.recommendation,
+            Wall_Street_Prediction.price,
+            Wall_Street_Prediction.forecast_price,
+            Wall_Street_Prediction.date,
+            Wall_Street_Prediction.source,
+            Ticker.sector,
+            Ticker.industry,
+            Ticker.exchange
+        ).join(Ticker, Wall_Street_Prediction.ticker_id == Ticker.id).order_by(
+            Ticker.symbol, Wall_Street_Prediction.id
+        ).yield_per(5000)
+
+    def current(self):
+        """The snapshot, built first if an ingest dropped it"""
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return snapshot
+        with self.refresh_lock:
+            if self.snapshot is not None:
+                return self.snapshot
+            generation = self.generation
+            snapshot = PredictionsSnapshot(self.load())
+            if self.generation is generation:
+                self.snapshot = snapshot
+        return snapshot
+
+    def rows(self, sector=None, source=None, sort="ticker", descending=False):
+        """Rows for the predictions page, filtered by sector and source and sorted by any of SORT_KEYS"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Can't sort predictions by {sort}")
+        snapshot = self.current()
+        return snapshot.rows(snapshot.order(sector or None, source or None, sort, descending))
+
+    def sectors(self):
+        return [row[0] for row in db.session.query(Ticker.sector).filter(Ticker.sector.isnot(None)).distinct().order_by(Ticker.sector)]
+
+    def invalidate(self):
+        """Drop the snapshot, the next request builds a fresh one"""
+        self.generation = object()
+        self.snapshot = None
+
+
+predictions_view = PredictionsView()
+
+
+@on_ingest
+def refresh_predictions_view(source, tickers):
+    # Rebuilt on the next read, the ingest thread doesn't pay for the whole history
+    predictions_view.invalidate()
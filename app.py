@@ -1,6 +1,8 @@
 from EquiSight import create_app
 
-app = create_app()
+# Spawned worker processes import this file again as __mp_main__, only the
+# real process may start the scrapers
+app = create_app(start_scrapers=__name__ != "__mp_main__")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,73 @@
+# bench_backtest.py
+# Times the vectorized backtester on a synthetic multi-year history
+#
+# Usage:
+#   python benchmarks/bench_backtest.py --tickers 2000 --days 1095
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EquiSight.backtest import History, run_backtest, print_results
+
+
+def synthetic_history(tickers, days, seed=42):
+    """Daily random walk prices with a WallStreetZen and a StockInvest call per ticker per day"""
+    rng = np.random.default_rng(seed)
+    start = date.today().toordinal() - days
+    ticker_code = np.repeat(np.arange(tickers), days)
+    day = np.tile(np.arange(start, start + days), tickers)
+
+    # Geometric random walk per ticker
+    steps = rng.normal(0.0003, 0.02, size=(tickers, days))
+    price = (rng.uniform(5, 500, size=(tickers, 1)) * np.exp(np.cumsum(steps, axis=1))).ravel()
+    # Skip ~5% of days like a flaky scraper would
+    keep = rng.random(len(price)) > 0.05
+
+    recommendations = ["Buy", "Hold", "Sell", "Strong Buy"]
+    rows = []
+    for source in range(2):
+        rows.append((
+            ticker_code[keep],
+            np.full(keep.sum(), source),
+            rng.integers(0, len(recommendations), keep.sum()),
+            day[keep],
+            price[keep],
+            price[keep] * rng.uniform(0.85, 1.4, keep.sum()),
+        ))
+    columns = [np.concatenate(parts) for parts in zip(*rows)]
+    return History(
+        [f"T{i:05d}" for i in range(tickers)], columns[0].astype(np.int64),
+        ["stockinvest", "wallstreetzen"], columns[1].astype(np.int64),
+        recommendations, columns[2].astype(np.int64),
+        columns[3].astype(np.int64), columns[4], columns[5],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backtester")
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    history = synthetic_history(args.tickers, args.days)
+    print(f"Backtesting {len(history):,} predictions ({args.tickers} tickers over {args.days} days)")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        results = run_backtest(history)
+        timings.append(time.perf_counter() - start)
+
+    print_results(results)
+    print(f"best {min(timings):.2f}s, worst {max(timings):.2f}s over {args.repeat} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# bench_load.py
+# Drives /login, /dashboard and /predictions from many concurrent users
+#
+# Each worker plays one user session after another: log in, open the
+# dashboard, open the predictions table (sometimes filtered by sector) and log
+# out. By default requests go through the Flask test client against a fresh
+# synthetic database; --url points the same sessions at a running server.
+# Throughput and p50/p95/p99 per route are printed and saved as JSON under
+# instance/load_results/ so versions can be compared with --compare.
+#
+# Usage:
+#   python benchmarks/bench_load.py --workers 8 --sessions 20 --tickers 3000 --days 5
+#   python benchmarks/bench_load.py --url http://127.0.0.1:5000 --users 200
+#   python benchmarks/bench_load.py --workers 8 --compare instance/load_results/<earlier run>.json
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import SECTORS, PASSWORD, generate
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "load_results")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class TestClientSession:
+    """One user's cookies on the Flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post(self, path, data):
+        return self.client.post(path, data=data).status_code
+
+
+class HttpSession:
+    """One user's cookies against a running server, redirects are not followed"""
+
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), self.NoRedirect
+        )
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data):
+        return self._open(urllib.request.Request(self.base_url + path, data=urllib.parse.urlencode(data).encode()))
+
+
+def run_worker(worker_id, new_session, users, sessions, seed, samples, errors, lock):
+    rng = random.Random(seed + worker_id)
+    sectors = sorted(SECTORS)
+    local = []
+    local_errors = 0
+    for _ in range(sessions):
+        session = new_session()
+        username = f"user{rng.randrange(users):04d}"
+        steps = [
+            ("/login", "POST", {'username': username, 'password': PASSWORD}, 302),
+            ("/dashboard", "GET", None, 200),
+            ("/predictions", "GET", None, 200),
+        ]
+        if rng.random() < 0.5:
+            steps.append((f"/predictions?sector={urllib.parse.quote(rng.choice(sectors))}", "GET", None, 200))
+        steps.append(("/logout", "GET", None, 302))
+
+        for path, method, data, expected in steps:
+            start = time.perf_counter()
+            status = session.post(path, data) if method == "POST" else session.get(path)
+            elapsed = (time.perf_counter() - start) * 1000
+            route = path.split("?")[0]
+            local.append((route, elapsed))
+            if status != expected:
+                local_errors += 1
+    with lock:
+        samples.extend(local)
+        errors[0] += local_errors
+
+
+def summarize(samples, wall_seconds):
+    routes = {}
+    for route, elapsed in samples:
+        routes.setdefault(route, []).append(elapsed)
+    summary = {}
+    for route, latencies in sorted(routes.items()):
+        summary[route] = {
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+        }
+    summary['all'] = {
+        'requests': len(samples),
+        'p50_ms': round(percentile([s[1] for s in samples], 50), 2),
+        'p95_ms': round(percentile([s[1] for s in samples], 95), 2),
+        'p99_ms': round(percentile([s[1] for s in samples], 99), 2),
+        'throughput_rps': round(len(samples) / wall_seconds, 1),
+    }
+    return summary
+
+
+def print_summary(summary, previous=None):
+    print(f"{'route':<14}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in summary.items():
+        line = f"{route:<14}{stats['requests']:>10}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        if previous and route in previous:
+            before = previous[route]['p95_ms']
+            line += f"   p95 {((stats['p95_ms'] / before - 1) * 100) if before else 0:+.1f}% vs previous"
+        print(line)
+    print(f"Throughput {summary['all']['throughput_rps']} requests/s")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test of the main pages")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions each worker runs")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=5, help="Days of prediction history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="Test a running server instead of the test client")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    if args.url:
+        new_session = lambda: HttpSession(args.url)
+        counts = None
+        print(f"Load testing {args.url}, the server's database must already hold synthetic_data.py users")
+    else:
+        db_path = os.path.join(tempfile.mkdtemp(), "load.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from EquiSight import create_app
+        app = create_app(start_scrapers=False)
+        with app.app_context():
+            counts = generate(args.users, args.tickers, args.days, seed=args.seed)
+        new_session = lambda: TestClientSession(app)
+        print("Synthetic data: " + ", ".join(f"{count:,} {table}" for table, count in counts.items()))
+
+    samples = []
+    errors = [0]
+    lock = threading.Lock()
+    workers = [
+        threading.Thread(target=run_worker, args=(i, new_session, args.users, args.sessions, args.seed, samples, errors, lock))
+        for i in range(args.workers)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall_seconds = time.perf_counter() - start
+
+    summary = summarize(samples, wall_seconds)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['results']
+    print(f"{args.workers} workers x {args.sessions} sessions in {wall_seconds:.1f}s, {errors[0]} unexpected responses")
+    print_summary(summary, previous)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    revision = git_revision()
+    path = os.path.join(RESULTS_DIR, f"load_{datetime.now():%Y%m%d_%H%M%S}_{revision}.json")
+    with open(path, "w") as f:
+        json.dump({
+            'revision': revision,
+            'timestamp': datetime.now().isoformat(timespec="seconds"),
+            'config': vars(args),
+            'data': counts,
+            'errors': errors[0],
+            'wall_seconds': round(wall_seconds, 2),
+            'results': summary,
+        }, f, indent=2)
+    print(f"Saved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
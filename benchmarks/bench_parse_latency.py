@@ -0,0 +1,134 @@
+# bench_parse_latency.py
+# Measures /predictions latency while screener pages are being parsed
+#
+# Runs three phases against the Flask test client: no parsing, parsing in a
+# thread inside the web process (how scrapers used to work) and parsing in the
+# shared worker process pool. Each phase reports p50/p95/p99 route latency.
+#
+# Usage:
+#   python benchmarks/bench_parse_latency.py --rows 3000 --requests 200
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_screener_html(rows):
+    """Build a WallStreetZen-like screener page with the given number of rows"""
+    rng = random.Random(42)
+    parts = ["<html><body><table>"]
+    for i in range(rows):
+        price = rng.uniform(5, 500)
+        forecast = price * rng.uniform(0.8, 1.5)
+        cells = [
+            f'<a class="MuiLink-root-94">T{i:04d}</a>',
+            f"Company {i}",
+            f"${price:.2f}",
+            "Technology",
+            f"${forecast:.2f}",
+            f'<span class="jss536">{(forecast / price - 1) * 100:.1f}%</span>',
+            "12",
+            rng.choice(["Buy", "Strong Buy", "Hold"]),
+        ]
+        parts.append('<tr class="MuiTableRow-root-481">')
+        parts.extend(f'<td class="MuiTableCell-root-493">{cell}</td>' for cell in cells)
+        parts.append("</tr>")
+    parts.append("</table></body></html>")
+    return "".join(parts)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(client, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get("/predictions")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return latencies
+
+
+def parse_loop(mode, html, stop):
+    """Parse the page over and over until stopped"""
+    from EquiSight.scraping_scripts.wall_street_zen import WallStreetScraper
+    from EquiSight.scraping_scripts.parse_pool import parse_in_pool
+    while not stop.is_set():
+        if mode == "thread":
+            WallStreetScraper().extract_data(html)
+        else:
+            parse_in_pool("wallstreetzen", html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route latency while parsing screener pages")
+    parser.add_argument("--rows", type=int, default=3000, help="Rows in the synthetic screener page")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per phase")
+    parser.add_argument("--predictions", type=int, default=500, help="Prediction rows in the database")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from EquiSight import create_app
+    from EquiSight.models import db, User, Ticker, Wall_Street_Prediction
+
+    app = create_app(start_scrapers=False)
+    with app.app_context():
+        user = User(username="bench")
+        user.set_password("bench")
+        db.session.add(user)
+        for i in range(args.predictions):
+            db.session.add(Wall_Street_Prediction(
+                ticker_info=Ticker(symbol=f"T{i:04d}"), score="10.0%", recommendation="Buy",
+                price="$10.00", forecast_price="$11.00", date=date.today()
+            ))
+        db.session.commit()
+
+    client = app.test_client()
+    client.post("/login", data={"username": "bench", "password": "bench"})
+    html = build_screener_html(args.rows)
+
+    # Silence the per-row extraction prints so they don't skew the numbers
+    sys.stdout = open(os.devnull, "w")
+    results = {}
+    try:
+        # Warm up the pool outside the measured window
+        from EquiSight.scraping_scripts.parse_pool import parse_in_pool
+        parse_in_pool("wallstreetzen", html)
+
+        for mode in ("idle", "thread", "pool"):
+            stop = threading.Event()
+            worker = None
+            if mode != "idle":
+                worker = threading.Thread(target=parse_loop, args=(mode, html, stop), daemon=True)
+                worker.start()
+                time.sleep(0.5)
+            results[mode] = measure(client, args.requests)
+            stop.set()
+            if worker:
+                worker.join()
+    finally:
+        sys.stdout = sys.__stdout__
+
+    print(f"/predictions latency with a {args.rows} row screener being parsed ({args.requests} requests)")
+    print(f"{'mode':<8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for mode, latencies in results.items():
+        print(
+            f"{mode:<8}{percentile(latencies, 50):>10.2f}{percentile(latencies, 95):>10.2f}"
+            f"{percentile(latencies, 99):>10.2f}{statistics.mean(latencies):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# bench_predictions_view.py
+# Memory and render time of the /predictions read path, before and after the columnar snapshot
+#
+# Three ways of holding the same rows are compared: full ORM objects (how the
+# page first worked), the cached list of joined row tuples (the previous
+# cache) and the columnar PredictionsSnapshot. Memory is what tracemalloc sees
+# allocated while each is built and kept alive. Render time is the
+# predictions template rendered from each, plus a sorted and a filtered view
+# that only the snapshot can serve without going back to the database.
+#
+# Usage:
+#   python benchmarks/bench_predictions_view.py --tickers 3000 --days 5
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import generate
+
+
+def measure_memory(build):
+    """Return (result, bytes still allocated by building it)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def time_render(render, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the predictions page read path")
+    parser.add_argument("--tickers", type=int, default=3000)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'view.db')}"
+    from flask import render_template
+    from EquiSight import create_app
+    from EquiSight.models import db, Wall_Street_Prediction
+    from EquiSight.tickers import PredictionsSnapshot, predictions_view
+
+    app = create_app(start_scrapers=False)
+    with app.app_context():
+        counts = generate(users=1, tickers=args.tickers, days=args.days)
+    print(f"{counts['predictions']:,} prediction rows")
+
+    with app.test_request_context("/predictions"):
+        from flask_login import login_user
+        from EquiSight.models import User
+        login_user(User.query.first())
+        sectors = predictions_view.sectors()
+
+        def render(rows):
+            return render_template("main/predictions.html", results=rows, sectors=sectors,
+                                   sector=None, sort="ticker", descending=False)
+
+        orm_rows, orm_bytes = measure_memory(lambda: Wall_Street_Prediction.query.order_by(Wall_Street_Prediction.ticker_id).all())
+        orm_ms = time_render(lambda rows=orm_rows: render(rows), args.repeat)
+        del orm_rows
+        db.session.expunge_all()
+
+        tuple_rows, tuple_bytes = measure_memory(lambda: predictions_view.load().all())
+        tuple_ms = time_render(lambda rows=tuple_rows: render(rows), args.repeat)
+        del tuple_rows
+
+        start = time.perf_counter()
+        snapshot, snapshot_bytes = measure_memory(lambda: PredictionsSnapshot(predictions_view.load()))
+        build_ms = (time.perf_counter() - start) * 1000
+        predictions_view.snapshot = snapshot
+        snapshot_ms = time_render(lambda: render(predictions_view.rows()), args.repeat)
+        sorted_ms = time_render(lambda: render(predictions_view.rows(sort="price", descending=True)), args.repeat)
+        filtered_ms = time_render(lambda: render(predictions_view.rows(sector=sectors[0])), args.repeat)
+
+    print(f"{'read path':<28}{'memory MB':>11}{'render ms':>11}")
+    for name, nbytes, ms in (
+        ("ORM objects", orm_bytes, orm_ms),
+        ("row tuples (old cache)", tuple_bytes, tuple_ms),
+        ("columnar snapshot", snapshot_bytes, snapshot_ms),
+    ):
+        print(f"{name:<28}{nbytes / 1024 / 1024:>11.1f}{ms:>11.1f}")
+    print(f"Snapshot built in {build_ms:.0f} ms, columns hold {snapshot.nbytes() / 1024 / 1024:.1f} MB "
+          f"and {len(snapshot.strings):,} distinct strings")
+    print(f"Sorted by price {sorted_ms:.1f} ms, filtered to {sectors[0]} {filtered_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench_startup.py
+# Measures cold import and app startup time, and checks them against a budget
+#
+# Every run is a fresh interpreter so nothing is already imported or cached.
+# Phases: `import EquiSight`, create_app() without scrapers, and the first
+# request (which is when the database tables get created). The import must
+# also leave the scraper-only dependencies unloaded. With --check the script
+# exits non-zero when a median goes over its budget, so it can gate CI.
+#
+# Usage:
+#   python benchmarks/bench_startup.py --runs 5
+#   python benchmarks/bench_startup.py --check --import-budget 500
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the scrapers need these, the web app must not pay for them
+SCRAPER_ONLY_MODULES = ("selenium", "webdriver_manager", "bs4", "pandas", "pyarrow")
+
+# Median milliseconds allowed per phase
+BUDGETS = {
+    'import_ms': 800,
+    'create_app_ms': 150,
+    'first_request_ms': 500,
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import EquiSight
+imported = time.perf_counter()
+app = EquiSight.create_app(start_scrapers=False)
+created = time.perf_counter()
+app.test_client().get("/")
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (SCRAPER_ONLY_MODULES,)
+
+
+def probe():
+    """Run one cold start in a new interpreter against an empty database"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, cwd=ROOT, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import and startup time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Exit 1 when over budget")
+    parser.add_argument("--import-budget", type=float, default=BUDGETS['import_ms'])
+    parser.add_argument("--create-app-budget", type=float, default=BUDGETS['create_app_ms'])
+    parser.add_argument("--first-request-budget", type=float, default=BUDGETS['first_request_ms'])
+    args = parser.parse_args()
+    budgets = {
+        'import_ms': args.import_budget,
+        'create_app_ms': args.create_app_budget,
+        'first_request_ms': args.first_request_budget,
+    }
+
+    # The first run warms the OS file cache and isn't counted
+    probe()
+    runs = [probe() for _ in range(args.runs)]
+
+    failures = []
+    print(f"{'phase':<18}{'median ms':>11}{'min ms':>10}{'budget ms':>11}")
+    for phase, budget in budgets.items():
+        values = [run[phase] for run in runs]
+        median = statistics.median(values)
+        print(f"{phase:<18}{median:>11.1f}{min(values):>10.1f}{budget:>11.0f}{'  OVER' if median > budget else ''}")
+        if median > budget:
+            failures.append(f"{phase} median {median:.1f} ms is over the {budget:.0f} ms budget")
+
+    loaded = sorted({name for run in runs for name in run['loaded']})
+    if loaded:
+        failures.append(f"import EquiSight loaded scraper-only modules: {', '.join(loaded)}")
+    print(f"Scraper-only modules loaded by import: {', '.join(loaded) or 'none'}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# synthetic_data.py
+# Deterministic synthetic users, predictions and Zacks Bull/Bear history
+#
+# The same seed and sizes always produce the same rows, so load test results
+# from different versions of the app are comparable. Rows go in with bulk
+# inserts rather than one ORM object at a time.
+#
+# Usage:
+#   python benchmarks/synthetic_data.py --database /tmp/load.db --users 500 --tickers 3000 --days 30
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SECTORS = {
+    "Technology": ["Software", "Semiconductors", "Hardware"],
+    "Healthcare": ["Biotechnology", "Medical Devices", "Pharmaceuticals"],
+    "Financials": ["Banks", "Insurance", "Asset Management"],
+    "Energy": ["Oil & Gas", "Renewables"],
+    "Consumer Cyclical": ["Retail", "Autos", "Leisure"],
+    "Industrials": ["Aerospace", "Machinery", "Transportation"],
+}
+EXCHANGES = ["NASDAQ", "NYSE", "AMEX"]
+WALLSTREETZEN_CALLS = ["Strong Buy", "Buy", "Hold", "Sell", "Strong Sell"]
+STOCKINVEST_CALLS = ["Strong Buy", "Buy", "Hold", "Sell"]
+PASSWORD = "loadtest"
+BATCH_SIZE = 5000
+
+
+def ticker_symbols(count):
+    """Stable 4 letter symbols (AAAA, AAAB, ...), the same for every run"""
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    symbols = []
+    for i in range(count):
+        symbol = ""
+        for _ in range(4):
+            symbol = letters[i % 26] + symbol
+            i //= 26
+        symbols.append(symbol)
+    return symbols
+
+
+def _insert(model, rows):
+    from EquiSight.models import db
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+
+def generate(users=100, tickers=1000, days=30, bull_bear_days=365, seed=42):
+    """Fill the current app's database, returns how many rows went into each table
+
+    Every user's password is PASSWORD and usernames are user0000, user0001, ...
+    Needs an app context.
+    """
+    from werkzeug.security import generate_password_hash
+    from EquiSight.models import db, User, Ticker, Wall_Street_Prediction, Zack_Bull_Bear
+
+    rng = random.Random(seed)
+    today = date.today()
+    symbols = ticker_symbols(tickers)
+
+    # Hashing is deliberately slow, every user shares one hash of the same password
+    password_hash = generate_password_hash(PASSWORD)
+    _insert(User, [{'username': f"user{i:04d}", 'password_hash': password_hash} for i in range(users)])
+
+    ticker_rows = []
+    for symbol in symbols:
+        sector = rng.choice(sorted(SECTORS))
+        ticker_rows.append({
+            'symbol': symbol, 'sector': sector,
+            'industry': rng.choice(SECTORS[sector]), 'exchange': rng.choice(EXCHANGES),
+        })
+    _insert(Ticker, ticker_rows)
+    ticker_ids = dict(db.session.query(Ticker.symbol, Ticker.id).filter(Ticker.symbol.in_(symbols)))
+
+    # Random walk prices so history looks like a market rather than noise
+    prices = {symbol: rng.uniform(5, 500) for symbol in symbols}
+    prediction_rows = []
+    for day_offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=day_offset)
+        for symbol in symbols:
+            prices[symbol] *= 1 + rng.gauss(0.0003, 0.02)
+            price = prices[symbol]
+            forecast = price * rng.uniform(0.8, 1.5)
+            prediction_rows.append({
+                'ticker_id': ticker_ids[symbol], 'source': "wallstreetzen", 'date': day,
+                'score': f"{(forecast / price - 1) * 100:.1f}%", 'recommendation': rng.choice(WALLSTREETZEN_CALLS),
+                'price': f"${price:.2f}", 'forecast_price': f"${forecast:.2f}",
+            })
+            prediction_rows.append({
+                'ticker_id': ticker_ids[symbol], 'source': "stockinvest", 'date': day,
+                'score': f"{rng.uniform(-10, 10):.2f}", 'recommendation': rng.choice(STOCKINVEST_CALLS),
+                'price': f"${price:.2f}", 'forecast_price': None,
+            })
+    _insert(Wall_Street_Prediction, prediction_rows)
+
+    bull_bear_rows = []
+    for day_offset in range(bull_bear_days - 1, -1, -1):
+        bull, bear = rng.sample(symbols, 2)
+        bull_bear_rows.append({
+            'bull_ticker': bull, 'bear_ticker': bear, 'date': today - timedelta(days=day_offset),
+            'bull_link': f"https://www.zacks.com/stock/quote/{bull}",
+            'bear_link': f"https://www.zacks.com/stock/quote/{bear}",
+        })
+    _insert(Zack_Bull_Bear, bull_bear_rows)
+
+    return {
+        'users': users,
+        'tickers': len(ticker_rows),
+        'predictions': len(prediction_rows),
+        'bull_bear': len(bull_bear_rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with deterministic synthetic data")
+    parser.add_argument("--database", required=True, help="SQLite file to create, must not exist yet")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30, help="Days of prediction history")
+    parser.add_argument("--bull-bear-days", type=int, default=365, help="Days of Zacks Bull/Bear history")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        parser.error(f"{args.database} already exists")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+
+    from EquiSight import create_app
+    app = create_app(start_scrapers=False)
+    with app.app_context():
+        counts = generate(args.users, args.tickers, args.days, args.bull_bear_days, args.seed)
+    print(", ".join(f"{count:,} {table}" for table, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
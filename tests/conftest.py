@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on its own SQLite file, with an app context pushed"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'site.db'}")
+    from EquiSight import create_app
+    from EquiSight.alerts import rule_index
+    from EquiSight.charts import charts
+    from EquiSight.consensus import engine
+    from EquiSight.search import index
+    from EquiSight.tickers import predictions_view
+
+    # The derived views are module level, start each test without another test's data
+    for service in (charts, engine, index, predictions_view, rule_index):
+        service.__init__()
+
+    app = create_app(start_scrapers=False)
+    with app.app_context():
+        yield app
+
+
+def stock(ticker, price, forecast=None, recommendation="Buy", score="10%", day=None, **extra):
+    """A scraped stock dict the way the scrapers hand it to save_predictions"""
+    return dict(
+        ticker=ticker, price=f"${price}", forecast_price=None if forecast is None else f"${forecast}",
+        recommendation=recommendation, score=score, date=day, **extra
+    )
+
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as a fresh user"""
+    from EquiSight.models import User, db
+    user = User(username="tester")
+    user.set_password("secret")
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "tester", "password": "secret"})
+    return client
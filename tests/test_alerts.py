@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import stock
+from EquiSight import alerts
+from EquiSight.ingest import notify_ingest, save_predictions
+from EquiSight.models import Alert, User, Zack_Bull_Bear, db
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username="watcher")
+    user.set_password("secret")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def scrape(source, day_offset, **fields):
+    save_predictions([stock("AAA", 100, day=TODAY + timedelta(days=day_offset), **fields)], source)
+
+
+def messages():
+    return [alert.message for alert in Alert.query.order_by(Alert.id)]
+
+
+def test_upside_fires_once_per_crossing(user):
+    alerts.add_rule(user.id, "AAA", "upside_above", threshold=15)
+    scrape("wallstreetzen", 0, score="10%")
+    scrape("wallstreetzen", 1, score="20%")
+    scrape("wallstreetzen", 2, score="25%")
+    assert messages() == ["AAA wallstreetzen upside is 20.0%, above your 15%"]
+
+    scrape("wallstreetzen", 3, score="5%")
+    scrape("wallstreetzen", 4, score="30%")
+    assert len(messages()) == 2
+
+
+def test_upside_only_reads_wallstreetzen(user):
+    alerts.add_rule(user.id, "AAA", "upside_above", threshold=15)
+    save_predictions([stock("AAA", 100, 200, score="90", day=TODAY)], "stockinvest")
+    assert messages() == []
+
+
+def test_recommendation_changes_are_tracked_per_source(user):
+    alerts.add_rule(user.id, "AAA", "recommendation_change")
+    scrape("wallstreetzen", 0, recommendation="Buy")
+    scrape("stockinvest", 0, recommendation="Sell")
+    scrape("wallstreetzen", 1, recommendation="Buy")
+    assert messages() == []
+
+    scrape("wallstreetzen", 2, recommendation="Strong Sell")
+    assert messages() == ["AAA wallstreetzen recommendation changed from Buy to Strong Sell"]
+
+
+def test_zacks_bull_fires_for_a_new_pick(user):
+    alerts.add_rule(user.id, "AAA", "zacks_bull")
+
+    def pick(bull, day):
+        db.session.add(Zack_Bull_Bear(bull_ticker=bull, bear_ticker="ZZZ", bull_link="", bear_link="", date=day))
+        db.session.commit()
+        notify_ingest("zacks", {bull, "ZZZ"})
+
+    pick("AAA", TODAY)
+    assert messages() == ["AAA is the Zacks Bull of the Day"]
+    # The same pick saved again, then a day where AAA isn't the pick
+    notify_ingest("zacks", {"AAA"})
+    pick("BBB", TODAY + timedelta(days=1))
+    assert len(messages()) == 1
+    pick("AAA", TODAY + timedelta(days=2))
+    assert len(messages()) == 2
+
+
+def test_alerts_carry_their_latency_and_unread_state(user):
+    alerts.add_rule(user.id, "AAA", "upside_above", threshold=15)
+    scrape("wallstreetzen", 0, score="20%")
+    alert = Alert.query.one()
+    assert alert.latency_ms is not None and alert.latency_ms >= 0
+    assert alert.source == "wallstreetzen"
+    assert alerts.unread_count(user.id) == 1
+    alerts.mark_read(user.id)
+    assert alerts.unread_count(user.id) == 0
+
+
+def test_unwatched_tickers_skip_the_rule_table(user):
+    alerts.add_rule(user.id, "AAA", "recommendation_change")
+    assert alerts.rule_index.watched({"BBB", "CCC"}) == set()
+    assert alerts.evaluate("wallstreetzen", {"BBB"}) == []
+
+
+def test_rules_are_validated_and_removed(user):
+    with pytest.raises(ValueError):
+        alerts.add_rule(user.id, "AAA", "moon")
+    with pytest.raises(ValueError):
+        alerts.add_rule(user.id, "AAA", "upside_above")
+
+    rule = alerts.add_rule(user.id, "AAA", "recommendation_change")
+    assert alerts.watchlist_page(user.id)['items'] == [("AAA", [])]
+    assert alerts.remove_rule(user.id, rule.id)
+    assert not alerts.remove_rule(user.id, rule.id)
+    assert alerts.rule_index.watched({"AAA"}) == set()
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import stock
+from EquiSight.backtest import History, load_history, recommendation_direction, run_backtest
+from EquiSight.ingest import save_predictions
+from EquiSight.models import Zack_Bull_Bear, db
+
+START = date(2026, 1, 5)
+
+
+def day(offset):
+    return START + timedelta(days=offset)
+
+
+ROWS = [
+    ("AAA", "wallstreetzen", "Buy", day(0), "$100", "$120"),
+    ("AAA", "wallstreetzen", "Hold", day(7), "$110", None),
+    ("BBB", "wallstreetzen", "Strong Sell", day(0), "$50", None),
+    ("BBB", "wallstreetzen", "Hold", day(9), "$40", None),
+    ("CCC", "wallstreetzen", "Buy", day(0), "$10", "$12"),
+    ("DDD", "wallstreetzen", "Hold", day(0), "$10", None),
+    ("DDD", "wallstreetzen", "Hold", day(7), "$11", None),
+    # Bull/Bear picks carry no price and enter at the price seen that day
+    ("AAA", "zacks", "Bull", day(0), None, None),
+]
+
+
+def by_group(results):
+    return {(row['horizon'], row['source'], row['recommendation']): row for row in results}
+
+
+def test_recommendation_direction():
+    assert recommendation_direction("Strong Buy") == 1
+    assert recommendation_direction("Outperform") == 1
+    assert recommendation_direction("Sell") == -1
+    assert recommendation_direction("Bear") == -1
+    assert recommendation_direction("Hold") == 0
+    assert recommendation_direction(None) == 0
+
+
+def test_history_stores_strings_once():
+    history = History.from_rows(ROWS)
+    assert len(history) == len(ROWS)
+    assert history.tickers == ["AAA", "BBB", "CCC", "DDD"]
+    assert history.sources == ["wallstreetzen", "zacks"]
+    assert history.price[0] == 100.0 and history.forecast[0] == 120.0
+
+
+def test_metrics_per_source_and_recommendation():
+    results = by_group(run_backtest(History.from_rows(ROWS), horizons=(7,), tolerance=7))
+
+    overall = results[(7, "wallstreetzen", None)]
+    # AAA +10%, BBB -20% (a hit for a sell), DDD +10% (a hold, no hit or miss), CCC never priced again
+    assert overall['count'] == 3
+    assert overall['hit_rate'] == 1.0
+    assert overall['mean_realized'] == pytest.approx(0.0)
+    assert overall['mean_forecast_upside'] == pytest.approx(20.0)
+
+    assert results[(7, "wallstreetzen", "Strong Sell")]['mean_realized'] == pytest.approx(-20.0)
+    hold = results[(7, "wallstreetzen", "Hold")]
+    assert hold['count'] == 1 and hold['hit_rate'] is None
+
+    zacks = results[(7, "zacks", "Bull")]
+    assert zacks['count'] == 1 and zacks['hit_rate'] == 1.0
+    assert zacks['mean_realized'] == pytest.approx(10.0)
+    assert zacks['mean_forecast_upside'] is None
+
+
+def test_later_prices_past_the_tolerance_do_not_count():
+    results = by_group(run_backtest(History.from_rows(ROWS), horizons=(7,), tolerance=1))
+    assert (7, "wallstreetzen", "Strong Sell") not in results
+    assert results[(7, "wallstreetzen", None)]['count'] == 2
+
+
+def test_nothing_to_evaluate():
+    assert run_backtest(History.from_rows([])) == []
+    assert run_backtest(History.from_rows(ROWS), horizons=(365,)) == []
+
+
+def test_load_history_includes_zacks_picks(app):
+    save_predictions([stock("AAA", 100, 120, day=day(0)), stock("AAA", 110, day=day(7))], "wallstreetzen")
+    db.session.add(Zack_Bull_Bear(bull_ticker="AAA", bear_ticker="BBB", bull_link="", bear_link="", date=day(0)))
+    db.session.commit()
+
+    history = load_history()
+    assert len(history) == 4
+    assert history.tickers == ["AAA", "BBB"]
+    results = by_group(run_backtest(history, horizons=(7,)))
+    assert results[(7, "zacks", "Bull")]['mean_realized'] == pytest.approx(10.0)
+    assert (7, "zacks", "Bear") not in results
@@ -0,0 +1,100 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EquiSight.scraping_scripts.browser_pool import load_in_tabs
+
+
+class FakeGuard:
+    max_concurrency = 1
+
+    def __init__(self):
+        self.outcomes = []
+
+    def before_request(self):
+        pass
+
+    def record_success(self):
+        self.outcomes.append("success")
+
+    def record_failure(self, reason="error"):
+        self.outcomes.append(reason)
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+    def new_window(self, kind):
+        handle = f"tab-{len(self.driver.tabs)}"
+        self.driver.tabs[handle] = {'url': "about:blank", 'pending': None, 'polls': 0}
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    """A browser whose script-started navigations only commit after a few polls"""
+
+    def __init__(self, current_url, commit_after=2):
+        self.commit_after = commit_after
+        self.tabs = {'main': {'url': current_url, 'pending': None, 'polls': 0}}
+        self.current_window_handle = "main"
+        self.switch_to = FakeSwitchTo(self)
+
+    @property
+    def tab(self):
+        return self.tabs[self.current_window_handle]
+
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    def get(self, url):
+        self.tab.update(url=url, pending=None, polls=0)
+
+    def execute_script(self, script, *args):
+        tab = self.tab
+        if "window.location.href =" in script:
+            tab.update(pending=args[0], polls=0)
+            return None
+        # The ready check: the old document stays until the navigation commits
+        if tab['pending'] is not None:
+            tab['polls'] += 1
+            if tab['polls'] > self.commit_after:
+                tab.update(url=tab['pending'], pending=None)
+        return tab['url'] != "about:blank"
+
+    @property
+    def page_source(self):
+        return f"<html>{self.tab['url']}</html>"
+
+    def close(self):
+        del self.tabs[self.current_window_handle]
+
+
+def test_reused_tab_returns_the_new_page_not_the_old_one():
+    driver = FakeDriver("https://stockinvest.us/list/old")
+    urls = ["https://stockinvest.us/list/buy", "https://stockinvest.us/list/sell"]
+
+    results = load_in_tabs(driver, urls, FakeGuard(), "table", timeout=5, settle=0, poll=0)
+
+    assert [(url, html) for url, html, _ in results] == [(url, f"<html>{url}</html>") for url in urls]
+
+
+class BrokenDriver(FakeDriver):
+    def get(self, url):
+        raise RuntimeError("tab crashed")
+
+
+def test_navigation_that_fails_to_start_is_reported():
+    driver = BrokenDriver("https://stockinvest.us/list/old")
+    guard = FakeGuard()
+    urls = ["https://stockinvest.us/list/buy", "https://stockinvest.us/list/sell"]
+
+    results = load_in_tabs(driver, urls, guard, "table", timeout=5, settle=0, poll=0)
+
+    assert [(url, html) for url, html, _ in results] == [(url, None) for url in urls]
+    assert guard.outcomes == ["error", "error"]
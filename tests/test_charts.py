@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from conftest import stock
+from EquiSight import ingest
+from EquiSight.charts import ChartService, lttb, minmax
+from EquiSight.ingest import save_predictions
+
+START = date(2026, 1, 1)
+
+
+def save_days(prices, offset=0, ticker="AAPL", overwrite=False):
+    save_predictions([
+        stock(ticker, price, price * 1.1, day=START + timedelta(days=offset + i)) for i, price in enumerate(prices)
+    ], "wallstreetzen", overwrite=overwrite)
+
+
+def listening(monkeypatch, service):
+    """Hand every ingest to service the way the module level one gets them"""
+    monkeypatch.setattr(ingest, "_listeners", ingest._listeners + [lambda source, tickers: service.ingest(tickers)])
+    return service
+
+
+def test_downsamplers_keep_endpoints_and_size():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 20)
+    keep = lttb(x, y, 50)
+    assert len(keep) == 50 and keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    keep = minmax(y, 50)
+    assert len(keep) <= 50 and np.argmax(y) in keep and np.argmin(y) in keep
+
+
+def test_chart_after_ingest_matches_a_fresh_load(app, monkeypatch):
+    rng = np.random.default_rng(1)
+    save_days(100 + rng.normal(size=300).cumsum())
+    service = listening(monkeypatch, ChartService())
+    assert len(service.chart("AAPL", points=40)['dates']) == 40
+
+    for batch in range(3):
+        save_days(100 + rng.normal(size=20).cumsum(), offset=300 + batch * 20)
+        service.chart("AAPL", points=40)
+    # A re-scraped old day replaces its point
+    save_days([500], offset=5, overwrite=True)
+    assert 500 in service.chart("AAPL", points=40)['price']
+
+    fresh = ChartService()
+    assert service.chart("AAPL", points=40) == fresh.chart("AAPL", points=40)
+    assert service.chart("AAPL", points=40)['dates'][-1] == (START + timedelta(days=359)).isoformat()
+
+
+def test_ingest_only_drops_changed_tickers(app, monkeypatch):
+    save_days([1, 2, 3])
+    save_days([4, 5, 6], ticker="MSFT")
+    service = listening(monkeypatch, ChartService())
+    msft = service.chart("MSFT")
+    service.chart("AAPL")
+
+    save_days([7], offset=3)
+
+    assert [key[0] for key in service.cache] == ["MSFT"]
+    assert service.chart("MSFT") is msft
+    assert service.chart("AAPL")['price'][-1] == 7
+    assert service.chart("NOPE") is None
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import stock
+from EquiSight import compaction
+from EquiSight.compaction import compact_details, compact_weekly, period_start, run_compaction
+from EquiSight.ingest import save_predictions
+from EquiSight.models import Prediction_Rollup, Wall_Street_Prediction, db
+from EquiSight.tickers import predictions_view
+
+TODAY = date.today()
+# A week inside the weekly window and a month past it, for detail_days=30 and weekly_days=90
+WEEK = period_start(TODAY - timedelta(days=50), "week")
+MONTH = period_start(TODAY - timedelta(days=200), "month")
+
+
+@pytest.fixture(autouse=True)
+def no_pauses(monkeypatch):
+    monkeypatch.setattr(compaction, "BATCH_PAUSE", 0)
+
+
+def rollup(period, start, ticker="AAA"):
+    return Prediction_Rollup.query.filter_by(ticker=ticker, period=period, period_start=start).one()
+
+
+def test_period_start():
+    assert period_start(date(2026, 10, 22), "week") == date(2026, 10, 19)
+    assert period_start(date(2026, 10, 22), "month") == date(2026, 10, 1)
+
+
+def test_old_rows_fold_into_weekly_and_monthly_rollups(app):
+    save_predictions([
+        stock("AAA", 10, 12, score="1%", day=WEEK),
+        stock("AAA", 20, None, score="2%", day=WEEK + timedelta(days=1)),
+        stock("AAA", "N/A", 30, score="3%", recommendation="Sell", day=WEEK + timedelta(days=2)),
+        stock("AAA", 5, 6, day=MONTH),
+        stock("AAA", 7, 8, day=MONTH + timedelta(days=3)),
+        stock("AAA", 99, 99, day=TODAY - timedelta(days=10)),
+    ], "wallstreetzen")
+
+    assert compact_details(detail_days=30, weekly_days=90, batch_size=2) == 5
+    assert [row.price for row in Wall_Street_Prediction.query] == ["$99"]
+
+    week = rollup("week", WEEK)
+    assert (week.row_count, week.price_count, week.forecast_count) == (3, 2, 2)
+    assert week.avg_price == 15.0 and (week.price_min, week.price_max) == (10.0, 20.0)
+    assert week.avg_forecast == 21.0
+    assert (week.last_date, week.last_score, week.last_recommendation) == (WEEK + timedelta(days=2), "3%", "Sell")
+    month = rollup("month", MONTH)
+    assert month.row_count == 2 and month.avg_price == 6.0
+
+    # Rows compacted later land in the rollup that already exists
+    save_predictions([stock("AAA", 30, day=WEEK + timedelta(days=3))], "wallstreetzen")
+    assert compact_details(detail_days=30, weekly_days=90) == 1
+    assert rollup("week", WEEK).row_count == 4
+    assert rollup("week", WEEK).price_max == 30.0
+    assert compact_details(detail_days=30, weekly_days=90) == 0
+
+
+def test_weekly_rollups_age_into_monthly_ones(app):
+    save_predictions([
+        stock("AAA", 10, day=WEEK),
+        stock("AAA", 40, day=WEEK + timedelta(days=1)),
+        stock("BBB", 1, day=WEEK),
+    ], "wallstreetzen")
+    compact_details(detail_days=30, weekly_days=90)
+
+    assert compact_weekly(weekly_days=30, batch_size=1) == 2
+    assert Prediction_Rollup.query.filter_by(period="week").count() == 0
+    month = rollup("month", period_start(WEEK, "month"))
+    assert (month.row_count, month.avg_price, month.price_min, month.price_max) == (2, 25.0, 10.0, 40.0)
+    assert month.last_date == WEEK + timedelta(days=1)
+    assert rollup("month", period_start(WEEK, "month"), ticker="BBB").row_count == 1
+
+
+def test_run_compaction_frees_space_and_drops_the_cached_view(app):
+    save_predictions([stock(f"T{i:04d}", i, i + 1, day=MONTH) for i in range(3000)], "wallstreetzen")
+    save_predictions([stock("KEEP", 1)], "wallstreetzen")
+    assert len(list(predictions_view.rows())) == 3001
+
+    report = run_compaction(detail_days=30, weekly_days=90, batch_size=500)
+
+    assert report['rows_compacted'] == 3000
+    assert report['bytes_freed'] > 0
+    with db.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA freelist_count").scalar() == 0
+    assert [row.ticker for row in predictions_view.rows()] == ["KEEP"]
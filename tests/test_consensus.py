@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from conftest import stock
+from EquiSight.consensus import compute_consensus, engine, parse_number, percentile_ranks, ranked_consensus
+from EquiSight.ingest import save_predictions
+from EquiSight.models import Ticker, Ticker_Consensus, Wall_Street_Prediction, Zack_Bull_Bear, db
+
+
+def test_parse_number():
+    assert parse_number("$1,234.50") == 1234.5
+    assert parse_number(" 12.5% ") == 12.5
+    assert np.isnan(parse_number(None))
+    assert np.isnan(parse_number("N/A"))
+
+
+def test_percentile_ranks_per_column():
+    values = np.array([[10.0, np.nan], [30.0, 5.0], [20.0, np.nan]])
+    ranks = percentile_ranks(values)
+    assert ranks[:, 0].tolist() == [0.0, 1.0, 0.5]
+    # A lone value sits in the middle, missing values stay missing
+    assert ranks[1, 1] == 0.5
+    assert np.isnan(ranks[0, 1]) and np.isnan(ranks[2, 1])
+
+
+def test_compute_consensus_weights_only_present_sources():
+    raw = np.array([
+        [30.0, 80.0, 1.0],       # best on everything
+        [10.0, 20.0, np.nan],    # worst on both prediction sources, no Zacks pick
+        [20.0, np.nan, -1.0],    # middle upside, bear pick
+        [np.nan, np.nan, np.nan],
+    ])
+    score, rank, count = compute_consensus(raw)
+    assert score[0] == 1.0
+    assert score[1] == 0.0
+    assert score[2] == pytest.approx((0.5 * 0.4 + 0.0 * 0.2) / 0.6)
+    assert np.isnan(score[3])
+    assert rank.tolist() == [1, 3, 2, 4]
+    assert count.tolist() == [3, 2, 2, 0]
+
+
+def test_ingests_keep_the_ranking_current(app):
+    # Without a scraped score the upside is worked out from the prices
+    save_predictions([stock(ticker, 100, forecast, score=None) for ticker, forecast in
+                      (("AAA", 150), ("BBB", 110), ("CCC", 130))], "wallstreetzen")
+    assert [row.ticker for row in ranked_consensus()] == ["AAA", "CCC", "BBB"]
+    assert ranked_consensus(limit=1)[0].wallstreetzen_upside == 50.0
+
+    # A newer scrape moves BBB to the top, the upside comes from the score when there is one
+    save_predictions([stock("BBB", 100, 110, score="90%", day=date.today() + timedelta(days=1))], "wallstreetzen")
+    assert [row.ticker for row in ranked_consensus()] == ["BBB", "AAA", "CCC"]
+    assert Ticker_Consensus.query.filter_by(ticker="BBB").one().wallstreetzen_upside == 90.0
+
+
+def test_zacks_picks_count_within_the_window(app):
+    save_predictions([stock("AAA", 100, 120, score="20%"), stock("BBB", 100, 120, score="10%")], "wallstreetzen")
+    db.session.add(Zack_Bull_Bear(bull_ticker="BBB", bear_ticker="AAA", bull_link="", bear_link="", date=date.today()))
+    db.session.add(Zack_Bull_Bear(bull_ticker="AAA", bear_ticker="BBB", bull_link="", bear_link="",
+                                  date=date.today() - timedelta(days=60)))
+    db.session.commit()
+    engine.refresh("zacks", {"AAA", "BBB"})
+
+    rows = {row.ticker: row for row in ranked_consensus()}
+    assert rows["BBB"].zacks_signal == 1.0 and rows["AAA"].zacks_signal == -1.0
+    assert rows["AAA"].score == pytest.approx(0.4 / 0.6)
+    assert rows["BBB"].score == pytest.approx(0.2 / 0.6)
+    assert rows["BBB"].source_count == 2
+
+
+def test_only_changed_rows_are_written(app, capsys):
+    save_predictions([stock("AAA", 100, score="50%"), stock("BBB", 100, score="10%")], "wallstreetzen")
+    assert "Consensus updated for 2 tickers" in capsys.readouterr().out
+    # A new ticker at the bottom moves BBB's percentile but leaves AAA alone
+    save_predictions([stock("CCC", 100, score="5%")], "wallstreetzen")
+    assert "Consensus updated for 2 tickers" in capsys.readouterr().out
+    assert engine.refresh("wallstreetzen", {"AAA", "BBB", "CCC"}) == 0
+    assert [row.ticker for row in ranked_consensus()] == ["AAA", "BBB", "CCC"]
+
+
+def test_new_raw_values_are_stored_even_when_the_rank_holds(app):
+    save_predictions([stock("AAA", 100, score="50%"), stock("BBB", 100, score="10%")], "wallstreetzen")
+    save_predictions([stock("AAA", 100, score="60%", day=date.today() + timedelta(days=1))], "wallstreetzen")
+    row = Ticker_Consensus.query.filter_by(ticker="AAA").one()
+    assert row.rank == 1 and row.wallstreetzen_upside == 60.0
+
+
+def test_page_only_reads_and_init_db_fills_the_table(client, app):
+    ticker = Ticker(symbol="OLD")
+    db.session.add(ticker)
+    db.session.flush()
+    db.session.add(Wall_Street_Prediction(ticker_id=ticker.id, source="wallstreetzen", date=date.today(),
+                                          score="5%", recommendation="Buy", price="$1"))
+    db.session.commit()
+
+    page = client.get("/consensus")
+    assert page.status_code == 200 and b"Nothing ranked yet" in page.data
+    assert Ticker_Consensus.query.count() == 0
+
+    result = app.test_cli_runner().invoke(args=["init-db"])
+    assert "consensus written for 1 tickers" in result.output
+    assert b"OLD" in client.get("/consensus").data
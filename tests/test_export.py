@@ -0,0 +1,92 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import stock
+from EquiSight import export
+from EquiSight.export import export_new_partitions, load_state, mark_dirty, read_history
+from EquiSight.ingest import save_predictions
+
+pytest.importorskip("pyarrow")
+
+TODAY = date.today()
+DAY1 = TODAY - timedelta(days=2)
+DAY2 = TODAY - timedelta(days=1)
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "history")
+
+
+def files(root):
+    return sorted(os.path.relpath(os.path.join(path, name), root) for path, _, names in os.walk(root) for name in names)
+
+
+def prices(root, day):
+    table = read_history(root, start=day, end=day, columns=["ticker", "price"])
+    return sorted(zip(table.column("ticker").to_pylist(), table.column("price").to_pylist()))
+
+
+def test_only_new_rows_cause_a_day_to_be_written(app, root):
+    save_predictions([stock("AAA", 10, day=DAY1), stock("BBB", 20, day=DAY2), stock("CCC", 30, day=TODAY)], "wallstreetzen")
+
+    assert export_new_partitions(root) == [DAY1, DAY2]
+    assert set(load_state(root)) == {DAY1, DAY2}
+    assert files(root) == [export.STATE_FILE, f"date={DAY1}/part-0.parquet", f"date={DAY2}/part-0.parquet"]
+    # Staged files are moved into place, nothing is left behind
+    assert os.listdir(export._staging_dir(root)) == []
+
+    assert export_new_partitions(root) == []
+    save_predictions([stock("DDD", 40, day=DAY1)], "stockinvest")
+    assert export_new_partitions(root) == [DAY1]
+    assert prices(root, DAY1) == [("AAA", 10.0), ("DDD", 40.0)]
+
+
+def test_dirty_days_are_written_again(app, root):
+    save_predictions([stock("AAA", 10, day=DAY1)], "wallstreetzen")
+    export_new_partitions(root)
+
+    # Overwriting keeps the row id, only the dirty log says the day changed
+    save_predictions([stock("AAA", 11, day=DAY1)], "wallstreetzen", overwrite=True)
+    assert export_new_partitions(root) == []
+    mark_dirty([DAY1], root)
+    assert export_new_partitions(root) == [DAY1]
+    assert prices(root, DAY1) == [("AAA", 11.0)]
+    assert export_new_partitions(root) == []
+
+
+def test_today_is_exported_on_request_but_never_recorded(app, root):
+    save_predictions([stock("AAA", 10, day=TODAY)], "wallstreetzen")
+    assert export_new_partitions(root, include_today=True) == [TODAY]
+    assert load_state(root) == {}
+    save_predictions([stock("BBB", 20, day=TODAY)], "wallstreetzen")
+    assert export_new_partitions(root, include_today=True) == [TODAY]
+    assert prices(root, TODAY) == [("AAA", 10.0), ("BBB", 20.0)]
+
+
+def test_ingests_queue_the_past_days_they_touched(app, monkeypatch):
+    queued = []
+    monkeypatch.setattr(export, "mark_dirty", queued.extend)
+    save_predictions([stock("AAA", 10, day=TODAY - timedelta(days=3)), stock("AAA", 11, day=TODAY)], "wallstreetzen")
+    assert queued == [TODAY - timedelta(days=offset) for offset in (3, 2, 1)]
+
+    queued.clear()
+    save_predictions([stock("BBB", 10, day=TODAY)], "wallstreetzen")
+    assert queued == []
+
+
+def test_read_history_filters(app, root):
+    save_predictions([stock("AAA", 10, 12, day=DAY1, sector="Technology"), stock("BBB", 20, day=DAY2)], "wallstreetzen")
+    save_predictions([stock("AAA", 9, day=DAY2)], "stockinvest")
+    export_new_partitions(root)
+
+    table = read_history(root, tickers=["AAA"], sources=["wallstreetzen"])
+    assert table.num_rows == 1
+    row = table.to_pylist()[0]
+    assert (row['ticker'], row['price'], row['forecast_price'], row['sector'], row['date']) == (
+        "AAA", 10.0, 12.0, "Technology", DAY1
+    )
+    assert read_history(root, start=DAY2).num_rows == 2
+    assert read_history(root, end=DAY1).num_rows == 1
@@ -0,0 +1,98 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from EquiSight.scraping_scripts.html_archive import HtmlArchive
+from EquiSight.scraping_scripts.reparse import _reparse_page, reparse
+
+
+def wallstreetzen_page(*stocks):
+    rows = []
+    for ticker, price, forecast, upside, recommendation in stocks:
+        cells = [f'<a class="MuiLink-root-94">{ticker}</a>', "Name", "", f"${price}", f"${forecast}", upside, "", recommendation]
+        rows.append('<tr class="MuiTableRow-root-481">' + "".join(
+            f'<td class="MuiTableCell-root-493">{cell}</td>' for cell in cells
+        ) + "</tr>")
+    return f"<html><body><table>{''.join(rows)}</table></body></html>"
+
+
+def objects(root):
+    return sorted(name for _, _, names in os.walk(os.path.join(root, "objects")) for name in names)
+
+
+def test_identical_pages_are_stored_once(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    first = archive.store("zacks", "https://www.zacks.com/a", "<html>same</html>")
+    second = archive.store("zacks", "https://www.zacks.com/b", "<html>same</html>")
+    other = archive.store("zacks", "https://www.zacks.com/a", "<html>other</html>")
+
+    assert first == second != other
+    assert len(objects(tmp_path)) == 2
+    assert [entry[1] for entry in archive.entries("zacks")] == [
+        "https://www.zacks.com/a", "https://www.zacks.com/b", "https://www.zacks.com/a"
+    ]
+    assert archive.load(first) == "<html>same</html>"
+
+
+def test_entries_filter_by_source_and_date(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    today = datetime.now()
+    archive.store("zacks", "z", "<html>1</html>", fetched_at=today - timedelta(days=3))
+    archive.store("stockinvest", "s", "<html>2</html>", fetched_at=today)
+    assert [entry[0] for entry in archive.entries()] == ["zacks", "stockinvest"]
+    assert [entry[0] for entry in archive.entries(since=date.today())] == ["stockinvest"]
+    assert [entry[1] for entry in archive.entries("zacks", until=date.today() - timedelta(days=1))] == ["z"]
+
+
+def test_prune_drops_old_rows_and_orphans_but_not_partial_writes(tmp_path):
+    archive = HtmlArchive(str(tmp_path), retention_days=30)
+    # store() would otherwise run the first pass itself
+    archive.last_prune = time.time()
+    old = archive.store("zacks", "z", "<html>old</html>", fetched_at=datetime.now() - timedelta(days=40))
+    kept = archive.store("zacks", "z", "<html>new</html>")
+    partial = os.path.join(tmp_path, "objects", "ab", "ab.html.gz.tmp")
+    os.makedirs(os.path.dirname(partial), exist_ok=True)
+    open(partial, "wb").close()
+
+    removed, freed = archive.prune()
+
+    assert removed == 1 and freed > 0
+    assert [entry[3] for entry in archive.entries()] == [kept]
+    assert not any(name.startswith(old) for name in objects(tmp_path))
+    assert os.path.exists(partial)
+
+
+def test_prune_keeps_newest_days_within_the_size_budget(tmp_path):
+    archive = HtmlArchive(str(tmp_path), max_bytes=10 ** 9)
+    archive.last_prune = time.time()
+    for days_ago in (3, 2, 1):
+        archive.store("zacks", "z", f"<html>{days_ago}</html>", fetched_at=datetime.now() - timedelta(days=days_ago))
+    archive.max_bytes = sum(os.path.getsize(os.path.join(root, name))
+                            for root, _, names in os.walk(os.path.join(tmp_path, "objects")) for name in names) - 1
+    archive.prune()
+    assert [entry[2] for entry in archive.entries()] == [date.today() - timedelta(days=d) for d in (2, 1)]
+
+
+def test_reparse_stamps_the_archive_date(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    page = wallstreetzen_page(("AAPL", "100.00", "120.00", "20%", "Buy"), ("MSFT", "300.00", "330.00", "10%", "Hold"))
+    fetched = datetime.now() - timedelta(days=10)
+    sha = archive.store("wallstreetzen", "https://www.wallstreetzen.com/", page, fetched_at=fetched)
+
+    source, page_date, stocks = _reparse_page(str(tmp_path), "wallstreetzen", sha, fetched.date(), "https://www.wallstreetzen.com/")
+
+    assert source == "wallstreetzen" and page_date == fetched.date()
+    assert [(s['ticker'], s['price'], s['forecast_price'], s['score'], s['recommendation'], s['date']) for s in stocks] == [
+        ("AAPL", "$100.00", "$120.00", "20%", "Buy", fetched.date()),
+        ("MSFT", "$300.00", "$330.00", "10%", "Hold", fetched.date()),
+    ]
+
+
+def test_reparse_parses_identical_pages_once_per_day(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    page = wallstreetzen_page(("AAPL", "100.00", "120.00", "20%", "Buy"))
+    archive.store("wallstreetzen", "https://www.wallstreetzen.com/", page)
+    archive.store("wallstreetzen", "https://www.wallstreetzen.com/", page)
+    archive.store("unknown", "https://example.com/", page)
+
+    assert reparse(workers=1, root=str(tmp_path)) == {"wallstreetzen": 1}
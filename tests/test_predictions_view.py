@@ -0,0 +1,87 @@
+from datetime import date
+
+import pytest
+
+from conftest import stock
+from EquiSight.ingest import save_predictions
+from EquiSight.tickers import PredictionRow, PredictionsSnapshot, predictions_view
+
+
+def row(ticker, price, source="wallstreetzen", sector="Tech", day=1, forecast=None):
+    return PredictionRow(
+        ticker, None, "Buy", price, forecast, date(2026, 1, day), source, sector, None, "NASDAQ"
+    )
+
+
+@pytest.fixture
+def snapshot():
+    # Stored in ticker order, the way PredictionsView.load() returns them
+    return PredictionsSnapshot([
+        row("AAA", "$30", day=3),
+        row("BBB", None, sector="Energy", day=1),
+        row("CCC", "$10", source="stockinvest", day=2),
+        row("DDD", "$20", sector=None, day=4),
+    ])
+
+
+def tickers(snapshot, *args, **kwargs):
+    return [r.ticker for r in snapshot.rows(snapshot.order(*args, **kwargs))]
+
+
+def test_filters_by_sector_and_source(snapshot):
+    assert tickers(snapshot) == ["AAA", "BBB", "CCC", "DDD"]
+    assert tickers(snapshot, sector="Tech") == ["AAA", "CCC"]
+    assert tickers(snapshot, source="stockinvest") == ["CCC"]
+    assert tickers(snapshot, sector="Energy", source="stockinvest") == []
+
+
+def test_sorts_put_missing_values_last_both_ways(snapshot):
+    assert tickers(snapshot, sort="price") == ["CCC", "DDD", "AAA", "BBB"]
+    assert tickers(snapshot, sort="price", descending=True) == ["AAA", "DDD", "CCC", "BBB"]
+    assert tickers(snapshot, sort="date") == ["BBB", "CCC", "AAA", "DDD"]
+    assert tickers(snapshot, descending=True) == ["DDD", "CCC", "BBB", "AAA"]
+
+
+def test_ties_keep_ticker_order(snapshot):
+    # Nobody has a forecast, so every value is NaN
+    assert tickers(snapshot, sort="forecast_price") == ["AAA", "BBB", "CCC", "DDD"]
+    assert tickers(snapshot, sort="forecast_price", descending=True) == ["AAA", "BBB", "CCC", "DDD"]
+
+
+def test_unknown_values_match_nothing_and_are_not_cached(snapshot):
+    assert len(snapshot.order(sector="Bogus")) == 0
+    assert len(snapshot.order(source="nowhere")) == 0
+    # Known strings from another column aren't a match either
+    assert len(snapshot.order(sector="wallstreetzen")) == 0
+    assert snapshot.orders == {}
+
+    snapshot.order(sector="Tech", sort="price")
+    assert list(snapshot.orders) == [("Tech", None, "price", False)]
+
+
+def test_rows_round_trip(snapshot):
+    assert list(snapshot.rows(snapshot.order(source="stockinvest"))) == [
+        row("CCC", "$10", source="stockinvest", day=2)
+    ]
+
+
+def test_view_rebuilds_after_ingest(app):
+    save_predictions([stock("AAA", 10, sector="Tech")], "wallstreetzen")
+    assert [r.ticker for r in predictions_view.rows()] == ["AAA"]
+    first = predictions_view.current()
+    assert predictions_view.current() is first
+
+    save_predictions([stock("BBB", 5, sector="Energy")], "wallstreetzen")
+    assert predictions_view.snapshot is None
+    assert [r.ticker for r in predictions_view.rows(sort="price")] == ["BBB", "AAA"]
+    assert [r.ticker for r in predictions_view.rows("Energy")] == ["BBB"]
+
+    with pytest.raises(ValueError):
+        predictions_view.rows(sort="recommendation")
+
+
+def test_predictions_page_rejects_unknown_filters(client):
+    save_predictions([stock("AAA", 10, sector="Tech")], "wallstreetzen")
+    assert client.get("/predictions?sector=Tech").status_code == 200
+    assert client.get("/predictions?sector=Bogus").status_code == 400
+    assert client.get("/predictions?sort=recommendation").status_code == 400
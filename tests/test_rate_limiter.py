@@ -0,0 +1,129 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from EquiSight.scraping_scripts import rate_limiter
+from EquiSight.scraping_scripts.rate_limiter import CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "time", clock)
+    # No jitter, cooldowns come out exact
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: 1.0)
+    return clock
+
+
+def tripped(clock, **kwargs):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=100, **kwargs)
+    breaker.record_failure("blocked")
+    breaker.record_failure("blocked")
+    return breaker
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=100)
+    breaker.record_failure("timeout")
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure("timeout")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.open_until == clock.now + 100
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=100)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_one_probe_after_cooldown_then_close_on_success(clock):
+    breaker = tripped(clock)
+    clock.now += 100
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.trips == 0
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_with_longer_cooldown(clock):
+    breaker = tripped(clock)
+    clock.now += 100
+    assert breaker.allow_request()
+    breaker.record_failure("blocked")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.open_until == clock.now + 200
+    assert not breaker.allow_request()
+
+
+def test_probe_that_never_reports_is_replaced_after_timeout(clock):
+    breaker = tripped(clock, probe_timeout=50)
+    clock.now += 100
+    assert breaker.allow_request()
+    clock.now += 49
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_state_survives_a_restart(clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(rate_limiter, "_guards", {})
+    guard = rate_limiter.get_guard("www.zacks.com")
+    guard.record_failure("blocked")
+    guard.record_failure("blocked")
+    saved = guard.breaker.to_dict()
+
+    monkeypatch.setattr(rate_limiter, "_guards", {})
+    restored = rate_limiter.get_guard("www.zacks.com")
+    assert restored is not guard
+    assert restored.breaker.to_dict() == saved
+    assert restored.is_open
+    with pytest.raises(CircuitOpenError):
+        restored.before_request()
+
+
+def test_half_open_is_reopened_on_restart(clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(rate_limiter, "_guards", {})
+    guard = rate_limiter.get_guard("www.zacks.com")
+    guard.record_failure("blocked")
+    guard.record_failure("blocked")
+    clock.now = guard.breaker.open_until
+    assert guard.breaker.allow_request()
+
+    monkeypatch.setattr(rate_limiter, "_guards", {})
+    restored = rate_limiter.get_guard("www.zacks.com")
+    assert restored.breaker.state == CircuitBreaker.OPEN
+    # The cooldown already ran out, so the next caller gets a new probe
+    assert restored.breaker.allow_request()
+
+
+def test_token_bucket_waits_for_refill(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=0.5, capacity=1)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(2.0)
+    now[0] += 2
+    assert bucket.try_acquire() == 0.0
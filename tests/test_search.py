@@ -0,0 +1,46 @@
+from conftest import stock
+from EquiSight.ingest import save_predictions
+from EquiSight.search import PrefixIndex
+
+
+def loaded(items):
+    index = PrefixIndex()
+    index.loaded = True
+    index.add_many(items)
+    return index
+
+
+def test_exact_and_short_matches_rank_first_on_a_common_prefix():
+    # Many longer symbols sort before the exact one and the short one
+    index = loaded([("ticker", f"AA{i:03d}") for i in range(100)] + [("ticker", "AAZ"), ("ticker", "AA")])
+    assert [r['value'] for r in index.search("aa", limit=2)] == ["AA", "AAZ"]
+
+
+def test_tickers_before_names_and_kind_filter():
+    index = loaded([("sector", "Technology"), ("ticker", "TECHX"), ("industry", "Tech Hardware")])
+    assert [r['kind'] for r in index.search("tech")] == ["ticker", "sector", "industry"]
+    assert index.search("tech", kinds={"sector"}) == [{'kind': 'sector', 'value': 'Technology'}]
+    assert index.search("  ") == []
+    assert index.search("zzz") == []
+
+
+def test_add_many_keeps_entries_sorted_and_unique():
+    index = loaded([("ticker", "MSFT"), ("ticker", "AAPL")])
+    index.add_many([("ticker", "GOOG"), ("ticker", "AAPL"), ("sector", None)])
+    assert index.entries == sorted(set(index.entries))
+    assert [entry[2] for entry in index.entries] == ["AAPL", "GOOG", "MSFT"]
+
+
+def test_loads_from_the_database_and_follows_ingests(app):
+    save_predictions([stock("NVDA", 100, sector="Technology")], "wallstreetzen")
+    from EquiSight.search import index
+    assert index.search("nv") == [{'kind': 'ticker', 'value': 'NVDA'}]
+    save_predictions([stock("NVMI", 50, industry="Semiconductors")], "wallstreetzen")
+    assert [r['value'] for r in index.search("nv")] == ["NVDA", "NVMI"]
+    assert index.search("semi") == [{'kind': 'industry', 'value': 'Semiconductors'}]
+
+
+def test_search_endpoint_clamps_limit(client):
+    save_predictions([stock(f"AB{i:02d}", 1) for i in range(60)], "wallstreetzen")
+    assert len(client.get("/api/search?q=ab&limit=1000").json['results']) == 50
+    assert len(client.get("/api/search?q=ab&limit=-5").json['results']) == 1
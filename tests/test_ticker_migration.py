@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from EquiSight.models import Ticker, Wall_Street_Prediction, db
+from EquiSight.tickers import backfill_ticker_ids, predictions_view
+
+TABLE = Wall_Street_Prediction.__tablename__
+
+
+@pytest.fixture
+def legacy_rows(tmp_path):
+    """A database from before the Ticker table, every prediction row holds its symbol"""
+    conn = sqlite3.connect(tmp_path / "site.db")
+    conn.execute(f"""CREATE TABLE "{TABLE}" (
+        id INTEGER PRIMARY KEY, ticker VARCHAR(10) NOT NULL, score VARCHAR(20), recommendation VARCHAR(10),
+        price VARCHAR(10), forecast_price VARCHAR(10), date DATE)""")
+    conn.executemany(
+        f'INSERT INTO "{TABLE}" (ticker, score, recommendation, price, forecast_price, date) VALUES (?, ?, ?, ?, ?, ?)',
+        [("AAPL", "10%", "Buy", "$100", "$110", "2025-01-02"),
+         ("MSFT", "5%", "Hold", "$300", "$315", "2025-01-02"),
+         ("AAPL", "12%", "Buy", "$101", "$113", "2025-01-03")],
+    )
+    conn.commit()
+    conn.close()
+
+
+def columns():
+    return {column["name"] for column in db.inspect(db.engine).get_columns(TABLE)}
+
+
+def test_old_rows_are_linked_and_the_column_dropped(legacy_rows, request):
+    # Pushing the app context runs the upgrade, backfill included
+    request.getfixturevalue("app")
+
+    assert "ticker" not in columns()
+    assert {ticker.symbol for ticker in Ticker.query} == {"AAPL", "MSFT"}
+    rows = Wall_Street_Prediction.query.order_by(Wall_Street_Prediction.id).all()
+    assert [(row.ticker, row.price, row.source) for row in rows] == [
+        ("AAPL", "$100", "wallstreetzen"), ("MSFT", "$300", "wallstreetzen"), ("AAPL", "$101", "wallstreetzen")
+    ]
+    assert [row.ticker for row in predictions_view.rows()] == ["AAPL", "AAPL", "MSFT"]
+    # Nothing left to do the second time
+    assert backfill_ticker_ids() == 0
+
+
+def test_partly_linked_rows_reuse_existing_tickers(app):
+    db.session.add(Ticker(symbol="AAPL", sector="Technology"))
+    db.session.commit()
+    aapl = Ticker.query.filter_by(symbol="AAPL").one()
+    with db.engine.begin() as conn:
+        # The table as it was between adding ticker_id (nullable, by upgrade_schema) and dropping ticker
+        conn.execute(db.text(f'DROP TABLE "{TABLE}"'))
+        conn.execute(db.text(f"""CREATE TABLE "{TABLE}" (
+            id INTEGER PRIMARY KEY, ticker VARCHAR(10) NOT NULL, score VARCHAR(20), recommendation VARCHAR(20),
+            price VARCHAR(10), forecast_price VARCHAR(10), date DATE,
+            source VARCHAR(20) NOT NULL DEFAULT 'wallstreetzen', ticker_id INTEGER)"""))
+        conn.execute(db.text(
+            f'INSERT INTO "{TABLE}" (ticker, ticker_id, source, date) VALUES '
+            f"('AAPL', {aapl.id}, 'stockinvest', '2025-01-02'), ('AAPL', NULL, 'stockinvest', '2025-01-03'), "
+            "('NVDA', NULL, 'stockinvest', '2025-01-03')"
+        ))
+
+    assert backfill_ticker_ids() == 2
+
+    assert "ticker" not in columns()
+    assert Ticker.query.count() == 2
+    assert Ticker.query.filter_by(symbol="AAPL").one().sector == "Technology"
+    assert sorted(row.ticker for row in Wall_Street_Prediction.query) == ["AAPL", "AAPL", "NVDA"]